@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scheduler.files import write_atomically
+
+# Set to fetch nothing and read every sheet from its last cached snapshot
+OFFLINE_ENV_VAR = "SCHEDULER_OFFLINE"
+_TIMEOUT_SECONDS = 30
+# Downloads are written to the cache in chunks of this many bytes.
+_CHUNK_SIZE = 64 * 1024
+# The encoding of a sheet if neither the caller nor the server gives one. Sheets
+# exports are UTF-8, and guessing from the start of a large export can pick a
+# narrower encoding (e.g. ASCII) that fails on a later row.
+_DEFAULT_ENCODING = "utf-8"
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """A session shared by every fetch, so connections to the same host are kept
+    alive and reused."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def is_offline() -> bool:
+    return os.environ.get(OFFLINE_ENV_VAR, "") not in ("", "0", "false")
+
+
+def fetch_lines(
+    url: str,
+    cache_dir: Path,
+    encoding: str | None = None,
+    offline: bool = False,
+) -> Iterator[str]:
+    """Fetch `url` with `fetch_file` and yield its lines (with their line endings,
+    as for `csv.reader`) one at a time, so large sheets aren't held in memory."""
+    yield from read_lines(*fetch_file(url, cache_dir, encoding, offline))
+
+
+def read_lines(path: Path, encoding: str) -> Iterator[str]:
+    with path.open(encoding=encoding, newline="") as f:
+        yield from f
+
+
+def fetch_file(
+    url: str,
+    cache_dir: Path,
+    encoding: str | None = None,
+    offline: bool = False,
+) -> tuple[Path, str]:
+    """Make sure the cache has an up-to-date snapshot of `url`, keyed by the URL,
+    and return its path and encoding.
+
+    A cached snapshot is revalidated with its ETag and Last-Modified date, so
+    an unchanged sheet isn't downloaded again. If the request fails, or with
+    `offline`, the last snapshot is used instead. `encoding` defaults to the
+    one the server sends, or else UTF-8. The body is streamed to disk, so it's
+    never held in memory as a whole.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    body_path = cache_dir / f"{key}.body"
+    meta_path = cache_dir / f"{key}.json"
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else None
+    if meta is not None and not body_path.exists():
+        meta = None
+
+    def read_snapshot() -> tuple[Path, str]:
+        return body_path, meta["encoding"]
+
+    if offline:
+        if meta is None:
+            raise RuntimeError(f"No cached snapshot of {url} to use offline")
+        print(f"Offline: using the snapshot of {url} from {meta['fetched_at']}")
+        return read_snapshot()
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        response = get_session().get(
+            url, headers=headers, timeout=_TIMEOUT_SECONDS, stream=True
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if meta is None:
+            raise
+        print(
+            f"Could not fetch {url} ({e}), using the snapshot from {meta['fetched_at']}"
+        )
+        return read_snapshot()
+    if response.status_code == 304:
+        response.close()
+        return read_snapshot()
+
+    if encoding is None and "charset" in response.headers.get("Content-Type", ""):
+        encoding = response.encoding
+
+    def write_body(path: Path):
+        with response, path.open("wb") as f:
+            for chunk in response.iter_content(_CHUNK_SIZE):
+                f.write(chunk)
+
+    write_atomically(body_path, write_body)
+    meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "encoding": encoding or _DEFAULT_ENCODING,
+        "fetched_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    write_atomically(meta_path, lambda path: path.write_text(json.dumps(meta)))
+    return body_path, meta["encoding"]
+
+
+def fetch_files(
+    urls: list[str],
+    cache_dir: Path,
+    encoding: str | None = None,
+    offline: bool = False,
+) -> list[tuple[Path, str]]:
+    """Fetch several URLs concurrently with `fetch_file`, in the order given."""
+    with ThreadPoolExecutor(max_workers=max(1, len(urls))) as executor:
+        return list(
+            executor.map(
+                lambda url: fetch_file(url, cache_dir, encoding, offline), urls
+            )
+        )
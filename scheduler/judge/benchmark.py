@@ -0,0 +1,303 @@
+import contextlib
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import rl.utils.click as click
+import rl.utils.io
+
+from scheduler.judge.load_data import JudgeAvailability, get_judge_data
+from scheduler.judge.sat import (
+    FAIRNESS_MODES,
+    SYMMETRY_BREAKING_MODES,
+    StageReport,
+    configure_rounds,
+    create_schedule,
+    initialize_full_model,
+    model_size,
+    schedule_deviation,
+)
+from scheduler.judge.synthetic import generate_tournament
+
+_BENCHMARK_PATH = rl.utils.io.get_data_path() / "judge_benchmark.jsonl"
+
+
+def compare_builders(judges: list[JudgeAvailability]) -> str:
+    """Compare the size and build time of the dense and sparse judge models."""
+    sizes = {}
+    for name, sparse in (("dense", False), ("sparse", True)):
+        start = time.perf_counter()
+        full_model = initialize_full_model(judges, sparse=sparse)
+        build_time = time.perf_counter() - start
+        sizes[name] = (*model_size(full_model["model"]), build_time)
+
+    output = f"{'Builder':<8}{'Variables':>12}{'Constraints':>14}{'Build time':>13}"
+    for name, (num_variables, num_constraints, build_time) in sizes.items():
+        output += (
+            f"\n{name:<8}{num_variables:>12}{num_constraints:>14}{build_time:>12.3f}s"
+        )
+    (dense_vars, dense_cons, dense_time), (sparse_vars, sparse_cons, sparse_time) = (
+        sizes["dense"],
+        sizes["sparse"],
+    )
+    output += (
+        f"\nSparse model has {sparse_vars / dense_vars:.1%} of the variables,"
+        f" {sparse_cons / dense_cons:.1%} of the constraints and takes"
+        f" {sparse_time / dense_time:.1%} of the build time."
+    )
+    return output
+
+
+def compare_fairness_modes(
+    judges: list[JudgeAvailability], max_time_per_stage: int
+) -> str:
+    """Solve the same inputs with every fairness mode and compare the stage-2 solve
+    time with the resulting balance, measured the same way for every mode."""
+    output = (
+        f"{'Mode':<9}{'Status':>10}{'First sol.':>12}{'Solve time':>12}"
+        f"{'Squared dev.':>14}{'Spread':>8}"
+    )
+    for fairness_mode in FAIRNESS_MODES:
+        reports: list[StageReport] = []
+        schedule = create_schedule(
+            judges,
+            max_time_per_stage=max_time_per_stage,
+            fairness_mode=fairness_mode,
+            reports=reports,
+        )
+        stage_2_report = reports[-1]
+        first_solution = (
+            f"{stage_2_report.first_solution_time:.2f}s"
+            if stage_2_report.first_solution_time is not None
+            else "-"
+        )
+        output += (
+            f"\n{fairness_mode:<9}{stage_2_report.status:>10}{first_solution:>12}"
+            f"{stage_2_report.wall_time:>11.2f}s"
+            f"{schedule_deviation(schedule, 'squared'):>14}"
+            f"{schedule_deviation(schedule, 'spread'):>8}"
+        )
+    return output
+
+
+def compare_symmetry_breaking(
+    judges: list[JudgeAvailability], max_time_per_stage: int
+) -> str:
+    """Solve the same inputs with and without each symmetry breaking mode."""
+    output = (
+        f"{'Mode':<7}{'Stage':<22}{'Status':>10}{'Solve time':>12}{'Objective':>11}"
+    )
+    for symmetry_breaking in (None, *SYMMETRY_BREAKING_MODES):
+        reports: list[StageReport] = []
+        create_schedule(
+            judges,
+            max_time_per_stage=max_time_per_stage,
+            symmetry_breaking=symmetry_breaking,
+            reports=reports,
+        )
+        for report in reports:
+            output += (
+                f"\n{symmetry_breaking or 'none':<7}{report.name:<22}"
+                f"{report.status:>10}{report.wall_time:>11.2f}s{report.objective:>11}"
+            )
+    return output
+
+
+def run_scaling_size(
+    num_judges: int, num_rounds: int, max_time_per_stage: int, seed: int
+) -> tuple[list[StageReport], float, str | None]:
+    """Run the full pipeline on one synthetic tournament and return the stage
+    reports, the total time and the error, if any."""
+    judges, round_config = generate_tournament(num_judges, num_rounds, seed)
+    configure_rounds(*round_config)
+    reports: list[StageReport] = []
+    start = time.perf_counter()
+    error = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_schedule(judges, max_time_per_stage, reports=reports)
+    except Exception as e:
+        # Keep benchmarking the other sizes, and record how far this got.
+        error = repr(e)
+    return reports, time.perf_counter() - start, error
+
+
+def benchmark_scaling(
+    sizes: list[tuple[int, int]],
+    max_time_per_stage: int,
+    seed: int = 0,
+    output_path: Path | None = None,
+) -> list[dict]:
+    """Run the full pipeline on a synthetic tournament of each (number of judges,
+    number of rounds) size and record build time, solve time, objective, model
+    size and memory for every stage.
+
+    Every size runs in its own process, so the peak memory recorded for its
+    stages isn't inflated by the sizes before it. Within a size, a stage's peak
+    includes the stages before it.
+
+    Records are appended to `output_path` as JSON lines, tagged with the time of
+    the run, so results can be compared across commits.
+    """
+    run_at = datetime.now().isoformat(timespec="seconds")
+    records = []
+    for num_judges, num_rounds in sizes:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            reports, total_time, error = executor.submit(
+                run_scaling_size, num_judges, num_rounds, max_time_per_stage, seed
+            ).result()
+        if error is not None:
+            print(f"{num_judges:>6} judges {num_rounds:>3} rounds failed: {error}")
+        for report in reports:
+            record = {
+                "run_at": run_at,
+                "num_judges": num_judges,
+                "num_rounds": num_rounds,
+                "seed": seed,
+                "max_time_per_stage": max_time_per_stage,
+                "stage": report.name,
+                "build_time": report.build_time,
+                "solve_time": report.wall_time,
+                "first_solution_time": report.first_solution_time,
+                "status": report.status,
+                "stop_reason": report.stop_reason,
+                "objective": report.objective,
+                "best_bound": report.best_bound,
+                "num_variables": report.num_variables,
+                "num_constraints": report.num_constraints,
+                "process_peak_memory_mb": report.process_peak_memory_mb,
+                "fallback": report.fallback,
+                "total_time": total_time,
+                "error": error,
+            }
+            print(
+                f"{num_judges:>6} judges {num_rounds:>3} rounds"
+                f" {report.name:<22} {report.status:>10}"
+                f" build {report.build_time:6.2f}s solve {report.wall_time:6.2f}s"
+                f" objective {report.objective}"
+                f" (peak {report.process_peak_memory_mb:.0f} MB)"
+            )
+            records.append(record)
+            if output_path is not None:
+                with output_path.open("a") as f:
+                    f.write(json.dumps(record) + "\n")
+    return records
+
+
+def load_judges(
+    num_judges: int | None, num_rounds: int, seed: int
+) -> list[JudgeAvailability]:
+    """Load the live judge sheet, or generate a synthetic tournament (and switch
+    to its round structure) if `num_judges` is given."""
+    if num_judges is None:
+        return get_judge_data()
+    judges, round_config = generate_tournament(num_judges, num_rounds, seed)
+    configure_rounds(*round_config)
+    return judges
+
+
+def input_options(command):
+    """Options to run a benchmark on a synthetic tournament instead of the live
+    judge sheet."""
+    command = click.option(
+        "--num_judges",
+        "-n",
+        type=int,
+        default=None,
+        help="Generate a synthetic tournament with this many judges",
+    )(command)
+    command = click.option(
+        "--num_rounds",
+        "-r",
+        default=7,
+        help="Number of rounds of the synthetic tournament",
+    )(command)
+    command = click.option(
+        "--seed", default=0, help="Random seed of the synthetic tournament"
+    )(command)
+    return command
+
+
+def max_time_option(command):
+    return click.option(
+        "--max_time_per_stage",
+        "-t",
+        default=30,
+        help="Maximum time (in seconds) to spend on each stage of the optimization",
+    )(command)
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@input_options
+def builders(num_judges, num_rounds, seed):
+    """Compare the dense and sparse model builders."""
+    print(compare_builders(load_judges(num_judges, num_rounds, seed)))
+
+
+@main.command()
+@input_options
+@max_time_option
+def fairness(num_judges, num_rounds, seed, max_time_per_stage):
+    """Compare solve time and final balance of each fairness mode."""
+    judges = load_judges(num_judges, num_rounds, seed)
+    print(compare_fairness_modes(judges, max_time_per_stage))
+
+
+@main.command()
+@input_options
+@max_time_option
+def symmetry(num_judges, num_rounds, seed, max_time_per_stage):
+    """Compare time-to-optimal with and without courtroom symmetry breaking."""
+    judges = load_judges(num_judges, num_rounds, seed)
+    print(compare_symmetry_breaking(judges, max_time_per_stage))
+
+
+@main.command()
+@click.option(
+    "--judges",
+    "-n",
+    "judge_counts",
+    multiple=True,
+    type=int,
+    default=(50, 200, 500, 1000, 2000),
+    help="Numbers of judges to generate (can be repeated)",
+)
+@click.option(
+    "--rounds",
+    "-r",
+    "round_counts",
+    multiple=True,
+    type=int,
+    default=(4, 7, 15, 30),
+    help="Numbers of rounds to generate (can be repeated)",
+)
+@click.option("--seed", default=0, help="Random seed of the synthetic tournaments")
+@max_time_option
+@click.option(
+    "--output",
+    "output_path",
+    type=click.Path(path_type=Path),
+    default=_BENCHMARK_PATH,
+    help="JSON lines file to append the results to",
+)
+def scaling(judge_counts, round_counts, seed, max_time_per_stage, output_path):
+    """Measure how the pipeline scales on synthetic tournaments."""
+    sizes = [
+        (num_judges, num_rounds)
+        for num_judges in judge_counts
+        for num_rounds in round_counts
+    ]
+    benchmark_scaling(sizes, max_time_per_stage, seed, output_path)
+    print(f"Appended results to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
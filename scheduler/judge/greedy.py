@@ -0,0 +1,30 @@
+# Goals: 1) Fill every round's courtrooms with its best available judges and
+# 2) keep panel scores within a round close to each other, in milliseconds.
+from copy import deepcopy
+
+from scheduler.judge.load_data import JudgeAvailability, get_judge_data
+from scheduler.judge.sat import (
+    _SCHEDULE_PATH,
+    _UNSCHEDULED_PATH,
+    GRADE_MAPPING,
+    Schedule,
+    assign_judges,
+    pretty_print_schedule,
+    write_schedule_to_csv,
+    write_unscheduled_to_csv,
+)
+
+
+def create_schedule(judges: list[JudgeAvailability]) -> Schedule:
+    judges = deepcopy(judges)
+    for judge in judges:
+        judge["grade"] = GRADE_MAPPING[judge["grade"]]
+    return assign_judges(judges)
+
+
+if __name__ == "__main__":
+    judges = get_judge_data()
+    schedule = create_schedule(judges)
+    print(pretty_print_schedule(schedule))
+    write_schedule_to_csv(schedule, judges, _SCHEDULE_PATH)
+    write_unscheduled_to_csv(schedule, judges, _UNSCHEDULED_PATH)
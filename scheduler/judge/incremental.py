@@ -0,0 +1,244 @@
+from copy import deepcopy
+from pathlib import Path
+
+import rl.utils.click as click
+
+from scheduler.judge.load_data import JudgeAvailability, JudgeName, get_judge_data
+from scheduler.judge.sat import (
+    _SCHEDULE_PATH,
+    _UNSCHEDULED_PATH,
+    COURTROOM_LETTERS,
+    GRADE_MAPPING,
+    MAX_JUDGES_PER_MATCH,
+    ROUND_ORDER,
+    Courtroom,
+    Round,
+    Schedule,
+    SolverConfig,
+    add_schedule_hint,
+    initialize_full_model,
+    match_objective,
+    pretty_print_schedule,
+    read_schedule_from_csv,
+    round_objective,
+    solve_model,
+    spread_var,
+    write_schedule_to_csv,
+    write_unscheduled_to_csv,
+)
+
+PreviousSchedule = dict[Round, dict[Courtroom, list[JudgeName]]]
+
+
+def reschedule(
+    judges: list[JudgeAvailability],
+    previous: PreviousSchedule,
+    previously_listed: dict[Round, list[JudgeName]],
+    dropped: set[JudgeName],
+    max_time_in_seconds: float = 5,
+    solver_config: SolverConfig | None = None,
+) -> Schedule:
+    """Update a previously published schedule after judges drop or sign up late.
+
+    `judges` is the current availability sheet, `previous` the judges assigned to
+    each courtroom in the published schedule, and `previously_listed` every judge
+    (scheduled or not) the published schedule listed for a round. Judges in
+    `dropped`, or missing from the sheet, are removed.
+
+    Rounds where no assigned judge dropped out and no new judge became available
+    are copied over unchanged. Only the remaining rounds are re-solved, hinted
+    with the published assignments. The objective first minimizes the number of
+    changed assignments, then maximizes the round score as the first stage of
+    `create_schedule` does, then minimizes the spread of panel scores.
+    """
+    judges = deepcopy([judge for judge in judges if judge["name"] not in dropped])
+    for judge in judges:
+        judge["grade"] = GRADE_MAPPING[judge["grade"]]
+    judges_by_name = {judge["name"]: judge for judge in judges}
+
+    affected_rounds = get_affected_rounds(judges, previous, previously_listed)
+    print(f"Re-solving {len(affected_rounds)} affected rounds: {affected_rounds}")
+
+    # Everyone assigned in an unaffected round is still around, so those rounds
+    # can be copied over as they are.
+    schedule = {
+        round_name: {
+            courtroom: [judges_by_name[name] for name in names]
+            for courtroom, names in previous.get(round_name, {}).items()
+        }
+        for round_name in ROUND_ORDER
+        if round_name not in affected_rounds
+    }
+    if affected_rounds:
+        schedule |= solve_affected_rounds(
+            judges,
+            previous,
+            affected_rounds,
+            max_time_in_seconds,
+            solver_config,
+        )
+    schedule = {round_name: schedule[round_name] for round_name in ROUND_ORDER}
+    print(f"Changed {count_changed_assignments(previous, schedule)} assignments")
+    return schedule
+
+
+def get_affected_rounds(
+    judges: list[JudgeAvailability],
+    previous: PreviousSchedule,
+    previously_listed: dict[Round, list[JudgeName]],
+) -> list[Round]:
+    """Find the rounds where an assigned judge is no longer available, or a judge
+    the published schedule didn't know about is available."""
+    free_judges_by_round = {
+        round_name: {
+            judge["name"] for judge in judges if round_name in judge["free_slots"]
+        }
+        for round_name in ROUND_ORDER
+    }
+    affected_rounds = []
+    for round_name in ROUND_ORDER:
+        assigned = {
+            name for names in previous.get(round_name, {}).values() for name in names
+        }
+        listed = assigned | set(previously_listed.get(round_name, []))
+        free_judges = free_judges_by_round[round_name]
+        if assigned - free_judges or free_judges - listed:
+            affected_rounds.append(round_name)
+    return affected_rounds
+
+
+def solve_affected_rounds(
+    judges: list[JudgeAvailability],
+    previous: PreviousSchedule,
+    affected_rounds: list[Round],
+    max_time_in_seconds: float,
+    solver_config: SolverConfig | None,
+) -> Schedule:
+    # Restricting availability to the affected rounds means the sparse model
+    # only has variables for those rounds.
+    round_judges = [
+        {
+            **judge,
+            "free_slots": [r for r in judge["free_slots"] if r in affected_rounds],
+        }
+        for judge in judges
+    ]
+    judges_by_name = {judge["name"]: judge for judge in judges}
+    judge_grades = {judge["name"]: judge["grade"] for judge in judges}
+    full_model = initialize_full_model(round_judges)
+    model = full_model["model"]
+    index = full_model["index"]
+
+    kept_assignments = []
+    num_previous_assignments = 0
+    for round_name in affected_rounds:
+        for courtroom, names in previous.get(round_name, {}).items():
+            num_previous_assignments += len(names)
+            for name in names:
+                judge_var = index.var(name, round_name, courtroom)
+                if judge_var is not None:
+                    kept_assignments.append(judge_var)
+    changed_assignments = num_previous_assignments - sum(kept_assignments)
+    round_score = sum(
+        round_objective(index.round_vars(round_name), judge_grades)
+        for round_name in affected_rounds
+    )
+    max_grade = max(GRADE_MAPPING.values())
+    max_spreads = [
+        max_grade * MAX_JUDGES_PER_MATCH[round_name] for round_name in affected_rounds
+    ]
+    score_spread = sum(
+        spread_var(
+            model,
+            round_name,
+            [
+                match_objective(index.match_vars(round_name, courtroom), judge_grades)
+                for courtroom in COURTROOM_LETTERS[round_name]
+            ],
+            max_spread,
+        )
+        for round_name, max_spread in zip(affected_rounds, max_spreads, strict=True)
+    )
+    # Weigh the goals so that no amount of the later ones makes up for the
+    # earlier: a changed assignment can gain at most `max_grade` round score,
+    # and a point of round score outweighs any spread.
+    score_weight = sum(max_spreads) + 1
+    change_weight = score_weight * max_grade + 1
+    model.Minimize(
+        score_spread + change_weight * changed_assignments - score_weight * round_score
+    )
+    add_schedule_hint(
+        full_model,
+        {
+            round_name: {
+                courtroom: [
+                    judges_by_name[name] for name in names if name in judges_by_name
+                ]
+                for courtroom, names in previous.get(round_name, {}).items()
+            }
+            for round_name in affected_rounds
+        },
+    )
+
+    result = solve_model(
+        full_model,
+        judges,
+        max_time_in_seconds=max_time_in_seconds,
+        config=solver_config,
+    )
+    if result is None:
+        raise RuntimeError("Could not re-solve the affected rounds")
+    solved_schedule, _ = result
+    return {round_name: solved_schedule[round_name] for round_name in affected_rounds}
+
+
+def count_changed_assignments(previous: PreviousSchedule, schedule: Schedule) -> int:
+    """Count the published assignments that are no longer in `schedule`."""
+    num_changed = 0
+    for round_name, courtrooms in previous.items():
+        for courtroom, names in courtrooms.items():
+            current = {
+                judge["name"]
+                for judge in schedule.get(round_name, {}).get(courtroom, [])
+            }
+            num_changed += sum(name not in current for name in names)
+    return num_changed
+
+
+@click.command()
+@click.option(
+    "--previous",
+    "previous_path",
+    type=click.Path(exists=True, path_type=Path),
+    default=_SCHEDULE_PATH,
+    help="The previously published schedule CSV",
+)
+@click.option(
+    "--drop",
+    multiple=True,
+    help="Name of a judge who dropped out (can be repeated)",
+)
+@click.option(
+    "--max_time",
+    "-t",
+    default=5,
+    help="Maximum time (in seconds) to spend re-solving the affected rounds",
+)
+def main(previous_path, drop, max_time):
+    # Dropped judges are left out of the unscheduled lists too.
+    judges = [judge for judge in get_judge_data() if judge["name"] not in drop]
+    previous, previously_listed = read_schedule_from_csv(previous_path)
+    schedule = reschedule(
+        judges,
+        previous,
+        previously_listed,
+        dropped=set(drop),
+        max_time_in_seconds=max_time,
+    )
+    print(pretty_print_schedule(schedule))
+    write_schedule_to_csv(schedule, judges, _SCHEDULE_PATH)
+    write_unscheduled_to_csv(schedule, judges, _UNSCHEDULED_PATH)
+
+
+if __name__ == "__main__":
+    main()
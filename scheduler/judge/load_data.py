@@ -1,9 +1,12 @@
 import csv
+import sys
+from collections.abc import Iterable, Iterator
 from typing import NewType, TypedDict
 
-import requests
 import rl.utils.io
 
+from scheduler.fetch import fetch_lines, is_offline
+
 JudgeName = NewType("JudgeName", str)
 Slot = NewType("Slot", str)
 
@@ -16,21 +19,48 @@ class JudgeAvailability(TypedDict):
     free_slots: list[Slot]
 
 
+def iter_judges(lines: Iterable[str]) -> Iterator[JudgeAvailability]:
+    """Parse the judge sheet one row at a time. Slot names are interned, so the
+    many judges free for the same round share one string. Malformed rows are
+    reported and skipped, with their line number in the sheet."""
+    # The sheet line the reader last read, counting the blank lines skipped
+    line_number = 0
+
+    def non_blank_lines() -> Iterator[str]:
+        nonlocal line_number
+        for number, line in enumerate(lines, start=1):
+            line_number = number
+            if line.replace(",", "").strip():
+                yield line
+
+    reader = csv.DictReader(non_blank_lines())
+    for judge in reader:
+        try:
+            judge["grade"] = (
+                int(judge["grade"]) if judge.get("grade") else int(judge["grades"])
+            )
+            judge["moot_exp"] = judge["moot_exp"] == "Yes"
+            slots = judge["day1"].split(", ") + judge["day2"].split(", ")
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            print(f"Skipping malformed judge row {line_number} ({e!r}): {judge}")
+            continue
+        judge["free_slots"] = [
+            Slot(sys.intern(slot)) for slot in slots if slot not in ("None", "")
+        ]
+        yield judge
+
+
 def get_judge_data():
-    judge_csv_path = rl.utils.io.getenv("JUDGE_CSV_PATH")
-    r = requests.get(judge_csv_path)
-    r.encoding = "utf-8"
-    lines = r.text.splitlines()
-    lines = [ln for ln in lines if ln.replace(",", "").strip()]
-    judges = list(csv.DictReader(lines))
-    for judge in judges:
-        judge["grade"] = (
-            int(judge["grade"]) if judge.get("grade") else int(judge["grades"])
+    return list(
+        iter_judges(
+            fetch_lines(
+                rl.utils.io.getenv("JUDGE_CSV_PATH"),
+                rl.utils.io.get_data_path("cache"),
+                encoding="utf-8",
+                offline=is_offline(),
+            )
         )
-        judge["moot_exp"] = judge["moot_exp"] == "Yes"
-        slots = judge["day1"].split(", ") + judge["day2"].split(", ")
-        judge["free_slots"] = [Slot(slot) for slot in slots if slot not in ("None", "")]
-    return judges
+    )
 
 
 if __name__ == "__main__":
@@ -1,15 +1,37 @@
 import csv
 import itertools
+import multiprocessing
+import os
 import random
+import time
 from collections import defaultdict
+from collections.abc import Callable
 from copy import deepcopy
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
+import numpy as np
 import rl.utils.click as click
 import rl.utils.io
+from ortools.sat import sat_parameters_pb2
 from ortools.sat.python import cp_model
 
+from scheduler.files import write_atomically
 from scheduler.judge.load_data import JudgeAvailability, JudgeName, get_judge_data
+from scheduler.profiling import (
+    Profiler,
+    model_statistics,
+    python_size_mb,
+    response_statistics,
+    time_presolve,
+)
+from scheduler.progress import (
+    ProgressPoint,
+    SolutionProgress,
+    peak_memory_mb,
+    relative_gap,
+    stop_when_stalled,
+)
 
 Round = str
 Courtroom = str
@@ -18,6 +40,7 @@ Schedule = dict[Round, dict[Courtroom, list[JudgeAvailability]]]
 _OUTPUT_DIR = rl.utils.io.get_data_path()
 _SCHEDULE_PATH = _OUTPUT_DIR / "schedule.csv"
 _UNSCHEDULED_PATH = _OUTPUT_DIR / "unscheduled.csv"
+_PROFILE_PATH = _OUTPUT_DIR / "judge_profile.json"
 
 MATCHES_PER_ROUND = {
     "Round 1 (11:45 a.m.)": 12,
@@ -59,30 +82,412 @@ ROUND_ORDER = [
     "Final (3:30 p.m.)",
 ]
 
-_ALL_COURTROOM_LETTERS = [
-    chr(ord("A") + i) for i in range(max(MATCHES_PER_ROUND.values()))
+FAIRNESS_MODES = ("squared", "l1", "spread", "pwl")
+# Tangent points of the "pwl" fairness mode's approximation, per panel
+NUM_PWL_BREAKPOINTS = 16
+SYMMETRY_BREAKING_MODES = ("score", "index")
+
+# Consecutive rounds on different days, where switching courtrooms doesn't matter
+DAY_BOUNDARIES = [("Round 3 (3:00 p.m.)", "Round 4 (10:30 a.m.)")]
+MOVEMENT_ROUND_PAIRS = [
+    (r1, r2)
+    for r1, r2 in itertools.pairwise(ROUND_ORDER)
+    if (r1, r2) not in DAY_BOUNDARIES
 ]
+
+
+def courtroom_letters(num_courtrooms: int) -> list[Courtroom]:
+    """Name courtrooms A, B, ..., Z, AA, AB, ..."""
+    letters = []
+    for i in range(num_courtrooms):
+        name = ""
+        i += 1
+        while i:
+            i, remainder = divmod(i - 1, 26)
+            name = chr(ord("A") + remainder) + name
+        letters.append(name)
+    return letters
+
+
 COURTROOM_LETTERS = {
-    round_name: _ALL_COURTROOM_LETTERS[: MATCHES_PER_ROUND[round_name]]
+    round_name: courtroom_letters(MATCHES_PER_ROUND[round_name])
     for round_name in MATCHES_PER_ROUND
 }
 
 
+def configure_rounds(
+    matches_per_round: dict[Round, int],
+    max_judges_per_match: dict[Round, int],
+    day_boundaries: list[tuple[Round, Round]] | None = None,
+):
+    """Replace the tournament's round structure, e.g. with a synthetic one.
+
+    Rounds are scheduled in the order of `matches_per_round`. The module-level
+    constants are updated in place, so every module that imported them sees the
+    new structure.
+    """
+    round_config = (
+        dict(matches_per_round),
+        dict(max_judges_per_match),
+        list(day_boundaries or []),
+    )
+    MATCHES_PER_ROUND.clear()
+    MATCHES_PER_ROUND.update(round_config[0])
+    MAX_JUDGES_PER_MATCH.clear()
+    MAX_JUDGES_PER_MATCH.update(round_config[1])
+    ROUND_ORDER[:] = list(MATCHES_PER_ROUND)
+    DAY_BOUNDARIES[:] = round_config[2]
+    MOVEMENT_ROUND_PAIRS[:] = [
+        (r1, r2)
+        for r1, r2 in itertools.pairwise(ROUND_ORDER)
+        if (r1, r2) not in DAY_BOUNDARIES
+    ]
+    COURTROOM_LETTERS.clear()
+    COURTROOM_LETTERS.update(
+        {
+            round_name: courtroom_letters(num_matches)
+            for round_name, num_matches in MATCHES_PER_ROUND.items()
+        }
+    )
+
+
+def current_round_config() -> (
+    tuple[dict[Round, int], dict[Round, int], list[tuple[Round, Round]]]
+):
+    """The arguments to `configure_rounds` that reproduce the current structure."""
+    return dict(MATCHES_PER_ROUND), dict(MAX_JUDGES_PER_MATCH), list(DAY_BOUNDARIES)
+
+
+@dataclass
+class StageReport:
+    """Timing and outcome of a single solver stage."""
+
+    name: str
+    warm_start: bool = False
+    build_time: float = 0.0
+    num_variables: int = 0
+    num_constraints: int = 0
+    status: str = ""
+    objective: float | None = None
+    best_bound: float | None = None
+    wall_time: float = 0.0
+    first_solution_time: float | None = None
+    # Peak resident memory of the whole process by the end of the stage (it
+    # includes earlier stages, and anything else the process ran before)
+    process_peak_memory_mb: float = 0.0
+    # The schedule kept instead if the solver found none
+    fallback: str = ""
+    stop_reason: str = ""
+    # The incumbent and bound each time the solver improved its solution
+    progress: list[ProgressPoint] = field(default_factory=list)
+    portfolio: list["SolveResult"] = field(default_factory=list)
+
+    @property
+    def gap(self) -> float | None:
+        if self.objective is None or self.best_bound is None:
+            return None
+        return relative_gap(self.objective, self.best_bound)
+
+    def __str__(self):
+        first_solution = (
+            f"{self.first_solution_time:.2f}s"
+            if self.first_solution_time is not None
+            else "never"
+        )
+        gap = f", gap {self.gap:.2%}" if self.gap is not None else ""
+        fallback = f", kept the {self.fallback} schedule" if self.fallback else ""
+        return (
+            f"{self.name} ({'warm' if self.warm_start else 'cold'} start):"
+            f" built in {self.build_time:.2f}s ({self.num_variables} variables,"
+            f" {self.num_constraints} constraints), first solution after {first_solution},"
+            f" stopped after {self.wall_time:.2f}s ({self.stop_reason}) with objective"
+            f" {self.objective} ({self.status}{gap}{fallback})"
+        )
+
+
+# Parameter overrides cycled through by the members of a solver portfolio, so
+# they don't all search the same way.
+PORTFOLIO_VARIANTS = [
+    {},
+    {"linearization_level": 2},
+    {"optimize_with_core": True},
+    {
+        "search_branching": sat_parameters_pb2.SatParameters.PORTFOLIO_WITH_QUICK_RESTART_SEARCH
+    },
+]
+
+
+@dataclass
+class SolverConfig:
+    """CP-SAT settings shared by every stage of the pipeline."""
+
+    # 0 lets CP-SAT use one search worker per core.
+    num_workers: int = 0
+    random_seed: int = 0
+    # How many independent solves to race against each other, splitting the
+    # workers between them.
+    portfolio_size: int = 1
+    log_search_progress: bool = False
+    # Print the objective, bound and gap of every improving solution
+    show_progress: bool = False
+    # Stop a stage once its incumbent is provably within these gaps of the
+    # optimum (0 disables the limit)...
+    relative_gap_limit: float = 0.0
+    absolute_gap_limit: float = 0.0
+    # ... or once it has gone this many seconds without an improving solution.
+    no_improvement_time: float = 0.0
+
+    def parameters(
+        self, max_time_in_seconds: float, member: int = 0
+    ) -> sat_parameters_pb2.SatParameters:
+        parameters = sat_parameters_pb2.SatParameters(
+            max_time_in_seconds=max_time_in_seconds,
+            random_seed=self.random_seed + member,
+            log_search_progress=self.log_search_progress,
+        )
+        if self.relative_gap_limit > 0:
+            parameters.relative_gap_limit = self.relative_gap_limit
+        if self.absolute_gap_limit > 0:
+            parameters.absolute_gap_limit = self.absolute_gap_limit
+        if self.num_workers:
+            parameters.num_workers = max(1, self.num_workers // self.portfolio_size)
+        elif self.portfolio_size > 1:
+            parameters.num_workers = max(
+                1, (os.cpu_count() or 1) // self.portfolio_size
+            )
+        if self.portfolio_size > 1:
+            for name, value in PORTFOLIO_VARIANTS[
+                member % len(PORTFOLIO_VARIANTS)
+            ].items():
+                setattr(parameters, name, value)
+        return parameters
+
+    def member_label(self, member: int) -> str:
+        overrides = PORTFOLIO_VARIANTS[member % len(PORTFOLIO_VARIANTS)]
+        return f"seed {self.random_seed + member}" + "".join(
+            f", {name}={value}" for name, value in overrides.items()
+        )
+
+
+@dataclass
+class SolveResult:
+    label: str
+    status: str
+    objective: float | None
+    best_bound: float | None
+    wall_time: float
+    first_solution_time: float | None
+    solution: list[int] | None
+    progress: list[ProgressPoint] = field(default_factory=list)
+    portfolio: list["SolveResult"] = field(default_factory=list)
+    # Search statistics from the solver response (see `response_statistics`)
+    statistics: dict = field(default_factory=dict)
+    # Why the search ended (see `get_stop_reason`)
+    stop_reason: str = ""
+
+    def __str__(self):
+        return (
+            f"[{self.label}] {self.status} with objective {self.objective}"
+            f" (bound {self.best_bound}) after {self.wall_time:.2f}s"
+            f" ({self.stop_reason})"
+        )
+
+
+@dataclass
+class AssignmentIndex:
+    """Where to find the variable for each judge × round × courtroom assignment.
+
+    `var_indices[j, r, c]` is the proto index of the variable that puts judge
+    `judge_names[j]` in courtroom `courtrooms[round_names[r]][c]`, or -1 if there
+    is none (the judge isn't free for the round in a sparse model, or the round
+    has fewer courtrooms). `variables` maps each of those proto indices to its
+    variable.
+    """
+
+    judge_names: list[JudgeName]
+    round_names: list[Round]
+    courtrooms: dict[Round, list[Courtroom]]
+    var_indices: np.ndarray
+    variables: dict[int, cp_model.IntVar]
+    judge_positions: dict[JudgeName, int] = field(init=False)
+    round_positions: dict[Round, int] = field(init=False)
+
+    def __post_init__(self):
+        self.judge_positions = {name: j for j, name in enumerate(self.judge_names)}
+        self.round_positions = {name: r for r, name in enumerate(self.round_names)}
+
+    def var(
+        self, judge_name: JudgeName, round_name: Round, courtroom: Courtroom
+    ) -> cp_model.IntVar | None:
+        j = self.judge_positions.get(judge_name)
+        r = self.round_positions.get(round_name)
+        if j is None or r is None or courtroom not in self.courtrooms[round_name]:
+            return None
+        var_index = self.var_indices[j, r, self.courtrooms[round_name].index(courtroom)]
+        return self.variables[var_index] if var_index >= 0 else None
+
+    def match_vars(
+        self, round_name: Round, courtroom: Courtroom
+    ) -> dict[JudgeName, cp_model.IntVar]:
+        """The variables of every judge who could sit in `courtroom` in the round."""
+        if courtroom not in self.courtrooms.get(round_name, []):
+            return {}
+        var_indices = self.var_indices[
+            :,
+            self.round_positions[round_name],
+            self.courtrooms[round_name].index(courtroom),
+        ]
+        return {
+            self.judge_names[j]: self.variables[var_indices[j]]
+            for j in np.flatnonzero(var_indices >= 0)
+        }
+
+    def round_vars(
+        self, round_name: Round
+    ) -> dict[Courtroom, dict[JudgeName, cp_model.IntVar]]:
+        return {
+            courtroom: self.match_vars(round_name, courtroom)
+            for courtroom in self.courtrooms.get(round_name, [])
+        }
+
+    def judge_round_vars(
+        self, judge_name: JudgeName, round_name: Round
+    ) -> dict[Courtroom, cp_model.IntVar]:
+        """The variables that put the judge in each courtroom of the round."""
+        j = self.judge_positions.get(judge_name)
+        r = self.round_positions.get(round_name)
+        if j is None or r is None:
+            return {}
+        return {
+            self.courtrooms[round_name][c]: self.variables[var_index]
+            for c, var_index in enumerate(self.var_indices[j, r])
+            if var_index >= 0
+        }
+
+    def assignments(self, solution: list[int]) -> np.ndarray:
+        """Read every assignment out of a solution (a value per model variable) at
+        once, as a judge × round × courtroom array of booleans."""
+        if not self.variables:
+            return np.zeros(self.var_indices.shape, dtype=bool)
+        values = np.asarray(solution)[np.maximum(self.var_indices, 0)]
+        return (values == 1) & (self.var_indices >= 0)
+
+
+def assign_judges(judges: list[JudgeAvailability]) -> Schedule:
+    """Assign each round's free judges, best grade first, to the courtroom with the
+    lowest panel score that still has room.
+
+    Every round has room for `MAX_JUDGES_PER_MATCH` judges per courtroom, and the
+    best judges fill it, so the total score of each round is as high as the
+    stage-1 optimum of `create_schedule`; the panel scores are only roughly
+    balanced. `judges` must already have their grades mapped through
+    `GRADE_MAPPING`.
+    """
+    schedule = {}
+    for round_name in ROUND_ORDER:
+        courtrooms = COURTROOM_LETTERS[round_name]
+        limit = MAX_JUDGES_PER_MATCH[round_name]
+        panels = {courtroom: [] for courtroom in courtrooms}
+        scores = dict.fromkeys(courtrooms, 0)
+        free_judges = sorted(
+            (judge for judge in judges if round_name in judge["free_slots"]),
+            key=lambda judge: judge["grade"],
+            reverse=True,
+        )
+        for judge in free_judges[: limit * len(courtrooms)]:
+            # Tiebreaker: the courtroom with the fewest judges, then the earliest.
+            courtroom = min(
+                (c for c in courtrooms if len(panels[c]) < limit),
+                key=lambda c: (scores[c], len(panels[c])),
+            )
+            panels[courtroom].append(judge)
+            scores[courtroom] += judge["grade"]
+        schedule[round_name] = panels
+    return schedule
+
+
 def create_schedule(
-    judges: list[JudgeAvailability], max_time_per_stage: int
+    judges: list[JudgeAvailability],
+    max_time_per_stage: int,
+    warm_start: bool = True,
+    bound_with_hint: bool = True,
+    sparse: bool = True,
+    fairness_mode: str = "squared",
+    num_breakpoints: int = NUM_PWL_BREAKPOINTS,
+    symmetry_breaking: str | None = None,
+    solver_config: SolverConfig | None = None,
+    movement_time: int = 0,
+    progress_path: Path | None = None,
+    reports: list[StageReport] | None = None,
+    profiler: Profiler | None = None,
 ) -> Schedule:
+    """Schedule judges in two stages: first maximize the total panel score of each
+    round, then (keeping the same judges in each round) minimize the deviation of
+    panel scores within each round.
+
+    With `warm_start`, stage 2 reuses the stage-1 model and is hinted with the
+    stage-1 assignment, so it starts from a feasible solution instead of searching
+    for one from scratch. With `bound_with_hint`, the deviation of that assignment
+    is also added as an upper bound on the stage-2 objective. `fairness_mode`
+    selects how the deviation is measured (see `get_deviation_vars`, which also
+    explains `num_breakpoints`), and
+    `symmetry_breaking` how equivalent courtroom permutations are pruned (see
+    `initialize_full_model`). `solver_config` controls the CP-SAT workers, seeds
+    and portfolio used for every stage. With a positive `movement_time`, the
+    result is then passed to `minimize_judge_movement` for that many seconds.
+    With `progress_path`, every improving solution of every stage is written
+    there, so an interrupted run still leaves a usable schedule behind. With an
+    enabled `profiler`, the build and solve of every stage are traced.
+
+    Stage 1 is hinted with the greedy schedule of `assign_judges`, which is
+    also returned if the solver finds no solution in time. If stage 2 finds
+    none, the stage-1 schedule is kept.
+    """
+    profiler = profiler or Profiler(enabled=False)
     judges = deepcopy(judges)
     for judge in judges:
         judge["grade"] = GRADE_MAPPING[judge["grade"]]
     judge_grades = {judge["name"]: judge["grade"] for judge in judges}
+    reports = reports if reports is not None else []
 
-    full_model = initialize_full_model(judges)
-    round_sum_maximization = sum(
-        round_objective(round_vars, judge_grades)
-        for round_vars in full_model["vars_by_round_courtroom_judge"].values()
-    )
-    full_model["model"].Maximize(round_sum_maximization)
-    solved_schedule, dev_objective = solve_model(full_model, judges, max_time_per_stage)
+    with profiler.span("Stage 1 (round score)"):
+        stage_start = time.perf_counter()
+        with profiler.span("build") as span:
+            full_model = initialize_full_model(
+                judges, sparse=sparse, symmetry_breaking=symmetry_breaking
+            )
+            round_sum_maximization = sum(
+                round_objective(
+                    full_model["index"].round_vars(round_name), judge_grades
+                )
+                for round_name in ROUND_ORDER
+            )
+            full_model["model"].Maximize(round_sum_maximization)
+            if profiler.enabled:
+                span["index_memory_mb"] = python_size_mb(full_model)
+        with profiler.span("greedy"):
+            greedy_schedule = assign_judges(judges)
+            add_schedule_hint(full_model, greedy_schedule)
+        stage_1_report = StageReport(
+            name="Stage 1 (round score)",
+            build_time=time.perf_counter() - stage_start,
+        )
+        reports.append(stage_1_report)
+        result = solve_model(
+            full_model,
+            judges,
+            max_time_per_stage,
+            report=stage_1_report,
+            config=solver_config,
+            progress_path=progress_path,
+            profiler=profiler,
+        )
+    if result is None:
+        print("Falling back to the greedy schedule")
+        stage_1_report.fallback = "greedy"
+        solved_schedule = greedy_schedule
+    else:
+        solved_schedule, _ = result
 
     judges_by_round = defaultdict(set)
     for round_name in solved_schedule:
@@ -90,59 +495,427 @@ def create_schedule(
             for judge in solved_schedule[round_name][courtroom]:
                 judges_by_round[round_name].add(judge["name"])
 
-    full_model = initialize_full_model(judges)
-    for round_name in full_model["vars_by_round_judge_courtroom"]:
-        for judge_name in full_model["vars_by_round_judge_courtroom"][round_name]:
-            if judge_name in judges_by_round[round_name]:
+    with profiler.span("Stage 2 (deviation)", warm_start=warm_start):
+        stage_start = time.perf_counter()
+        with profiler.span("build") as span:
+            if warm_start:
+                full_model["model"].ClearObjective()
+                add_schedule_hint(full_model, solved_schedule)
+            else:
+                full_model = initialize_full_model(
+                    judges, sparse=sparse, symmetry_breaking=symmetry_breaking
+                )
+            for round_name in ROUND_ORDER:
+                for judge_name in judges_by_round[round_name]:
+                    judge_vars = full_model["index"].judge_round_vars(
+                        judge_name, round_name
+                    )
+                    if judge_vars:
+                        full_model["model"].Add(sum(judge_vars.values()) == 1)
+            deviation_from_average_round_score_vars = get_deviation_vars(
+                judge_grades,
+                full_model["model"],
+                full_model["index"],
+                fairness_mode=fairness_mode,
+                num_breakpoints=num_breakpoints,
+            )
+            deviation_minimization = sum(
+                deviation_from_average_round_score_vars.values()
+            )
+            full_model["model"].Minimize(deviation_minimization)
+            if warm_start and bound_with_hint:
+                # The hinted stage-1 assignment satisfies the stage-2 constraints,
+                # so its deviation is a valid upper bound on the stage-2 optimum.
                 full_model["model"].Add(
-                    sum(
-                        full_model["vars_by_round_judge_courtroom"][round_name][
-                            judge_name
-                        ].values()
+                    deviation_minimization
+                    <= schedule_deviation(
+                        solved_schedule, fairness_mode, num_breakpoints
                     )
-                    == 1
                 )
-    deviation_from_average_round_score_vars = get_deviation_vars(
-        judge_grades, full_model["model"], full_model["vars_by_round_courtroom_judge"]
-    )
-    deviation_minimization = sum(deviation_from_average_round_score_vars.values())
-    full_model["model"].Minimize(deviation_minimization)
-    solved_schedule, dev_objective = solve_model(
-        full_model, judges, max_time_in_seconds=max_time_per_stage
-    )
+            if profiler.enabled:
+                span["index_memory_mb"] = python_size_mb(full_model)
+        if warm_start:
+            with profiler.span("complete hint"):
+                complete_hint(full_model["model"])
+        stage_2_report = StageReport(
+            name="Stage 2 (deviation)",
+            warm_start=warm_start,
+            build_time=time.perf_counter() - stage_start,
+        )
+        reports.append(stage_2_report)
+        result = solve_model(
+            full_model,
+            judges,
+            max_time_in_seconds=max_time_per_stage,
+            report=stage_2_report,
+            config=solver_config,
+            progress_path=progress_path,
+            profiler=profiler,
+        )
+    if result is None:
+        print("Keeping the stage-1 schedule")
+        stage_2_report.fallback = "stage-1"
+    else:
+        solved_schedule, _ = result
 
-    # full_model = initialize_full_model(judges)
-    # setup_judge_movement_optimization(
-    #     full_model,
-    #     solved_schedule,
-    #     dev_objective,
-    #     judge_grades,
-    #     [
-    #         "Round 2 (2:00 p.m.)",
-    #         "Round 3 (3:30 p.m.)",
-    #         "Quarterfinals (12:00 noon)",
-    #         "Semifinals (2:15 p.m.)",
-    #     ],
-    # )
-    # judge_movement_minimization = judge_movement_objective(
-    #     full_model["model"],
-    #     full_model["vars_by_judge_courtroom_round"],
-    #     full_model["vars_by_judge_round_courtroom"],
-    # )
-    # full_model["model"].Minimize(judge_movement_minimization)
-    # mv_optimized_schedule, mv_objective = solve_model(
-    #     full_model, judges, max_time_in_seconds=max_time_per_stage
-    # )
+    if movement_time > 0:
+        with profiler.span("Judge movement"):
+            solved_schedule = minimize_judge_movement(
+                judges,
+                solved_schedule,
+                movement_time,
+                fairness_mode=fairness_mode,
+                num_breakpoints=num_breakpoints,
+                solver_config=solver_config,
+                progress_path=progress_path,
+                reports=reports,
+                profiler=profiler,
+            )
 
+    for report in reports:
+        print(report)
     return solved_schedule
 
 
+def create_schedule_by_round(
+    judges: list[JudgeAvailability],
+    max_time_per_stage: int,
+    solver_config: SolverConfig | None = None,
+    reports: list[StageReport] | None = None,
+    profiler: Profiler | None = None,
+    **schedule_kwargs,
+) -> Schedule:
+    """Run `create_schedule` for every round as an independent sub-problem, with the
+    rounds solved concurrently in a process pool, and merge the results.
+
+    This gives the same optimal schedules as solving all rounds together, as long
+    as no objective links rounds. The judge movement stage does, so it is run on
+    the merged schedule afterwards:
+    - Every constraint of the full model (a judge sits in at most one courtroom
+      per round, a courtroom has at most `MAX_JUDGES_PER_MATCH` judges, the
+      stage-2 requirement that stage-1 judges stay scheduled) mentions the
+      variables of a single round, so the feasible set is the product of the
+      per-round feasible sets.
+    - Both objectives (the round score sum and the deviation sum) are sums of
+      per-round terms, so a product of per-round optima is a global optimum,
+      and vice versa.
+
+    The sub-problems run in other processes, so an enabled `profiler` only sees
+    one span for all of them, with the stage reports of each round attached.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    solver_config = solver_config or SolverConfig()
+    if solver_config.portfolio_size > 1:
+        raise ValueError("Portfolio solving can't be combined with decomposition")
+    # Movement links rounds, so it runs on the merged schedule instead.
+    movement_time = schedule_kwargs.pop("movement_time", 0)
+    # Each sub-problem only knows about its own round, so it can't write a usable
+    # schedule; only the movement search (which sees all rounds) writes progress.
+    progress_path = schedule_kwargs.pop("progress_path", None)
+    if not solver_config.num_workers:
+        # Share the cores between the rounds instead of each using all of them.
+        solver_config = replace(
+            solver_config,
+            num_workers=max(1, (os.cpu_count() or 1) // len(ROUND_ORDER)),
+        )
+    reports = reports if reports is not None else []
+    round_args = [
+        (
+            round_name,
+            [
+                {**judge, "free_slots": [round_name]}
+                for judge in judges
+                if round_name in judge["free_slots"]
+            ],
+            max_time_per_stage,
+            {**schedule_kwargs, "solver_config": solver_config},
+            current_round_config(),
+        )
+        for round_name in ROUND_ORDER
+    ]
+    with (
+        profiler.span("Rounds") as span,
+        multiprocessing.Pool(len(ROUND_ORDER)) as pool,
+    ):
+        round_results = pool.starmap(_create_round_schedule, round_args)
+        span["stages"] = {
+            round_name: [
+                {
+                    "stage": report.name,
+                    "build_time": report.build_time,
+                    "solve_time": report.wall_time,
+                    "status": report.status,
+                    "num_variables": report.num_variables,
+                    "num_constraints": report.num_constraints,
+                }
+                for report in round_reports
+            ]
+            for round_name, (_, round_reports) in zip(
+                ROUND_ORDER, round_results, strict=True
+            )
+        }
+
+    judges_by_name = {judge["name"]: judge for judge in deepcopy(judges)}
+    for judge in judges_by_name.values():
+        judge["grade"] = GRADE_MAPPING[judge["grade"]]
+    schedule = {}
+    for round_name, (courtroom_judges, round_reports) in zip(
+        ROUND_ORDER, round_results, strict=True
+    ):
+        schedule[round_name] = {
+            courtroom: [judges_by_name[name] for name in judge_names]
+            for courtroom, judge_names in courtroom_judges.items()
+        }
+        for report in round_reports:
+            report.name = f"{round_name} — {report.name}"
+        reports.extend(round_reports)
+    if movement_time > 0:
+        with profiler.span("Judge movement"):
+            schedule = minimize_judge_movement(
+                list(judges_by_name.values()),
+                schedule,
+                movement_time,
+                fairness_mode=schedule_kwargs.get("fairness_mode", "squared"),
+                num_breakpoints=schedule_kwargs.get(
+                    "num_breakpoints", NUM_PWL_BREAKPOINTS
+                ),
+                solver_config=solver_config,
+                progress_path=progress_path,
+                reports=reports,
+                profiler=profiler,
+            )
+    return schedule
+
+
+def _create_round_schedule(
+    round_name: Round,
+    round_judges: list[JudgeAvailability],
+    max_time_per_stage: int,
+    schedule_kwargs: dict,
+    round_config: tuple,
+) -> tuple[dict[Courtroom, list[JudgeName]], list[StageReport]]:
+    # Worker processes that weren't forked start with the default rounds.
+    configure_rounds(*round_config)
+    round_reports: list[StageReport] = []
+    round_schedule = create_schedule(
+        round_judges, max_time_per_stage, reports=round_reports, **schedule_kwargs
+    )
+    return {
+        courtroom: [judge["name"] for judge in courtroom_judges]
+        for courtroom, courtroom_judges in round_schedule[round_name].items()
+    }, round_reports
+
+
+def add_schedule_hint(full_model, schedule: Schedule):
+    """Hint every assignment variable with its value in `schedule`."""
+    index = full_model["index"]
+    assigned = np.zeros(index.var_indices.shape, dtype=bool)
+    for round_name, courtrooms in schedule.items():
+        r = index.round_positions.get(round_name)
+        if r is None:
+            continue
+        for courtroom, courtroom_judges in courtrooms.items():
+            if courtroom not in index.courtrooms[round_name]:
+                continue
+            c = index.courtrooms[round_name].index(courtroom)
+            for judge in courtroom_judges:
+                j = index.judge_positions.get(judge["name"])
+                if j is not None:
+                    assigned[j, r, c] = True
+    has_var = index.var_indices >= 0
+    full_model["model"].ClearHints()
+    hint = full_model["model"].Proto().solution_hint
+    hint.vars.extend(index.var_indices[has_var].tolist())
+    hint.values.extend(assigned[has_var].astype(int).tolist())
+
+
+def complete_hint(model: cp_model.CpModel, max_time_in_seconds: float = 5.0) -> bool:
+    """Extend the model's (partial) solution hint to every variable.
+
+    CP-SAT spends a long time repairing hints that leave auxiliary variables (like
+    the deviation terms) unset, so we fix the hinted variables in a copy of the
+    model, let propagation fill in the rest and hint the full solution instead.
+    """
+    hinted_model = model.Clone()
+    hint = hinted_model.Proto().solution_hint
+    for var_index, value in zip(hint.vars, hint.values, strict=True):
+        hinted_model.Add(hinted_model.GetIntVarFromProtoIndex(var_index) == value)
+    hinted_model.ClearHints()
+    hinted_model.ClearObjective()
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    status = solver.Solve(hinted_model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        print("Could not complete the solution hint, keeping the partial hint")
+        return False
+    solution = solver.ResponseProto().solution
+    model.ClearHints()
+    for var_index, value in enumerate(solution):
+        model.AddHint(model.GetIntVarFromProtoIndex(var_index), value)
+    return True
+
+
+def schedule_deviation(
+    schedule: Schedule,
+    fairness_mode: str = "squared",
+    num_breakpoints: int = NUM_PWL_BREAKPOINTS,
+) -> int:
+    """Compute the stage-2 deviation objective of an already-solved schedule, using
+    the same integer arithmetic as `get_deviation_vars`."""
+    total_deviation = 0
+    for round_name, num_matches in MATCHES_PER_ROUND.items():
+        match_scores = [
+            sum(judge["grade"] for judge in schedule.get(round_name, {}).get(c, []))
+            for c in COURTROOM_LETTERS[round_name]
+        ]
+        round_score = sum(match_scores)
+        if fairness_mode == "squared":
+            average_score = round_score // num_matches
+            total_deviation += sum(
+                (score - average_score) ** 2 for score in match_scores
+            )
+        elif fairness_mode == "spread":
+            total_deviation += max(match_scores) - min(match_scores)
+        elif fairness_mode == "l1":
+            total_deviation += sum(
+                abs(num_matches * score - round_score) for score in match_scores
+            )
+        elif fairness_mode == "pwl":
+            max_match_score = (
+                max(GRADE_MAPPING.values()) * MAX_JUDGES_PER_MATCH[round_name]
+            )
+            breakpoints = pwl_breakpoints(
+                max_match_score * num_matches, num_breakpoints
+            )
+            total_deviation += sum(
+                max(
+                    2 * point * abs(num_matches * score - round_score) - point**2
+                    for point in breakpoints
+                )
+                for score in match_scores
+            )
+        else:
+            raise ValueError(f"Unknown fairness mode: {fairness_mode}")
+    return total_deviation
+
+
+def minimize_judge_movement(
+    judges: list[JudgeAvailability],
+    schedule: Schedule,
+    time_budget: float,
+    fairness_mode: str = "squared",
+    num_breakpoints: int = NUM_PWL_BREAKPOINTS,
+    window_size: int = 2,
+    max_time_per_window: float = 10,
+    solver_config: SolverConfig | None = None,
+    progress_path: Path | None = None,
+    reports: list[StageReport] | None = None,
+    profiler: Profiler | None = None,
+) -> Schedule:
+    """Reduce the number of courtroom switches in `schedule` with a rolling large
+    neighbourhood search, without making its deviation objective any worse.
+
+    The solver can't handle the movement objective over all rounds at once, so
+    each step unpins a window of `window_size` adjacent rounds, pins every other
+    assignment to the incumbent, and re-solves the window. The search cycles
+    through the windows until `time_budget` seconds have passed or a full pass
+    over the windows brings no improvement.
+
+    `judges` must already have their grades mapped through `GRADE_MAPPING`.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    judge_grades = {judge["name"]: judge["grade"] for judge in judges}
+    deviation_bound = schedule_deviation(schedule, fairness_mode, num_breakpoints)
+    windows = [
+        ROUND_ORDER[i : i + window_size]
+        for i in range(len(ROUND_ORDER) - window_size + 1)
+    ]
+    best_moves = count_judge_moves(schedule)
+    print(f"Judge movement search starting from {best_moves} courtroom switches")
+    deadline = time.perf_counter() + time_budget
+    windows_without_improvement = 0
+    for window in itertools.cycle(windows):
+        remaining_time = deadline - time.perf_counter()
+        if remaining_time <= 0 or windows_without_improvement >= len(windows):
+            break
+        window_start = time.perf_counter()
+        with profiler.span("build", window=list(window)):
+            full_model = initialize_full_model(judges)
+            setup_judge_movement_optimization(
+                full_model,
+                schedule,
+                deviation_bound,
+                judge_grades,
+                window,
+                fairness_mode=fairness_mode,
+                num_breakpoints=num_breakpoints,
+            )
+            # Only the round pairs touching the window can change.
+            window_pairs = [
+                (r1, r2)
+                for r1, r2 in MOVEMENT_ROUND_PAIRS
+                if r1 in window or r2 in window
+            ]
+            full_model["model"].Minimize(
+                judge_movement_objective(
+                    full_model["model"],
+                    full_model["index"],
+                    round_pairs=window_pairs,
+                )
+            )
+            add_schedule_hint(full_model, schedule)
+            complete_hint(full_model["model"])
+        window_report = StageReport(
+            name=f"Movement ({', '.join(window)})",
+            warm_start=True,
+            build_time=time.perf_counter() - window_start,
+        )
+        if reports is not None:
+            reports.append(window_report)
+        result = solve_model(
+            full_model,
+            judges,
+            max_time_in_seconds=min(max_time_per_window, remaining_time),
+            report=window_report,
+            config=solver_config,
+            progress_path=progress_path,
+            profiler=profiler,
+        )
+        candidate_moves = count_judge_moves(result[0]) if result else best_moves
+        if candidate_moves < best_moves:
+            schedule, best_moves = result[0], candidate_moves
+            windows_without_improvement = 0
+            print(f"Judge movement reduced to {best_moves} courtroom switches")
+        else:
+            windows_without_improvement += 1
+    return schedule
+
+
+def count_judge_moves(schedule: Schedule) -> int:
+    """Count how often a judge switches courtrooms between consecutive rounds."""
+    num_moves = 0
+    for r1, r2 in MOVEMENT_ROUND_PAIRS:
+        courtroom_by_judge = {
+            judge["name"]: courtroom
+            for courtroom, courtroom_judges in schedule.get(r1, {}).items()
+            for judge in courtroom_judges
+        }
+        for courtroom, courtroom_judges in schedule.get(r2, {}).items():
+            for judge in courtroom_judges:
+                previous_courtroom = courtroom_by_judge.get(judge["name"])
+                if previous_courtroom is not None and previous_courtroom != courtroom:
+                    num_moves += 1
+    return num_moves
+
+
 def setup_judge_movement_optimization(
     full_model,
     previous_solved_schedule: Schedule,
     objective: float,
     judge_grades: dict[JudgeName, float],
     unpinned_rounds: list[str],
+    fairness_mode: str = "squared",
+    num_breakpoints: int = NUM_PWL_BREAKPOINTS,
 ):
     for round_name in previous_solved_schedule:
         for courtroom in previous_solved_schedule[round_name]:
@@ -150,52 +923,266 @@ def setup_judge_movement_optimization(
                 j["name"] for j in previous_solved_schedule[round_name][courtroom]
             ]
             for judge_name in judges_in_room:
-                full_model["model"].Add(
-                    sum(
-                        full_model["vars_by_round_judge_courtroom"][round_name][
-                            judge_name
-                        ].values()
-                    )
-                    == 1
+                judge_vars = full_model["index"].judge_round_vars(
+                    judge_name, round_name
                 )
+                full_model["model"].Add(sum(judge_vars.values()) == 1)
                 # Pin all the judge assignments except for the specified
                 # to allow the solver to minimize movement between just some rounds
                 # In a perfect world, we'd leave them all free, but the solver can't
                 # handle that many possibilities (within my lifetime, at least).
                 if round_name not in unpinned_rounds:
-                    full_model["model"].Add(
-                        full_model["vars_by_round_judge_courtroom"][round_name][
-                            judge_name
-                        ][courtroom]
-                        == 1
-                    )
+                    full_model["model"].Add(judge_vars[courtroom] == 1)
 
     deviation_from_average_round_score_vars = get_deviation_vars(
-        judge_grades, full_model["model"], full_model["vars_by_round_courtroom_judge"]
+        judge_grades,
+        full_model["model"],
+        full_model["index"],
+        fairness_mode=fairness_mode,
+        num_breakpoints=num_breakpoints,
     )
     deviation_minimization = sum(deviation_from_average_round_score_vars.values())
     full_model["model"].Add(deviation_minimization <= int(objective))
 
 
-def solve_model(full_model, judges, max_time_in_seconds=10):
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = max_time_in_seconds
-    status = solver.Solve(full_model["model"])
-    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        print(
-            f"Schedule found! Objective value: {solver.ObjectiveValue()} ({solver.StatusName(status)})"
-        )
-        return (
-            get_schedule_from_solution(
-                solver, full_model["vars_by_round_courtroom_judge"], judges
-            ),
-            solver.ObjectiveValue(),
+def solve_model(
+    full_model,
+    judges,
+    max_time_in_seconds=10,
+    report: StageReport | None = None,
+    config: SolverConfig | None = None,
+    progress_path: Path | None = None,
+    profiler: Profiler | None = None,
+):
+    """Solve the model and extract the schedule from the best solution.
+
+    With `progress_path`, every improving solution is written there as a schedule
+    CSV as soon as it is found (portfolio members run in other processes, so
+    their solutions are only available once they finish). With an enabled
+    `profiler`, presolve and solve are traced with the model and search
+    statistics.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    config = config or SolverConfig()
+    if profiler.enabled:
+        with profiler.span("presolve") as span:
+            span["presolve_time"] = time_presolve(
+                full_model["model"], config.parameters(max_time_in_seconds)
+            )
+    with profiler.span("solve") as span:
+        if profiler.enabled:
+            span["model"] = model_statistics(full_model["model"])
+        if config.portfolio_size > 1:
+            result = solve_portfolio(full_model["model"], max_time_in_seconds, config)
+        else:
+
+            def write_progress(progress: SolutionProgress):
+                schedule = get_schedule_from_solution(
+                    progress.Response().solution, full_model["index"], judges
+                )
+                write_atomically(
+                    progress_path,
+                    lambda path: write_schedule_to_csv(schedule, judges, path),
+                )
+
+            result = run_solver(
+                full_model["model"],
+                config.parameters(max_time_in_seconds),
+                on_solution=write_progress if progress_path is not None else None,
+                show_progress=config.show_progress,
+                no_improvement_time=config.no_improvement_time,
+            )
+        span.update(
+            status=result.status,
+            stop_reason=result.stop_reason,
+            objective=result.objective,
+            best_bound=result.best_bound,
+            wall_time=result.wall_time,
+            first_solution_time=result.first_solution_time,
+            search=result.statistics,
         )
+    if report is not None:
+        report.num_variables, report.num_constraints = model_size(full_model["model"])
+        report.status = result.status
+        report.stop_reason = result.stop_reason
+        report.wall_time = result.wall_time
+        report.first_solution_time = result.first_solution_time
+        report.objective = result.objective
+        report.best_bound = result.best_bound
+        report.progress = result.progress
+        report.portfolio = result.portfolio
+        report.process_peak_memory_mb = peak_memory_mb()
+    if result.solution is not None:
+        print(f"Schedule found! Objective value: {result.objective} ({result.status})")
+        with profiler.span("extract"):
+            schedule = get_schedule_from_solution(
+                result.solution,
+                full_model["index"],
+                judges,
+            )
+        return schedule, result.objective
     else:
         print("No schedule found :(")
 
 
-def get_deviation_vars(judge_grades, model, vars_by_round_courtroom_judge):
+def run_solver(
+    model: cp_model.CpModel,
+    parameters,
+    label: str = "",
+    on_solution: Callable[[SolutionProgress], None] | None = None,
+    show_progress: bool = False,
+    no_improvement_time: float = 0.0,
+) -> SolveResult:
+    solver = cp_model.CpSolver()
+    solver.parameters.CopyFrom(parameters)
+    progress = SolutionProgress(on_solution, verbose=show_progress)
+    with stop_when_stalled(solver, progress, no_improvement_time) as stalled:
+        status = solver.Solve(model, progress)
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    objective = solver.ObjectiveValue() if found else None
+    best_bound = solver.BestObjectiveBound() if found else None
+    return SolveResult(
+        label=label,
+        status=solver.StatusName(status),
+        objective=objective,
+        best_bound=best_bound,
+        wall_time=solver.WallTime(),
+        first_solution_time=progress.first_solution_time,
+        solution=list(solver.ResponseProto().solution) if found else None,
+        progress=progress.points,
+        statistics=response_statistics(solver.ResponseProto()),
+        stop_reason=get_stop_reason(
+            solver.StatusName(status),
+            objective,
+            best_bound,
+            parameters,
+            stalled.is_set(),
+        ),
+    )
+
+
+def get_stop_reason(
+    status: str,
+    objective: float | None,
+    best_bound: float | None,
+    parameters: sat_parameters_pb2.SatParameters,
+    stalled: bool,
+) -> str:
+    """Explain why a solve ended, from its outcome and the limits it was run with."""
+    if stalled:
+        return "no improvement"
+    if status == "OPTIMAL":
+        # CP-SAT also reports OPTIMAL once a gap limit is reached.
+        if objective is None or best_bound is None or objective == best_bound:
+            return "optimal"
+        if (
+            parameters.relative_gap_limit > 0
+            and relative_gap(objective, best_bound) <= parameters.relative_gap_limit
+        ):
+            return "relative gap limit"
+        return "absolute gap limit"
+    if status in ("INFEASIBLE", "MODEL_INVALID"):
+        return status.lower().replace("_", " ")
+    return "time limit"
+
+
+def _run_serialized_solver(args: tuple[bytes, bytes, str, float]) -> SolveResult:
+    model_proto, parameters, label, no_improvement_time = args
+    model = cp_model.CpModel()
+    model.Proto().ParseFromString(model_proto)
+    solver_parameters = sat_parameters_pb2.SatParameters()
+    solver_parameters.ParseFromString(parameters)
+    return run_solver(
+        model, solver_parameters, label, no_improvement_time=no_improvement_time
+    )
+
+
+def solve_portfolio(
+    model: cp_model.CpModel, max_time_in_seconds: float, config: SolverConfig
+) -> SolveResult:
+    """Race `config.portfolio_size` differently seeded and parameterized solves of
+    the same model in separate processes and keep the best solution. As soon as
+    one member proves optimality, the others are stopped."""
+    model_proto = model.Proto().SerializeToString()
+    member_args = [
+        (
+            model_proto,
+            config.parameters(max_time_in_seconds, member).SerializeToString(),
+            config.member_label(member),
+            config.no_improvement_time,
+        )
+        for member in range(config.portfolio_size)
+    ]
+    members = []
+    start = time.perf_counter()
+    # Leaving the context terminates any members that are still running.
+    with multiprocessing.Pool(config.portfolio_size) as pool:
+        for member in pool.imap_unordered(_run_serialized_solver, member_args):
+            print(f"  {member}")
+            members.append(member)
+            if member.status == "OPTIMAL":
+                break
+    wall_time = time.perf_counter() - start
+    if len(members) < len(member_args):
+        print(f"  Stopped {len(member_args) - len(members)} unfinished solves")
+
+    solved = [m for m in members if m.solution is not None]
+    maximize = model.Proto().objective.scaling_factor < 0
+    best = (
+        (max if maximize else min)(solved, key=lambda m: m.objective)
+        if solved
+        else members[0]
+    )
+    first_solution_times = [
+        m.first_solution_time for m in members if m.first_solution_time is not None
+    ]
+    return SolveResult(
+        label=best.label,
+        status=(
+            "OPTIMAL" if any(m.status == "OPTIMAL" for m in members) else best.status
+        ),
+        objective=best.objective,
+        best_bound=best.best_bound,
+        wall_time=wall_time,
+        first_solution_time=min(first_solution_times, default=None),
+        solution=best.solution,
+        progress=best.progress,
+        portfolio=members,
+        statistics=best.statistics,
+        # The race ends early when a member proves its solution good enough.
+        stop_reason=(
+            members[-1].stop_reason
+            if members[-1].status == "OPTIMAL"
+            else best.stop_reason
+        ),
+    )
+
+
+def model_size(model: cp_model.CpModel) -> tuple[int, int]:
+    """Return the number of variables and constraints in the model."""
+    proto = model.Proto()
+    return len(proto.variables), len(proto.constraints)
+
+
+def get_deviation_vars(
+    judge_grades,
+    model,
+    index: AssignmentIndex,
+    fairness_mode="squared",
+    num_breakpoints: int = NUM_PWL_BREAKPOINTS,
+):
+    """Create a variable per round measuring how unevenly panel scores are spread
+    across the round's courtrooms, according to `fairness_mode`:
+
+    - "squared": sum of squared deviations from the (integer) average score.
+    - "l1": sum of absolute deviations from the average.
+    - "spread": difference between the best and worst panel score.
+    - "pwl": piecewise-linear approximation of the squared deviation, from its
+      tangents at `num_breakpoints` points (see `pwl_breakpoints`).
+
+    The linear modes compare `num_matches * score` with the round total instead of
+    dividing the total, so they need no division or multiplication constraints.
+    """
     deviation_from_average_round_score_vars = {}
     for round_name, num_matches in MATCHES_PER_ROUND.items():
         max_match_score = max(GRADE_MAPPING.values()) * MAX_JUDGES_PER_MATCH[round_name]
@@ -204,54 +1191,39 @@ def get_deviation_vars(judge_grades, model, vars_by_round_courtroom_judge):
             max_match_score * num_matches,
             f"Total score for {round_name}",
         )
-        model.Add(
-            sum_round_score_var
-            == sum(
-                match_objective(match, judge_grades)
-                for match in vars_by_round_courtroom_judge[round_name].values()
-            )
-        )
-        average_round_score_var = model.NewIntVar(
-            0,
-            max_match_score,
-            f"Average score for {round_name}",
-        )
-        # We need to use CpModel.AddDivisionEquality for the average
-        model.AddDivisionEquality(
-            average_round_score_var,
-            sum_round_score_var,
-            num_matches,
-        )
-        deviation_vars = [
-            model.NewIntVar(
-                0,
-                max_match_score**2,
-                f"Deviation from average for {round_name} — {courtroom}",
-            )
+        match_scores = [
+            match_objective(index.match_vars(round_name, courtroom), judge_grades)
             for courtroom in COURTROOM_LETTERS[round_name]
         ]
-        for dev_var, match in zip(
-            deviation_vars,
-            vars_by_round_courtroom_judge[round_name].values(),
-            strict=False,
-        ):
-            variance = match_objective(match, judge_grades) - average_round_score_var
-            # We have to add this mediating abs variable because AddMultiplicationEquality
-            # blows up if we try to multiply negative numbers
-            abs_variance = model.NewIntVar(
-                0,
-                max_match_score**2,
-                f"Absolute variance from average for {random.random()}",
+        model.Add(sum_round_score_var == sum(match_scores))
+        if fairness_mode == "squared":
+            deviation_vars = squared_deviation_vars(
+                model, round_name, match_scores, sum_round_score_var, max_match_score
             )
-            model.AddAbsEquality(abs_variance, variance)
-            model.AddMultiplicationEquality(
-                dev_var,
-                abs_variance,
-                abs_variance,
+            max_deviation = max_match_score**2 * num_matches
+        elif fairness_mode == "spread":
+            deviation_vars = [
+                spread_var(model, round_name, match_scores, max_match_score)
+            ]
+            max_deviation = max_match_score
+        elif fairness_mode in ("l1", "pwl"):
+            deviation_vars = scaled_deviation_vars(
+                model,
+                round_name,
+                match_scores,
+                sum_round_score_var,
+                max_match_score,
+                squared=fairness_mode == "pwl",
+                num_breakpoints=num_breakpoints,
             )
+            max_deviation = (max_match_score * num_matches) ** (
+                2 if fairness_mode == "pwl" else 1
+            ) * num_matches
+        else:
+            raise ValueError(f"Unknown fairness mode: {fairness_mode}")
         deviation_from_average_round_score_vars[round_name] = model.NewIntVar(
             0,
-            max_match_score**2 * num_matches,
+            max_deviation,
             f"Deviation from average for {round_name}",
         )
         model.Add(
@@ -260,56 +1232,241 @@ def get_deviation_vars(judge_grades, model, vars_by_round_courtroom_judge):
     return deviation_from_average_round_score_vars
 
 
-def initialize_full_model(judges):
+def squared_deviation_vars(
+    model, round_name, match_scores, sum_round_score_var, max_match_score
+):
+    num_matches = len(match_scores)
+    average_round_score_var = model.NewIntVar(
+        0,
+        max_match_score,
+        f"Average score for {round_name}",
+    )
+    # We need to use CpModel.AddDivisionEquality for the average
+    model.AddDivisionEquality(
+        average_round_score_var,
+        sum_round_score_var,
+        num_matches,
+    )
+    deviation_vars = [
+        model.NewIntVar(
+            0,
+            max_match_score**2,
+            f"Deviation from average for {round_name} — {courtroom}",
+        )
+        for courtroom in COURTROOM_LETTERS[round_name]
+    ]
+    for dev_var, match_score in zip(deviation_vars, match_scores, strict=True):
+        variance = match_score - average_round_score_var
+        # We have to add this mediating abs variable because AddMultiplicationEquality
+        # blows up if we try to multiply negative numbers
+        abs_variance = model.NewIntVar(
+            0,
+            max_match_score**2,
+            f"Absolute variance from average for {random.random()}",
+        )
+        model.AddAbsEquality(abs_variance, variance)
+        model.AddMultiplicationEquality(
+            dev_var,
+            abs_variance,
+            abs_variance,
+        )
+    return deviation_vars
+
+
+def scaled_deviation_vars(
+    model,
+    round_name,
+    match_scores,
+    sum_round_score_var,
+    max_match_score,
+    squared: bool,
+    num_breakpoints: int = NUM_PWL_BREAKPOINTS,
+):
+    """Deviations of `num_matches * score` from the round total, either as absolute
+    values or (with `squared`) as a tangent-line approximation of their squares."""
+    num_matches = len(match_scores)
+    max_deviation = max_match_score * num_matches
+    deviation_vars = []
+    for courtroom, match_score in zip(
+        COURTROOM_LETTERS[round_name], match_scores, strict=True
+    ):
+        abs_deviation = model.NewIntVar(
+            0,
+            max_deviation,
+            f"Scaled deviation from average for {round_name} — {courtroom}",
+        )
+        model.AddAbsEquality(
+            abs_deviation, num_matches * match_score - sum_round_score_var
+        )
+        if not squared:
+            deviation_vars.append(abs_deviation)
+            continue
+        approx_square = model.NewIntVar(
+            0,
+            max_deviation**2,
+            f"Approximate squared deviation for {round_name} — {courtroom}",
+        )
+        # x² is convex, so it is bounded below by its tangents; minimizing the
+        # approximation pushes it onto the highest tangent at `abs_deviation`.
+        for point in pwl_breakpoints(max_deviation, num_breakpoints):
+            model.Add(approx_square >= 2 * point * abs_deviation - point**2)
+        deviation_vars.append(approx_square)
+    return deviation_vars
+
+
+def spread_var(model, round_name, match_scores, max_match_score):
+    best_score = model.NewIntVar(0, max_match_score, f"Best score for {round_name}")
+    worst_score = model.NewIntVar(0, max_match_score, f"Worst score for {round_name}")
+    model.AddMaxEquality(best_score, match_scores)
+    model.AddMinEquality(worst_score, match_scores)
+    spread = model.NewIntVar(0, max_match_score, f"Score spread for {round_name}")
+    model.Add(spread == best_score - worst_score)
+    return spread
+
+
+def pwl_breakpoints(
+    max_value: int, num_breakpoints: int = NUM_PWL_BREAKPOINTS
+) -> list[int]:
+    """Tangent points for approximating x² on [0, `max_value`].
+
+    Realistic deviations are a small fraction of the largest possible one, so
+    the points after 0 grow geometrically from 1 to `max_value`: small
+    deviations get tangents close to them instead of falling flat below the
+    first point, and every deviation is within a constant factor of a point.
+    """
+    if num_breakpoints < 3:
+        raise ValueError("The approximation needs at least 3 breakpoints")
+    return sorted(
+        {0}
+        | {
+            round(max(1, max_value) ** (i / (num_breakpoints - 2)))
+            for i in range(num_breakpoints - 1)
+        }
+    )
+
+
+def initialize_full_model(
+    judges, sparse: bool = True, symmetry_breaking: str | None = None
+):
+    """Build the assignment model shared by every stage.
+
+    With `sparse`, variables are only created for rounds a judge is free for, so
+    the `index` (an `AssignmentIndex`) has no entries for unavailable judges. The
+    dense builder creates every judge × round × courtroom variable and fixes the
+    unavailable ones to 0.
+
+    `symmetry_breaking` (one of `SYMMETRY_BREAKING_MODES`) adds constraints that
+    pick one of the equivalent courtroom permutations of each round. Only use it
+    for objectives that don't care which courtroom a panel sits in; the judge
+    movement objective does, so its model must be built without it.
+    """
     model = cp_model.CpModel()
-    # Vars by judge and then round
-    vars_by_judge_round_courtroom = defaultdict(lambda: defaultdict(dict))
-    # Vars by round and then courtroom
-    vars_by_round_courtroom_judge = defaultdict(lambda: defaultdict(dict))
-    vars_by_judge_courtroom_round = defaultdict(lambda: defaultdict(dict))
-    vars_by_round_judge_courtroom = defaultdict(lambda: defaultdict(dict))
-    for judge in judges:
-        for round_name in ROUND_ORDER:
-            for courtroom in COURTROOM_LETTERS[round_name]:
+    var_indices = np.full(
+        (len(judges), len(ROUND_ORDER), max(MATCHES_PER_ROUND.values(), default=0)),
+        -1,
+        dtype=np.int32,
+    )
+    variables = {}
+    for j, judge in enumerate(judges):
+        for r, round_name in enumerate(ROUND_ORDER):
+            if sparse and round_name not in judge["free_slots"]:
+                continue
+            judge_round_vars = []
+            for c, courtroom in enumerate(COURTROOM_LETTERS[round_name]):
                 # A variable that represents whether a judge is in a courtroom in a given round.
                 curr_var = model.NewBoolVar(
                     f"{judge['name']} in {round_name} — {courtroom}"
                 )
                 if round_name not in judge["free_slots"]:
                     model.Add(curr_var == 0)
-                vars_by_judge_round_courtroom[judge["name"]][round_name][courtroom] = (
-                    curr_var
-                )
-                vars_by_round_courtroom_judge[round_name][courtroom][judge["name"]] = (
-                    curr_var
-                )
-                vars_by_judge_courtroom_round[judge["name"]][courtroom][round_name] = (
-                    curr_var
-                )
-                vars_by_round_judge_courtroom[round_name][judge["name"]][courtroom] = (
-                    curr_var
-                )
+                var_indices[j, r, c] = curr_var.Index()
+                variables[curr_var.Index()] = curr_var
+                judge_round_vars.append(curr_var)
             # A judge can be in one courtroom per round at most.
-            model.AddAtMostOne(
-                vars_by_judge_round_courtroom[judge["name"]][round_name].values()
-            )
-    for round_name, limit in MAX_JUDGES_PER_MATCH.items():
-        for courtroom in COURTROOM_LETTERS[round_name]:
+            model.AddAtMostOne(judge_round_vars)
+    index = AssignmentIndex(
+        judge_names=[judge["name"] for judge in judges],
+        round_names=list(ROUND_ORDER),
+        courtrooms={r: list(COURTROOM_LETTERS[r]) for r in ROUND_ORDER},
+        var_indices=var_indices,
+        variables=variables,
+    )
+    for r, round_name in enumerate(ROUND_ORDER):
+        limit = MAX_JUDGES_PER_MATCH[round_name]
+        for c in range(len(COURTROOM_LETTERS[round_name])):
+            courtroom_var_indices = var_indices[:, r, c]
+            courtroom_vars = [
+                variables[i] for i in courtroom_var_indices[courtroom_var_indices >= 0]
+            ]
+            if not courtroom_vars:
+                continue
             # A courtroom can have at most `limit` judges for a round.
-            model.Add(
-                sum(vars_by_round_courtroom_judge[round_name][courtroom].values())
-                <= limit
-            )
+            model.Add(sum(courtroom_vars) <= limit)
+    if symmetry_breaking == "score":
+        add_score_ordering(model, index, judges)
+    elif symmetry_breaking == "index":
+        add_judge_index_precedence(model, index, judges)
+    elif symmetry_breaking is not None:
+        raise ValueError(f"Unknown symmetry breaking mode: {symmetry_breaking}")
     full_model = {
         "model": model,
-        "vars_by_judge_round_courtroom": vars_by_judge_round_courtroom,
-        "vars_by_round_courtroom_judge": vars_by_round_courtroom_judge,
-        "vars_by_judge_courtroom_round": vars_by_judge_courtroom_round,
-        "vars_by_round_judge_courtroom": vars_by_round_judge_courtroom,
+        "index": index,
     }
     return full_model
 
 
+def add_score_ordering(model, index: AssignmentIndex, judges):
+    """Require panel scores to be non-increasing from courtroom A onwards."""
+    judge_grades = {judge["name"]: judge["grade"] for judge in judges}
+    for round_name in ROUND_ORDER:
+        match_scores = [
+            match_objective(index.match_vars(round_name, courtroom), judge_grades)
+            for courtroom in COURTROOM_LETTERS[round_name]
+        ]
+        for score, next_score in itertools.pairwise(match_scores):
+            model.Add(score >= next_score)
+
+
+def add_judge_index_precedence(model, index: AssignmentIndex, judges):
+    """Order each round's courtrooms by the lowest-indexed judge they contain.
+
+    A judge may only sit in a courtroom if an earlier judge sits in the previous
+    courtroom, which leaves exactly one labelling of every set of panels.
+    """
+    for round_name in ROUND_ORDER:
+        round_vars = index.round_vars(round_name)
+        round_judges = [
+            judge["name"]
+            for judge in judges
+            if any(judge["name"] in round_vars.get(c, {}) for c in round_vars)
+        ]
+        for prev_courtroom, courtroom in itertools.pairwise(
+            COURTROOM_LETTERS[round_name]
+        ):
+            prev_vars = round_vars.get(prev_courtroom, {})
+            curr_vars = round_vars.get(courtroom, {})
+            # Whether any judge before the current one sits in the previous courtroom
+            prev_used = None
+            for judge_name in round_judges:
+                if judge_name in curr_vars:
+                    if prev_used is None:
+                        model.Add(curr_vars[judge_name] == 0)
+                    else:
+                        model.AddImplication(curr_vars[judge_name], prev_used)
+                if judge_name not in prev_vars:
+                    continue
+                next_prev_used = model.NewBoolVar(
+                    f"{prev_courtroom} used in {round_name} by {judge_name} or earlier"
+                )
+                earlier = [prev_vars[judge_name]] + (
+                    [prev_used] if prev_used is not None else []
+                )
+                model.AddBoolOr(earlier).OnlyEnforceIf(next_prev_used)
+                for literal in earlier:
+                    model.AddImplication(literal, next_prev_used)
+                prev_used = next_prev_used
+
+
 def round_objective(
     round_vars: dict[Courtroom, dict[JudgeName, cp_model.IntVar]],
     judge_grades: dict[JudgeName, float],
@@ -325,18 +1482,18 @@ def match_objective(
 
 def judge_movement_objective(
     model: cp_model.CpModel,
-    vars_by_judge_courtroom_round: dict[
-        JudgeName, dict[Courtroom, dict[Round, cp_model.IntVar]]
-    ],
-    vars_by_judge_round_courtroom: dict[
-        JudgeName, dict[Round, dict[Courtroom, cp_model.IntVar]]
-    ],
+    index: AssignmentIndex,
+    round_pairs: list[tuple[Round, Round]] | None = None,
 ):
     judge_movement_vars = []
-    for judge in vars_by_judge_courtroom_round:
-        for r1, r2 in zip(ROUND_ORDER, ROUND_ORDER[1:], strict=False):
-            if r1 == "Round 3 (2:00 p.m.)" and r2 == "Round of 16 (10:45 a.m.)":
-                # This is across a day boundary, so we don't care about switching
+    for judge in index.judge_names:
+        for r1, r2 in round_pairs or MOVEMENT_ROUND_PAIRS:
+            judge_round_vars = {
+                r1: index.judge_round_vars(judge, r1),
+                r2: index.judge_round_vars(judge, r2),
+            }
+            if not judge_round_vars[r1] or not judge_round_vars[r2]:
+                # The judge isn't available for both rounds, so they can't switch
                 continue
             judge_switches_courtrooms = model.NewBoolVar(
                 f"{judge} in {r1} and {r2} and in different courtrooms"
@@ -346,32 +1503,26 @@ def judge_movement_objective(
             # First, the judge has to be in both rounds
             both_rounds_aux_var = model.NewBoolVar(f"{judge} in {r1} and {r2}")
             model.Add(
-                sum(vars_by_judge_round_courtroom[judge][r1].values())
-                + sum(vars_by_judge_round_courtroom[judge][r2].values())
+                sum(judge_round_vars[r1].values()) + sum(judge_round_vars[r2].values())
                 >= 2
             ).OnlyEnforceIf(both_rounds_aux_var)
             model.Add(
-                sum(vars_by_judge_round_courtroom[judge][r1].values())
-                + sum(vars_by_judge_round_courtroom[judge][r2].values())
+                sum(judge_round_vars[r1].values()) + sum(judge_round_vars[r2].values())
                 < 2
             ).OnlyEnforceIf(both_rounds_aux_var.Not())
             requirements_for_switch.append(both_rounds_aux_var)
 
             # Second, the judge has to be in different courtrooms
-            for courtroom in set(vars_by_judge_round_courtroom[judge][r1]) & set(
-                vars_by_judge_round_courtroom[judge][r2]
-            ):
+            for courtroom in set(judge_round_vars[r1]) & set(judge_round_vars[r2]):
                 different_courtrooms_aux_var = model.NewBoolVar(
                     f"{judge} in {r1} and {r2} and in different courtrooms ({courtroom})"
                 )
                 model.Add(
-                    vars_by_judge_round_courtroom[judge][r1][courtroom]
-                    + vars_by_judge_round_courtroom[judge][r2][courtroom]
+                    judge_round_vars[r1][courtroom] + judge_round_vars[r2][courtroom]
                     <= 1
                 ).OnlyEnforceIf(different_courtrooms_aux_var)
                 model.Add(
-                    vars_by_judge_round_courtroom[judge][r1][courtroom]
-                    + vars_by_judge_round_courtroom[judge][r2][courtroom]
+                    judge_round_vars[r1][courtroom] + judge_round_vars[r2][courtroom]
                     > 1
                 ).OnlyEnforceIf(different_courtrooms_aux_var.Not())
                 requirements_for_switch.append(different_courtrooms_aux_var)
@@ -386,24 +1537,26 @@ def judge_movement_objective(
 
 
 def get_schedule_from_solution(
-    solver: cp_model.CpSolver,
-    vars_by_round_courtroom_judge: dict[
-        Round, dict[Courtroom, dict[JudgeName, cp_model.IntVar]]
-    ],
+    solution: list[int],
+    index: AssignmentIndex,
     judges: list[JudgeAvailability],
 ) -> Schedule:
+    """Build the schedule from a solution (the value of every model variable, e.g.
+    from the solver response)."""
+    assignments = index.assignments(solution)
+    judges_by_name = {judge["name"]: judge for judge in judges}
     schedule = {}
-    for round_name in vars_by_round_courtroom_judge:
+    for r, round_name in enumerate(index.round_names):
         schedule[round_name] = {}
-        for courtroom in vars_by_round_courtroom_judge[round_name]:
-            schedule[round_name][courtroom] = []
-            for judge in judges:
-                judge_var = vars_by_round_courtroom_judge[round_name][courtroom].get(
-                    judge["name"]
-                )
-                if judge_var is not None and solver.Value(judge_var):
-                    schedule[round_name][courtroom].append(judge)
-            schedule[round_name][courtroom].sort(key=lambda j: j["grade"], reverse=True)
+        for c, courtroom in enumerate(index.courtrooms[round_name]):
+            schedule[round_name][courtroom] = sorted(
+                (
+                    judges_by_name[index.judge_names[j]]
+                    for j in np.flatnonzero(assignments[:, r, c])
+                ),
+                key=lambda j: j["grade"],
+                reverse=True,
+            )
     return schedule
 
 
@@ -480,6 +1633,40 @@ def write_schedule_to_csv(
             writer.writerow([])
 
 
+def read_schedule_from_csv(
+    filename: Path,
+) -> tuple[dict[Round, dict[Courtroom, list[JudgeName]]], dict[Round, list[JudgeName]]]:
+    """Read a schedule written by `write_schedule_to_csv`.
+
+    Returns the judge names assigned to each courtroom, and the names listed as
+    unscheduled, per round.
+    """
+    assignments: dict[Round, dict[Courtroom, list[JudgeName]]] = {}
+    unscheduled: dict[Round, list[JudgeName]] = {}
+    with open(filename) as f:
+        rows = iter(csv.reader(f))
+        for row in rows:
+            if len(row) != 1 or row[0] not in MATCHES_PER_ROUND:
+                continue
+            round_name = row[0]
+            # The header lists the courtrooms, then a single "Unscheduled" column
+            # even though the unscheduled judges may spill over several columns.
+            courtrooms = next(rows)[:-1]
+            assignments[round_name] = {courtroom: [] for courtroom in courtrooms}
+            unscheduled[round_name] = []
+            for judge_row in rows:
+                if not any(judge_row):
+                    break
+                for i, name in enumerate(judge_row):
+                    if not name:
+                        continue
+                    if i < len(courtrooms):
+                        assignments[round_name][courtrooms[i]].append(JudgeName(name))
+                    else:
+                        unscheduled[round_name].append(JudgeName(name))
+    return assignments, unscheduled
+
+
 def print_judge_summary(judges: list[JudgeAvailability]) -> str:
     """Outputs the number of available judges for each round
 
@@ -528,13 +1715,143 @@ def write_unscheduled_to_csv(
     default=30,
     help="Maximum time (in seconds) to spend on each stage of the optimization",
 )
-def main(max_time_per_stage):
-    judges = get_judge_data()
+@click.option(
+    "--warm_start/--cold_start",
+    default=True,
+    help="Reuse the stage-1 model and solution as a hint for stage 2",
+)
+@click.option(
+    "--sparse/--dense",
+    default=True,
+    help="Only create assignment variables for rounds a judge is free for",
+)
+@click.option(
+    "--fairness_mode",
+    type=click.Choice(FAIRNESS_MODES),
+    default="squared",
+    help="How to measure the imbalance of panel scores within a round",
+)
+@click.option(
+    "--num_breakpoints",
+    default=NUM_PWL_BREAKPOINTS,
+    help="Number of tangent points approximating the squared deviation (pwl mode)",
+)
+@click.option(
+    "--symmetry_breaking",
+    type=click.Choice([*SYMMETRY_BREAKING_MODES, "none"]),
+    default="none",
+    help="How to prune equivalent courtroom permutations within a round",
+)
+@click.option(
+    "--num_workers",
+    "-w",
+    default=0,
+    help="Number of CP-SAT search workers (0 uses one per core)",
+)
+@click.option(
+    "--portfolio_size",
+    "-p",
+    default=1,
+    help="Number of differently seeded solves to race in parallel per stage",
+)
+@click.option("--seed", default=0, help="Random seed for the solver")
+@click.option("--log_search", is_flag=True, help="Print CP-SAT search logs")
+@click.option(
+    "--relative_gap",
+    default=0.0,
+    help="Stop a stage once its objective is within this fraction of the bound",
+)
+@click.option(
+    "--absolute_gap",
+    default=0.0,
+    help="Stop a stage once its objective is within this distance of the bound",
+)
+@click.option(
+    "--no_improvement_time",
+    default=0.0,
+    help="Stop a stage after this many seconds without a better solution",
+)
+@click.option(
+    "--show_progress",
+    is_flag=True,
+    help="Print the objective, bound and gap of every improving solution",
+)
+@click.option(
+    "--write_progress",
+    is_flag=True,
+    help="Write every improving schedule to the output CSV as soon as it's found",
+)
+@click.option(
+    "--decompose",
+    is_flag=True,
+    help="Solve every round as an independent sub-problem, in parallel",
+)
+@click.option(
+    "--movement_time",
+    default=0,
+    help="Time (in seconds) to spend reducing judge courtroom switches afterwards",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help=f"Write a JSON trace of time spent and model sizes to {_PROFILE_PATH.name}",
+)
+def main(
+    max_time_per_stage,
+    warm_start,
+    sparse,
+    fairness_mode,
+    num_breakpoints,
+    symmetry_breaking,
+    num_workers,
+    portfolio_size,
+    seed,
+    log_search,
+    relative_gap,
+    absolute_gap,
+    no_improvement_time,
+    decompose,
+    movement_time,
+    show_progress,
+    write_progress,
+    profile,
+):
+    profiler = Profiler("scheduler.judge.sat", enabled=profile)
+    with profiler.span("load") as span:
+        judges = get_judge_data()
+        span["num_judges"] = len(judges)
     print(print_judge_summary(judges))
-    schedule = create_schedule(judges, max_time_per_stage=max_time_per_stage)
+    with profiler.span("schedule"):
+        schedule = (create_schedule_by_round if decompose else create_schedule)(
+            judges,
+            max_time_per_stage=max_time_per_stage,
+            warm_start=warm_start,
+            sparse=sparse,
+            fairness_mode=fairness_mode,
+            num_breakpoints=num_breakpoints,
+            symmetry_breaking=(
+                None if symmetry_breaking == "none" else symmetry_breaking
+            ),
+            solver_config=SolverConfig(
+                num_workers=num_workers,
+                random_seed=seed,
+                portfolio_size=portfolio_size,
+                log_search_progress=log_search,
+                show_progress=show_progress,
+                relative_gap_limit=relative_gap,
+                absolute_gap_limit=absolute_gap,
+                no_improvement_time=no_improvement_time,
+            ),
+            movement_time=movement_time,
+            progress_path=_SCHEDULE_PATH if write_progress else None,
+            profiler=profiler,
+        )
     print(pretty_print_schedule(schedule))
-    write_schedule_to_csv(schedule, judges, _SCHEDULE_PATH)
-    write_unscheduled_to_csv(schedule, judges, _UNSCHEDULED_PATH)
+    with profiler.span("export"):
+        write_schedule_to_csv(schedule, judges, _SCHEDULE_PATH)
+        write_unscheduled_to_csv(schedule, judges, _UNSCHEDULED_PATH)
+    if profile:
+        profiler.write(_PROFILE_PATH)
 
 
 if __name__ == "__main__":
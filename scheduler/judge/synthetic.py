@@ -0,0 +1,88 @@
+import math
+import random
+
+from scheduler.judge.load_data import JudgeAvailability, JudgeName, Slot
+from scheduler.judge.sat import GRADE_MAPPING, Round
+
+ELIMINATION_ROUNDS = [
+    ("Octofinals", 8, 3),
+    ("Quarterfinals", 4, 5),
+    ("Semifinals", 2, 5),
+    ("Final", 1, 7),
+]
+# Roughly how grades were distributed on past judge sheets, best grade first
+GRADE_WEIGHTS = [0.15, 0.25, 0.3, 0.2, 0.1]
+JUDGES_PER_PRELIMINARY_MATCH = 3
+
+
+def generate_rounds(
+    num_rounds: int, num_judges: int, max_slots_per_judge: int = 4
+) -> tuple[dict[Round, int], dict[Round, int], list[tuple[Round, Round]]]:
+    """Generate a round structure shaped like a real tournament: preliminary rounds
+    with enough courtrooms for the expected number of free judges, followed by
+    elimination rounds, four rounds per day.
+
+    Returns the arguments to `configure_rounds`.
+    """
+    num_elimination_rounds = min(len(ELIMINATION_ROUNDS), num_rounds // 3)
+    num_preliminary_rounds = num_rounds - num_elimination_rounds
+    expected_free_judges = (
+        num_judges * (1 + min(max_slots_per_judge, num_rounds)) / 2 / num_rounds
+    )
+    # Leave some judges unscheduled in every round, like on a real sheet.
+    num_preliminary_matches = max(
+        2, math.ceil(expected_free_judges / JUDGES_PER_PRELIMINARY_MATCH / 1.5)
+    )
+
+    matches_per_round = {}
+    max_judges_per_match = {}
+    for i in range(num_preliminary_rounds):
+        round_name = f"Round {i + 1}"
+        matches_per_round[round_name] = num_preliminary_matches
+        max_judges_per_match[round_name] = JUDGES_PER_PRELIMINARY_MATCH
+    for round_name, num_matches, max_judges in ELIMINATION_ROUNDS[
+        len(ELIMINATION_ROUNDS) - num_elimination_rounds :
+    ]:
+        matches_per_round[round_name] = num_matches
+        max_judges_per_match[round_name] = max_judges
+    round_order = list(matches_per_round)
+    day_boundaries = [
+        (round_order[i - 1], round_order[i]) for i in range(4, num_rounds, 4)
+    ]
+    return matches_per_round, max_judges_per_match, day_boundaries
+
+
+def generate_judges(
+    num_judges: int,
+    round_order: list[Round],
+    rng: random.Random,
+    max_slots_per_judge: int = 4,
+) -> list[JudgeAvailability]:
+    """Generate judges who are each free for a random handful of rounds."""
+    judges = []
+    for i in range(num_judges):
+        num_slots = rng.randint(1, min(max_slots_per_judge, len(round_order)))
+        judges.append(
+            JudgeAvailability(
+                name=JudgeName(f"Judge {i + 1}"),
+                email=f"judge{i + 1}@example.com",
+                grade=rng.choices(list(GRADE_MAPPING), weights=GRADE_WEIGHTS)[0],
+                moot_exp=rng.random() < 0.5,
+                free_slots=[Slot(r) for r in rng.sample(round_order, num_slots)],
+            )
+        )
+    return judges
+
+
+def generate_tournament(
+    num_judges: int, num_rounds: int, seed: int = 0
+) -> tuple[
+    list[JudgeAvailability],
+    tuple[dict[Round, int], dict[Round, int], list[tuple[Round, Round]]],
+]:
+    """Generate a reproducible tournament: the judges, and the round structure to
+    pass to `configure_rounds`."""
+    rng = random.Random(seed)
+    round_config = generate_rounds(num_rounds, num_judges)
+    judges = generate_judges(num_judges, list(round_config[0]), rng)
+    return judges, round_config
@@ -0,0 +1,142 @@
+import contextlib
+import dataclasses
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from ortools.sat import sat_parameters_pb2
+from ortools.sat.python import cp_model
+
+from scheduler.files import write_atomically
+from scheduler.progress import peak_memory_mb
+
+# Counters from the solver response worth keeping in a trace
+_RESPONSE_FIELDS = (
+    "num_booleans",
+    "num_integers",
+    "num_fixed_booleans",
+    "num_conflicts",
+    "num_branches",
+    "num_binary_propagations",
+    "num_integer_propagations",
+    "num_restarts",
+    "num_lp_iterations",
+    "user_time",
+    "deterministic_time",
+    "gap_integral",
+)
+
+
+class Profiler:
+    """Records a trace of (possibly nested) timed spans, each with arbitrary
+    attributes such as model or solver statistics, and writes it as JSON.
+
+    A disabled profiler records nothing, so callers can always wrap their phases
+    in `span` and only pay for profiling when it was asked for.
+    """
+
+    def __init__(self, command: str = "", enabled: bool = True):
+        self.command = command
+        self.enabled = enabled
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.spans: list[dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._open: list[int] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Time the body of the `with` block. Yields the span's attribute dict, so
+        the body can add statistics it only knows at the end."""
+        if not self.enabled:
+            yield {}
+            return
+        span = {
+            "name": name,
+            # Index of the enclosing span in `spans`
+            "parent": self._open[-1] if self._open else None,
+            "start": time.perf_counter() - self._start,
+            **attributes,
+        }
+        self._open.append(len(self.spans))
+        self.spans.append(span)
+        try:
+            yield span
+        finally:
+            self._open.pop()
+            span["duration"] = time.perf_counter() - self._start - span["start"]
+
+    def trace(self) -> dict[str, Any]:
+        return {
+            "command": self.command,
+            "started_at": self.started_at,
+            "total_time": time.perf_counter() - self._start,
+            "peak_memory_mb": peak_memory_mb(),
+            "spans": self.spans,
+        }
+
+    def write(self, path: Path) -> None:
+        write_atomically(
+            path,
+            lambda tmp_path: tmp_path.write_text(json.dumps(self.trace(), indent=2)),
+        )
+        print(f"Wrote profile to {path}")
+
+
+def model_statistics(model: cp_model.CpModel) -> dict[str, Any]:
+    """Size of a CP-SAT model, from its proto."""
+    proto = model.Proto()
+    return {
+        "num_variables": len(proto.variables),
+        "num_booleans": sum(list(v.domain) == [0, 1] for v in proto.variables),
+        "num_constraints": len(proto.constraints),
+        "constraints_by_type": dict(
+            Counter(c.WhichOneof("constraint") for c in proto.constraints)
+        ),
+        "num_objective_terms": len(proto.objective.vars),
+        "num_hinted_variables": len(proto.solution_hint.vars),
+        "proto_size_mb": proto.ByteSize() / 1024**2,
+    }
+
+
+def response_statistics(response) -> dict[str, Any]:
+    """Search statistics from a CP-SAT solver response."""
+    return {field: getattr(response, field) for field in _RESPONSE_FIELDS}
+
+
+def time_presolve(
+    model: cp_model.CpModel, parameters: sat_parameters_pb2.SatParameters
+) -> float:
+    """Run only CP-SAT's presolve on `model` and return how long it took. The
+    solve itself doesn't report this, so profiling pays for one extra presolve."""
+    solver = cp_model.CpSolver()
+    solver.parameters.CopyFrom(parameters)
+    solver.parameters.stop_after_presolve = True
+    solver.parameters.log_search_progress = False
+    solver.Solve(model)
+    return solver.WallTime()
+
+
+def python_size_mb(obj: Any) -> float:
+    """Approximate memory used by a structure of nested dataclasses, dicts, lists,
+    tuples and sets, such as a model's variable index. A CP-SAT model inside isn't counted."""
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, cp_model.CpModel):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            stack.extend(vars(obj).values())
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, list | tuple | set | frozenset):
+            stack.extend(obj)
+    return size / 1024**2
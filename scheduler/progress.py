@@ -0,0 +1,110 @@
+import contextlib
+import resource
+import sys
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from ortools.sat.python import cp_model
+
+
+@dataclass
+class ProgressPoint:
+    """The solver's incumbent and bound when it found an improving solution."""
+
+    time: float
+    objective: float
+    bound: float
+
+    @property
+    def gap(self) -> float:
+        return relative_gap(self.objective, self.bound)
+
+    def __str__(self):
+        return (
+            f"{self.time:.2f}s: objective {self.objective}, bound {self.bound}"
+            f" (gap {self.gap:.2%})"
+        )
+
+
+def relative_gap(objective: float, bound: float) -> float:
+    """The gap between an objective value and its bound, relative to the objective
+    (the same definition CP-SAT uses for `relative_gap_limit`)."""
+    return abs(objective - bound) / max(1.0, abs(objective))
+
+
+class SolutionProgress(cp_model.CpSolverSolutionCallback):
+    """Records the objective and bound of every improving solution as the solver
+    finds it, and optionally hands the solution to `on_solution` (e.g. to save it,
+    so there's always a usable schedule if the run is stopped early).
+    """
+
+    def __init__(
+        self,
+        on_solution: Callable[["SolutionProgress"], None] | None = None,
+        verbose: bool = False,
+    ):
+        super().__init__()
+        self.on_solution = on_solution
+        self.verbose = verbose
+        self.points: list[ProgressPoint] = []
+
+    @property
+    def first_solution_time(self) -> float | None:
+        return self.points[0].time if self.points else None
+
+    def on_solution_callback(self):
+        point = ProgressPoint(
+            time=self.WallTime(),
+            objective=self.ObjectiveValue(),
+            bound=self.BestObjectiveBound(),
+        )
+        self.points.append(point)
+        if self.verbose:
+            print(f"  Solution #{len(self.points)} after {point}")
+        if self.on_solution is not None:
+            self.on_solution(self)
+
+
+@contextlib.contextmanager
+def stop_when_stalled(
+    solver: cp_model.CpSolver, progress: SolutionProgress, no_improvement_time: float
+):
+    """Stop `solver` once it has gone `no_improvement_time` seconds without finding
+    a better solution. Before the first solution only the time limit applies.
+
+    Yields an event that is set if the search was stopped this way. A
+    non-positive `no_improvement_time` never stops the search.
+    """
+    stalled = threading.Event()
+    if no_improvement_time <= 0:
+        yield stalled
+        return
+    done = threading.Event()
+    start = time.perf_counter()
+
+    def watch():
+        while not done.wait(min(0.1, no_improvement_time)):
+            if not progress.points:
+                continue
+            elapsed = time.perf_counter() - start
+            if elapsed - progress.points[-1].time >= no_improvement_time:
+                stalled.set()
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield stalled
+    finally:
+        done.set()
+        watcher.join()
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process so far, in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
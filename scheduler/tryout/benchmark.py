@@ -0,0 +1,390 @@
+import contextlib
+import copy
+import cProfile
+import io
+import pstats
+import random
+import time
+from collections import defaultdict
+
+import rl.utils.click as click
+from ortools.sat.python import cp_model
+
+import scheduler.tryout.greedy as greedy
+import scheduler.tryout.sat as sat
+from scheduler.profiling import model_statistics, python_size_mb, time_presolve
+from scheduler.tryout.local_search import improve_schedule
+from scheduler.tryout.synthetic import generate_tryout
+from scheduler.tryout.utils import (
+    UNSCHEDULED_BLOCK,
+    AvailabilityIndex,
+    BlockIndex,
+    Schedule,
+    parse_block,
+    pretty_print_schedule,
+)
+
+
+def count_calls(profile: cProfile.Profile, function_name: str) -> int:
+    return sum(
+        num_calls
+        for (_, _, name), (_, num_calls, *_) in pstats.Stats(profile).stats.items()
+        if name == function_name
+    )
+
+
+def benchmark_parsing(num_people: int, num_days: int, blocks_per_day: int) -> str:
+    """Count how often block names are parsed while building a greedy schedule,
+    the SAT model and the printed schedule."""
+    availability, slots = generate_tryout(num_people, num_days, blocks_per_day)
+    num_block_references = sum(len(person.free_slots) for person in availability)
+    parse_block.cache_clear()
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    profile.enable()
+    schedule = greedy.create_schedule(availability, slots)
+    sat.create_base_model(availability, slots)
+    pretty_print_schedule(schedule)
+    profile.disable()
+    elapsed = time.perf_counter() - start
+    return (
+        f"{num_people} people, {len(slots)} blocks,"
+        f" {num_block_references} free-slot references:"
+        f" {count_calls(profile, 'parse_datetime_range')} datetime range parses"
+        f" in {elapsed:.2f}s"
+    )
+
+
+def compare_encodings(
+    num_people: int,
+    num_days: int,
+    blocks_per_day: int,
+    max_time: float,
+    seed: int = 0,
+) -> str:
+    """Build, presolve and solve the same synthetic tryout with the legacy and the
+    tight encoding of the SAT model, and the aggregated model."""
+    availability, slots = generate_tryout(num_people, num_days, blocks_per_day, seed)
+    output = (
+        f"{num_people} people, {len(slots)} blocks\n"
+        f"{'Encoding':<9}{'Constraints':>12}{'Build':>8}{'Presolve':>10}"
+        f"{'Solve':>8}{'Status':>11}{'Objective':>12}"
+    )
+    for name, tight, aggregate in (
+        ("legacy", False, False),
+        ("tight", True, False),
+        ("classes", True, True),
+    ):
+        # compute_person_goodness marks people without free slots in place.
+        people = copy.deepcopy(availability)
+        start = time.perf_counter()
+        block_model = sat.create_full_model(people, slots, tight, aggregate)
+        build_time = time.perf_counter() - start
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max_time
+        solver.parameters.random_seed = seed
+        presolve_time = time_presolve(block_model["model"], solver.parameters)
+        status = solver.Solve(block_model["model"])
+        output += (
+            f"\n{name:<9}"
+            f"{model_statistics(block_model['model'])['num_constraints']:>12}"
+            f"{build_time:>7.2f}s{presolve_time:>9.2f}s{solver.WallTime():>7.2f}s"
+            f"{solver.StatusName(status):>11}{solver.ObjectiveValue():>12.1f}"
+        )
+    return output
+
+
+def schedule_goals(schedule: Schedule) -> tuple[int, int, int]:
+    """People scheduled, days used and blocks used by `schedule`."""
+    used_blocks = [
+        block
+        for block, people in schedule.items()
+        if block != UNSCHEDULED_BLOCK and people
+    ]
+    return (
+        sum(len(schedule[block]) for block in used_blocks),
+        len({parse_block(block).date for block in used_blocks}),
+        len(used_blocks),
+    )
+
+
+def compare_objectives(
+    num_people: int,
+    num_days: int,
+    blocks_per_day: int,
+    max_time: float,
+    seed: int = 0,
+) -> str:
+    """Solve the same synthetic tryout with the weighted objective and
+    lexicographically, and compare the time to (proven) optimal and the goals
+    reached."""
+    availability, slots = generate_tryout(num_people, num_days, blocks_per_day, seed)
+    output = (
+        f"{num_people} people, {len(slots)} blocks\n"
+        f"{'Mode':<14}{'Stage':<11}{'Status':>10}{'Solve':>8}"
+        f"{'Scheduled':>11}{'Days':>6}{'Blocks':>8}"
+    )
+    for name, lexicographic in (("weighted", False), ("lexicographic", True)):
+        reports = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            schedule = sat.create_schedule(
+                copy.deepcopy(availability),
+                slots,
+                lexicographic=lexicographic,
+                time_limits=[max_time],
+                reports=reports,
+            )
+        for report in reports:
+            output += (
+                f"\n{name:<14}{report['stage']:<11}{report['status']:>10}"
+                f"{report['wall_time']:>7.2f}s"
+            )
+        total_time = sum(report["wall_time"] for report in reports)
+        scheduled, days, blocks = schedule_goals(schedule)
+        output += (
+            f"\n{name:<14}{'total':<11}{'':>10}{total_time:>7.2f}s"
+            f"{scheduled:>11}{days:>6}{blocks:>8}"
+        )
+    return output
+
+
+def compare_local_search(
+    num_people: int,
+    num_days: int,
+    blocks_per_day: int,
+    max_time: float,
+    seed: int = 0,
+) -> str:
+    """Compare the goals reached by the greedy scheduler, local search on top of
+    it and CP-SAT (weighted objective), given the same time."""
+    availability, slots = generate_tryout(num_people, num_days, blocks_per_day, seed)
+    output = (
+        f"{num_people} people, {len(slots)} blocks\n"
+        f"{'Scheduler':<14}{'Time':>8}{'Scheduled':>11}{'Days':>6}{'Blocks':>8}"
+    )
+    start = time.perf_counter()
+    greedy_schedule = greedy.create_schedule(availability, slots)
+    greedy_time = time.perf_counter() - start
+    progress = []
+    start = time.perf_counter()
+    local_search_schedule = improve_schedule(
+        availability,
+        slots,
+        greedy_schedule,
+        max_time_in_seconds=max_time,
+        seed=seed,
+        progress=progress,
+    )
+    local_search_time = greedy_time + time.perf_counter() - start
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sat_schedule = sat.create_schedule(
+            copy.deepcopy(availability), slots, time_limits=[max_time]
+        )
+    sat_time = time.perf_counter() - start
+    for name, schedule, total_time in (
+        ("greedy", greedy_schedule, greedy_time),
+        ("local search", local_search_schedule, local_search_time),
+        ("CP-SAT", sat_schedule, sat_time),
+    ):
+        scheduled, days, blocks = schedule_goals(schedule)
+        output += f"\n{name:<14}{total_time:>7.2f}s{scheduled:>11}{days:>6}{blocks:>8}"
+    output += "\nLocal search progress:"
+    for point in progress:
+        output += (
+            f"\n  {point['time']:>6.2f}s: {point['unscheduled']} unscheduled,"
+            f" {point['days']} days, {point['blocks']} blocks"
+        )
+    return output
+
+
+def compare_availability(
+    num_people: int,
+    num_days: int,
+    blocks_per_day: int,
+    num_queries: int = 1_000_000,
+    seed: int = 0,
+) -> str:
+    """Compare looking up availability by slot name (a set of free slots per
+    person and a list of people per slot) with `AvailabilityIndex`: build time,
+    memory, availability checks and grouping people with equal availability."""
+    availability, slots = generate_tryout(num_people, num_days, blocks_per_day, seed)
+    block_index = BlockIndex(
+        slots, (block for person in availability for block in person.free_slots)
+    )
+    rng = random.Random(seed)
+    queries = [
+        (rng.randrange(num_people), rng.randrange(len(block_index)))
+        for _ in range(num_queries)
+    ]
+    block_names = [block.name for block in block_index]
+    emails = [person.email for person in availability]
+
+    start = time.perf_counter()
+    free_slots = {person.email: set(person.free_slots) for person in availability}
+    slot_people = defaultdict(list)
+    for person in availability:
+        for block in person.free_slots:
+            slot_people[block].append(person.email)
+    by_name_build = time.perf_counter() - start
+    start = time.perf_counter()
+    sum(block_names[b] in free_slots[emails[p]] for p, b in queries)
+    by_name_queries = time.perf_counter() - start
+    start = time.perf_counter()
+    len({frozenset(person.free_slots) for person in availability})
+    by_name_classes = time.perf_counter() - start
+    by_name_memory = python_size_mb([free_slots, slot_people])
+
+    start = time.perf_counter()
+    index = AvailabilityIndex(availability, block_index)
+    index_build = time.perf_counter() - start
+    masks = index.masks
+    start = time.perf_counter()
+    sum(masks[p] >> b & 1 for p, b in queries)
+    index_queries = time.perf_counter() - start
+    start = time.perf_counter()
+    len(set(masks))
+    index_classes = time.perf_counter() - start
+    index_memory = python_size_mb([masks, index.block_people, index.block_ids])
+
+    return (
+        f"{num_people} people, {len(block_index)} blocks\n"
+        f"{'Lookup':<8}{'Build':>8}{f'{num_queries} checks':>17}{'Classes':>9}"
+        f"{'Memory':>10}\n"
+        f"{'by name':<8}{by_name_build:>7.3f}s{by_name_queries:>16.3f}s"
+        f"{by_name_classes:>8.3f}s{by_name_memory:>7.1f} MB\n"
+        f"{'index':<8}{index_build:>7.3f}s{index_queries:>16.3f}s"
+        f"{index_classes:>8.3f}s{index_memory:>7.1f} MB"
+    )
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.option(
+    "--num_people",
+    "-n",
+    multiple=True,
+    type=int,
+    default=(100, 1000, 10000),
+    help="Numbers of people to generate (can be repeated)",
+)
+@click.option("--num_days", default=5, help="Number of days with blocks")
+@click.option("--blocks_per_day", default=4, help="Number of blocks per day")
+def parsing(num_people, num_days, blocks_per_day):
+    """Count block name parses while scheduling synthetic tryouts."""
+    for n in num_people:
+        print(benchmark_parsing(n, num_days, blocks_per_day))
+
+
+@main.command()
+@click.option(
+    "--num_people",
+    "-n",
+    multiple=True,
+    type=int,
+    default=(50, 300, 1000),
+    help="Numbers of people to generate (can be repeated)",
+)
+@click.option(
+    "--num_days",
+    "-d",
+    multiple=True,
+    type=int,
+    default=(5, 50, 150),
+    help="Number of days with blocks for each number of people",
+)
+@click.option("--blocks_per_day", default=4, help="Number of blocks per day")
+@click.option("--max_time", "-t", default=60.0, help="Maximum solve time (in seconds)")
+@click.option("--seed", default=0, help="Random seed of the synthetic tryouts")
+def encodings(num_people, num_days, blocks_per_day, max_time, seed):
+    """Compare presolve and solve time of the legacy and tight SAT encodings and
+    the aggregated model."""
+    if len(num_people) != len(num_days):
+        raise click.UsageError("Give one --num_days for every --num_people")
+    for n, d in zip(num_people, num_days, strict=True):
+        print(compare_encodings(n, d, blocks_per_day, max_time, seed))
+
+
+@main.command()
+@click.option(
+    "--num_people",
+    "-n",
+    multiple=True,
+    type=int,
+    default=(50, 300, 1000),
+    help="Numbers of people to generate (can be repeated)",
+)
+@click.option(
+    "--num_days",
+    "-d",
+    multiple=True,
+    type=int,
+    default=(5, 50, 150),
+    help="Number of days with blocks for each number of people",
+)
+@click.option("--blocks_per_day", default=4, help="Number of blocks per day")
+@click.option(
+    "--max_time", "-t", default=60.0, help="Maximum time (in seconds) per stage"
+)
+@click.option("--seed", default=0, help="Random seed of the synthetic tryouts")
+def objectives(num_people, num_days, blocks_per_day, max_time, seed):
+    """Compare time-to-optimal of the weighted and lexicographic objectives."""
+    if len(num_people) != len(num_days):
+        raise click.UsageError("Give one --num_days for every --num_people")
+    for n, d in zip(num_people, num_days, strict=True):
+        print(compare_objectives(n, d, blocks_per_day, max_time, seed))
+
+
+@main.command()
+@click.option(
+    "--num_people",
+    "-n",
+    multiple=True,
+    type=int,
+    default=(1000, 10000, 50000),
+    help="Numbers of people to generate (can be repeated)",
+)
+@click.option("--num_days", default=20, help="Number of days with blocks")
+@click.option("--blocks_per_day", default=4, help="Number of blocks per day")
+def availability(num_people, num_days, blocks_per_day):
+    """Compare availability lookups by slot name and by AvailabilityIndex."""
+    for n in num_people:
+        print(compare_availability(n, num_days, blocks_per_day))
+
+
+@main.command()
+@click.option(
+    "--num_people",
+    "-n",
+    multiple=True,
+    type=int,
+    default=(300, 1000, 5000),
+    help="Numbers of people to generate (can be repeated)",
+)
+@click.option(
+    "--num_days",
+    "-d",
+    multiple=True,
+    type=int,
+    default=(50, 150, 250),
+    help="Number of days with blocks for each number of people",
+)
+@click.option("--blocks_per_day", default=4, help="Number of blocks per day")
+@click.option(
+    "--max_time", "-t", default=5.0, help="Time (in seconds) for each scheduler"
+)
+@click.option("--seed", default=0, help="Random seed of the synthetic tryouts")
+def local_search(num_people, num_days, blocks_per_day, max_time, seed):
+    """Compare greedy, local search and CP-SAT schedules given the same time."""
+    if len(num_people) != len(num_days):
+        raise click.UsageError("Give one --num_days for every --num_people")
+    for n, d in zip(num_people, num_days, strict=True):
+        print(compare_local_search(n, d, blocks_per_day, max_time, seed))
+
+
+if __name__ == "__main__":
+    main()
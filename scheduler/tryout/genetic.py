@@ -1,10 +1,14 @@
-from collections import defaultdict
 from collections.abc import Iterable
 from copy import deepcopy
 from random import choice, choices, random
 
-from scheduler.tryout.load_data import fetch_avail_csv, get_availability_from_csv
-from scheduler.tryout.utils import Person, block_sort_key
+from scheduler.tryout.load_data import get_avail_data
+from scheduler.tryout.utils import (
+    AvailabilityIndex,
+    BlockIndex,
+    Person,
+    block_sort_key,
+)
 
 
 class HList(list):
@@ -34,14 +38,25 @@ NUM_GENERATIONS = 1000
 
 
 class GeneticAlgorithm:
-    # We use a set here so we can check for a slot in O(1) time
-    student_availability: dict[Student, set[Slot]]
+    index: AvailabilityIndex
+    # Each student's position in `index`, to check their availability with
+    # `index.is_free`
+    student_ids: dict[Student, int]
     slot_availability: dict[Slot, list[Student]]
     population: list[Schedule]
 
     def __init__(self, availability: list[Person]):
-        self.student_availability = self.student_availability_dict(availability)
-        self.slot_availability = self.slot_availability_dict(availability)
+        self.index = AvailabilityIndex(
+            availability,
+            # Capacities aren't used, so there are no slots to take them from.
+            BlockIndex(
+                [],
+                (slot for avail in availability for slot in avail.free_slots),
+                default_multiplier=1,
+            ),
+        )
+        self.student_ids = {avail.name: i for i, avail in enumerate(self.index.people)}
+        self.slot_availability = self.slot_availability_dict()
         self.population = self.initial_population()
         best_schedule = max(self.population, key=self.fitness)
         print(self.fitness(best_schedule, verbose=True))
@@ -106,7 +121,7 @@ class GeneticAlgorithm:
                 scheduled_students.add(student)
             if block_used:
                 num_blocks_used += 1
-        num_unscheduled = len(self.student_availability) - len(scheduled_students)
+        num_unscheduled = len(self.student_ids) - len(scheduled_students)
         fitness_score = -(
             # Add a penalty of 2 if there are any unscheduled
             num_unscheduled * 2
@@ -131,7 +146,10 @@ class GeneticAlgorithm:
                 # elif random() < MUTATION_PROB and students[i] is not Nobody:
                 #     swap_made = False
                 #     for (other_slot, other_students) in new_schedule:
-                #         if other_slot != slot and other_slot in self.student_availability[students[i]]:
+                #         if other_slot != slot and self.index.is_free(
+                #             self.student_ids[students[i]],
+                #             self.index.block_ids[other_slot],
+                #         ):
                 #             for j in range(len(other_students)):
                 #                 if other_students[j] is Nobody:
                 #                     other_students[j] = students[i]
@@ -169,31 +187,19 @@ class GeneticAlgorithm:
             )
         return schedule
 
-    def student_availability_dict(
-        self, availability: list[Person]
-    ) -> dict[Student, set[Slot]]:
-        avail_dict = {}
-        for avail in availability:
-            avail_dict[avail.name] = set(avail.free_slots)
-        return avail_dict
-
-    def slot_availability_dict(
-        self,
-        availability: list[Person],
-    ) -> dict[Slot, list[Student]]:
+    def slot_availability_dict(self) -> dict[Slot, list[Student]]:
         """
         Returns a dictionary mapping each slot to a list of students who can be scheduled in that slot.
-        :param availability:
         :return:
         """
-        avail_dict = defaultdict(list)
-        for avail in availability:
-            for slot in avail.free_slots:
-                avail_dict[slot].append(avail.name)
-        # Allow blocks to be empty
-        for students in avail_dict.values():
-            students.append(Nobody)
-        return avail_dict
+        return {
+            block.name: [self.index.people[i].name for i in people]
+            # Allow blocks to be empty
+            + [Nobody]
+            for block, people in zip(
+                self.index.blocks, self.index.block_people, strict=True
+            )
+        }
 
     def pretty_print_schedule(self, schedule: Schedule) -> None:
         student_count = 0
@@ -203,11 +209,11 @@ class GeneticAlgorithm:
             student_count += len(non_empty_students)
             student_str = ", ".join(non_empty_students) or "FREE"
             print(f"{slot} - {student_str}")
-        print(f"Duplicate schedules: {student_count - len(self.student_availability)}")
+        print(f"Duplicate schedules: {student_count - len(self.student_ids)}")
 
 
 if __name__ == "__main__":
-    availability = get_availability_from_csv(fetch_avail_csv())
+    availability, _ = get_avail_data()
     genetic = GeneticAlgorithm(availability)
     result_schedule = genetic.run()
     genetic.pretty_print_schedule(result_schedule)
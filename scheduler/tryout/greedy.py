@@ -1,59 +1,93 @@
 # Goals: 1) Schedule everyone into a block and 2) use as few blocks as possible
-import math
-from collections import defaultdict
+from pathlib import Path
 
 import scheduler.tryout.load_data as load_data
 from scheduler.tryout.utils import (
     UNSCHEDULED_BLOCK,
+    AvailabilityIndex,
+    BlockIndex,
     Person,
     Schedule,
-    get_block_day,
-    parse_datetime_range,
+    Slot,
     pretty_print_schedule,
     write_schedule_to_csv,
 )
 
-MAX_PER_BLOCK = 6
 
-
-def create_schedule(availability: list[Person], blocks: list[str]) -> Schedule:
-    schedule: dict[str, list[Person]] = defaultdict(list)
-    scheduled_per_day: dict[str, int] = defaultdict(lambda: 0)
+def create_schedule(availability: list[Person], slots: list[Slot]) -> Schedule:
+    """Schedule people one at a time, least available first, into the fullest
+    block they're free for that is still below its capacity."""
+    block_index = BlockIndex(
+        slots, (block for person in availability for block in person.free_slots)
+    )
+    index = AvailabilityIndex(availability, block_index)
+    day_ids = {
+        day: i for i, day in enumerate(dict.fromkeys(b.day for b in index.blocks))
+    }
+    block_days = [day_ids[block.day] for block in index.blocks]
+    block_starts = [block.start for block in index.blocks]
+    scheduled_per_day = [0] * len(day_ids)
+    # People in each block, by position in `availability`
+    members: list[list[int]] = [[] for _ in index.blocks]
+    unscheduled = []
+    # Bucket queue of the blocks with space: a bitset of block IDs for each number
+    # of people already in them, kept up to date as people are added. A block
+    # leaves it once it's at capacity.
+    capacities = [block.capacity for block in index.blocks]
+    blocks_by_fill = [0] * max(capacities, default=0)
+    for block_id, capacity in enumerate(capacities):
+        if capacity > 0:
+            blocks_by_fill[0] |= 1 << block_id
 
     # Sort by availability, so that people with the fewest slots marked are scheduled first.
-    availability = sorted(availability, key=lambda person: len(person.free_slots))
+    order = sorted(
+        range(len(availability)), key=lambda i: len(availability[i].free_slots)
+    )
 
-    for person in availability:
-        # Filter to only blocks with space
-        candidate_blocks = [
-            block for block in person.free_slots if len(schedule[block]) < MAX_PER_BLOCK
-        ]
+    for i in order:
         # Select a block that has space but is closest to being full, to encourage compact scheduling.
+        mask = index.masks[i]
+        for fill in range(len(blocks_by_fill) - 1, -1, -1):
+            if candidates := mask & blocks_by_fill[fill]:
+                break
+        else:
+            unscheduled.append(availability[i])
+            continue
         # Tiebreaker: select the day with the most people already scheduled.
-        # Second tiebreaker: select the earliest block.
+        # Second tiebreaker: select the latest block.
+        # Blocks that tie on both (same start) go to the one listed first among
+        # the person's free slots.
         best_available_block = max(
-            candidate_blocks,
-            key=lambda block: (
-                len(schedule[block]),
-                scheduled_per_day[get_block_day(block)],
-                parse_datetime_range(block)[0],
+            (
+                b
+                for b in (index.block_ids[name] for name in availability[i].free_slots)
+                if candidates >> b & 1
             ),
-            default=UNSCHEDULED_BLOCK,
+            key=lambda b: (scheduled_per_day[block_days[b]], block_starts[b]),
         )
-        schedule[best_available_block].append(person)
-        scheduled_per_day[get_block_day(best_available_block)] += 1
+        bit = 1 << best_available_block
+        blocks_by_fill[fill] ^= bit
+        if fill + 1 < capacities[best_available_block]:
+            blocks_by_fill[fill + 1] |= bit
+        members[best_available_block].append(i)
+        scheduled_per_day[block_days[best_available_block]] += 1
 
-    return dict(
-        sorted(
-            schedule.items(),
-            key=lambda item: blocks.index(item[0]) if item[0] in blocks else math.inf,
+    # Every block someone is free for, even if nobody ended up in it
+    schedule = {
+        block.name: [availability[i] for i in people]
+        for block, people, free_people in zip(
+            index.blocks, members, index.block_people, strict=True
         )
-    )
+        if len(free_people)
+    }
+    if unscheduled:
+        schedule[UNSCHEDULED_BLOCK] = unscheduled
+    return schedule
 
 
 if __name__ == "__main__":
-    availability, blocks = load_data.get_avail_data()
-    schedule = create_schedule(availability, blocks)
+    availability, slots = load_data.get_avail_data()
+    schedule = create_schedule(availability, slots)
     print(pretty_print_schedule(schedule))
-    write_schedule_to_csv(schedule, "schedule.csv")
+    write_schedule_to_csv(schedule, slots, Path("schedule.csv"))
     print("Wrote schedule to schedule.csv")
@@ -0,0 +1,258 @@
+# Goals: 1) Schedule late and changed sign-ups without moving anyone who was
+# already notified (or at most a few of them) and 2) open as few new days and
+# blocks as possible.
+import itertools
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import rl.utils.click as click
+from ortools.sat.python import cp_model
+
+from scheduler.tryout.load_data import get_avail_data
+from scheduler.tryout.sat import _SCHEDULE_PATH
+from scheduler.tryout.utils import (
+    UNSCHEDULED_BLOCK,
+    BlockIndex,
+    Person,
+    Schedule,
+    Slot,
+    pretty_print_schedule,
+    read_schedule_from_csv,
+    write_schedule_to_csv,
+)
+
+
+def find_changed_people(availability: list[Person], previous: Schedule) -> list[Person]:
+    """The people on the sheet who don't have a block in the published schedule
+    they're still free for: new sign-ups, people whose availability no longer
+    includes their block, and people who were left unscheduled."""
+    assigned = {
+        person.email: block
+        for block, people in previous.items()
+        if block != UNSCHEDULED_BLOCK
+        for person in people
+    }
+    return [
+        person
+        for person in availability
+        if assigned.get(person.email) not in person.free_slots
+    ]
+
+
+def reschedule(
+    previous: Schedule,
+    changed: list[Person],
+    slots: list[Slot],
+    availability: list[Person] | None = None,
+    dropped: set[str] = frozenset(),
+    max_moves: int = 0,
+    max_time_in_seconds: float = 1.0,
+) -> Schedule:
+    """Update a published schedule with new or changed sign-ups.
+
+    `previous` is the published schedule (see `read_schedule_from_csv`) and
+    `changed` the current rows of the people to (re)schedule. Everyone else in
+    `previous` keeps their block, except the emails in `dropped`, who are
+    removed. With `max_moves`, up to that many of them may move to another block
+    they're free for according to `availability`, to make room.
+
+    Only the changed people, and the people who could move to make room for
+    them, are in the model, so it stays small however many people are already
+    scheduled. The objective first maximizes the number of changed people
+    scheduled, then minimizes the number of moves, then the new days and new
+    blocks used, earliest first.
+    """
+    changed_emails = {person.email for person in changed}
+    kept = {
+        block: [
+            person
+            for person in people
+            if person.email not in changed_emails and person.email not in dropped
+        ]
+        for block, people in previous.items()
+        if block != UNSCHEDULED_BLOCK
+    }
+    block_index = BlockIndex(
+        slots,
+        itertools.chain(kept, (block for p in changed for block in p.free_slots)),
+    )
+    wanted_blocks = {block for person in changed for block in person.free_slots}
+    current_rows = {person.email: person for person in availability or []}
+    # People in a block a changed person wants, who are free for another block
+    movable = {
+        row.email: (row, block)
+        for block in wanted_blocks
+        for person in kept.get(block, [])
+        if max_moves > 0
+        and (row := current_rows.get(person.email)) is not None
+        and block in row.free_slots
+        and len(row.free_slots) > 1
+    }
+    num_fixed = {
+        block: sum(person.email not in movable for person in people)
+        for block, people in kept.items()
+    }
+    num_movable = Counter(block for _, block in movable.values())
+
+    model = cp_model.CpModel()
+    person_vars = defaultdict(list)
+    block_vars = defaultdict(list)
+    var_info = []
+    for person in itertools.chain(changed, (row for row, _ in movable.values())):
+        for block in person.free_slots:
+            if block not in block_index:
+                continue
+            var = model.NewBoolVar(f"{person.email} in {block}")
+            person_vars[person.email].append(var)
+            block_vars[block].append(var)
+            var_info.append((var, (person, block)))
+    for person in changed:
+        model.AddAtMostOne(person_vars[person.email])
+    for email in movable:
+        model.AddExactlyOne(person_vars[email])
+    for block, b_vars in block_vars.items():
+        # A published block can be over capacity (e.g. after a greedy fallback or
+        # a lowered multiplier). Whoever could move may always stay, so people
+        # only move to make room.
+        model.Add(
+            sum(b_vars)
+            <= max(
+                0,
+                block_index[block].capacity - num_fixed.get(block, 0),
+                num_movable[block],
+            )
+        )
+
+    # Start from everyone who could move staying where they are.
+    stay_vars = []
+    for var, (person, block) in var_info:
+        if person.email in movable:
+            stays = movable[person.email][1] == block
+            model.AddHint(var, stays)
+            if stays:
+                stay_vars.append(var)
+    moves = len(stay_vars) - sum(stay_vars)
+    if movable:
+        model.Add(moves <= max_moves)
+
+    # Blocks and days nobody who keeps their place is in only cost when used.
+    used_blocks = {block for block, count in num_fixed.items() if count > 0}
+    used_days = {block_index[block].date for block in used_blocks}
+    new_blocks = sorted(
+        (block for block in block_vars if block not in used_blocks),
+        key=lambda block: block_index[block].rank,
+    )
+    new_days = sorted({block_index[block].date for block in new_blocks} - used_days)
+    block_used_vars = {}
+    for block in new_blocks:
+        block_used_vars[block] = model.NewBoolVar(f"{block} used")
+        for var in block_vars[block]:
+            model.AddImplication(var, block_used_vars[block])
+    day_used_vars = {day: model.NewBoolVar(f"{day} used") for day in new_days}
+    for block, block_used_var in block_used_vars.items():
+        if block_index[block].date in day_used_vars:
+            model.AddImplication(block_used_var, day_used_vars[block_index[block].date])
+
+    unscheduled = len(changed) - sum(
+        sum(person_vars[person.email]) for person in changed
+    )
+    day_costs = [len(new_days) + i for i in range(len(new_days))]
+    block_costs = [len(new_blocks) + i for i in range(len(new_blocks))]
+    # Each goal with its largest possible value, most important first. Weigh them
+    # so that no amount of the later ones makes up for the earlier.
+    goals = [
+        (unscheduled, len(changed)),
+        (moves, len(stay_vars)),
+        (
+            sum(c * v for c, v in zip(day_costs, day_used_vars.values(), strict=True)),
+            sum(day_costs),
+        ),
+        (
+            sum(
+                c * v
+                for c, v in zip(block_costs, block_used_vars.values(), strict=True)
+            ),
+            sum(block_costs),
+        ),
+    ]
+    objective = 0
+    weight = 1
+    for goal, max_value in reversed(goals):
+        objective += weight * goal
+        weight *= max_value + 1
+    model.Minimize(objective)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    status = solver.Solve(model)
+    print(f"Status: {solver.StatusName(status)} after {solver.WallTime():.2f}s")
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        raise RuntimeError("Could not fit the changed people into the schedule")
+
+    schedule = {
+        block: [person for person in people if person.email not in movable]
+        for block, people in kept.items()
+    }
+    scheduled_emails = set()
+    for var, (person, block) in var_info:
+        if solver.Value(var):
+            schedule.setdefault(block, []).append(person)
+            scheduled_emails.add(person.email)
+    schedule[UNSCHEDULED_BLOCK] = [
+        person
+        for person in previous.get(UNSCHEDULED_BLOCK, [])
+        if person.email not in changed_emails and person.email not in dropped
+    ] + [person for person in changed if person.email not in scheduled_emails]
+    print(
+        f"Scheduled {len(scheduled_emails & changed_emails)} of {len(changed)} new"
+        f" or changed people, moved {solver.Value(moves) if movable else 0}"
+    )
+    return schedule
+
+
+@click.command()
+@click.option(
+    "--previous",
+    "previous_path",
+    type=click.Path(exists=True, path_type=Path),
+    default=_SCHEDULE_PATH,
+    help="The previously published schedule CSV",
+)
+@click.option(
+    "--max_moves",
+    default=0,
+    help="Number of already scheduled people who may move to make room",
+)
+@click.option(
+    "--max_time",
+    "-t",
+    default=1.0,
+    help="Maximum time (in seconds) to spend fitting in the changed people",
+)
+def main(previous_path, max_moves, max_time):
+    availability, slots = get_avail_data()
+    previous = read_schedule_from_csv(previous_path)
+    changed = find_changed_people(availability, previous)
+    on_sheet = {person.email for person in availability}
+    dropped = {
+        person.email
+        for people in previous.values()
+        for person in people
+        if person.email not in on_sheet
+    }
+    print(f"{len(changed)} new or changed people, {len(dropped)} dropped")
+    schedule = reschedule(
+        previous,
+        changed,
+        slots,
+        availability,
+        dropped,
+        max_moves=max_moves,
+        max_time_in_seconds=max_time,
+    )
+    print(pretty_print_schedule(schedule))
+    write_schedule_to_csv(schedule, slots, _SCHEDULE_PATH)
+
+
+if __name__ == "__main__":
+    main()
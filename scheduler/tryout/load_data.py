@@ -1,51 +1,80 @@
 import csv
 import re
-from io import StringIO
+import sys
+from collections.abc import Iterable, Iterator
 
-import requests
 import rl.utils.io
 
+from scheduler.fetch import fetch_files, is_offline, read_lines
 from scheduler.tryout.utils import Person, Slot
 
 FREE_SLOTS_PARSE_REGEX = r"[A-Za-z]+?day.+?–.+?\.m\."
 # FREE_SLOTS_PARSE_REGEX = r"(?:.+?M)|(?:week of .*)"
+_FREE_SLOTS_PATTERN = re.compile(FREE_SLOTS_PARSE_REGEX)
 
 
-def fetch_avail_csv() -> tuple[StringIO, StringIO]:
-    avail_csv_path = rl.utils.io.getenv("AVAIL_CSV_PATH")
-    avail_response = requests.get(avail_csv_path)
-    avail_response.encoding = avail_response.apparent_encoding
+def fetch_avail_csv() -> tuple[Iterator[str], Iterator[str]]:
+    """Fetch the availability and slot sheets, and return their lines, which are
+    read from the cached snapshots as they're consumed."""
+    (avail_path, avail_encoding), (slot_path, slot_encoding) = fetch_files(
+        [rl.utils.io.getenv("AVAIL_CSV_PATH"), rl.utils.io.getenv("SLOTS_CSV_PATH")],
+        rl.utils.io.get_data_path("cache"),
+        offline=is_offline(),
+    )
+    return read_lines(avail_path, avail_encoding), read_lines(slot_path, slot_encoding)
 
-    slot_csv_path = rl.utils.io.getenv("SLOTS_CSV_PATH")
-    slot_response = requests.get(slot_csv_path)
-    slot_response.encoding = slot_response.apparent_encoding
 
-    return StringIO(avail_response.text), StringIO(slot_response.text)
-
-
-def get_availability_from_csv(avail_file, slot_file) -> tuple[list[Person], list[str]]:
-    availability: list[Person] = []
+def iter_availability(avail_file: Iterable[str]) -> Iterator[Person]:
+    """Parse the availability sheet one row at a time. Block names are interned,
+    so the many people free for the same block share one string. Malformed rows
+    are reported and skipped."""
     avail_file_reader = csv.reader(avail_file)
     next(avail_file_reader, None)  # Skip header row
     for avail_row in avail_file_reader:
-        slots_regex_match = re.findall(FREE_SLOTS_PARSE_REGEX, avail_row[4])
-        avail_object = Person(
-            email=avail_row[1].strip(),
-            name=avail_row[2].strip(),
-            free_slots=[slot.strip(" ,") for slot in slots_regex_match],
-        )
-        availability.append(avail_object)
+        if not "".join(avail_row).strip():
+            continue
+        try:
+            person = Person(
+                email=avail_row[1].strip(),
+                name=avail_row[2].strip(),
+                free_slots=[
+                    sys.intern(slot.strip(" ,"))
+                    for slot in _FREE_SLOTS_PATTERN.findall(avail_row[4])
+                ],
+            )
+        except IndexError:
+            print(
+                f"Skipping malformed availability row {avail_file_reader.line_num}:"
+                f" {avail_row}"
+            )
+            continue
+        yield person
+
+
+def iter_slots(slot_file: Iterable[str]) -> Iterator[Slot]:
+    """Parse the slot sheet one row at a time, reporting and skipping malformed
+    rows."""
     slot_file_reader = csv.reader(slot_file)
     next(slot_file_reader, None)  # Skip header row
-    slots: list[Slot] = [
-        Slot(
-            name=s[0].strip(),
-            spots_multiplier=int(s[1].strip()),
-            rooms=[r.strip() for r in s[2].strip().split(",")],
-        )
-        for s in slot_file_reader
-    ]
-    return availability, slots
+    for s in slot_file_reader:
+        if not "".join(s).strip():
+            continue
+        try:
+            slot = Slot(
+                name=sys.intern(s[0].strip()),
+                spots_multiplier=int(s[1].strip()),
+                rooms=[r.strip() for r in s[2].strip().split(",")],
+            )
+        except (IndexError, ValueError):
+            print(f"Skipping malformed slot row {slot_file_reader.line_num}: {s}")
+            continue
+        yield slot
+
+
+def get_availability_from_csv(
+    avail_file: Iterable[str], slot_file: Iterable[str]
+) -> tuple[list[Person], list[Slot]]:
+    return list(iter_availability(avail_file)), list(iter_slots(slot_file))
 
 
 def get_avail_data():
@@ -0,0 +1,403 @@
+# Goals: the same as scheduler.tryout.sat (1) schedule everyone, 2) use as few and
+# as early days and 3) blocks as possible), reached by improving the greedy
+# schedule with small moves until a time budget runs out.
+import random
+import time
+from typing import Any
+
+import rl.utils.click as click
+
+import scheduler.tryout.greedy as greedy
+from scheduler.tryout.load_data import get_avail_data
+from scheduler.tryout.sat import (
+    _SCHEDULE_PATH,
+    compute_block_badness,
+    compute_day_badness,
+)
+from scheduler.tryout.utils import (
+    UNSCHEDULED_BLOCK,
+    AvailabilityIndex,
+    BlockIndex,
+    Person,
+    Schedule,
+    Slot,
+    pretty_print_schedule,
+    write_schedule_to_csv,
+)
+
+UNSCHEDULED = -1
+# Minimum time (in seconds) between two recorded progress points
+PROGRESS_INTERVAL = 0.1
+
+
+class ScheduleState:
+    """A schedule as the block ID of every person (see `AvailabilityIndex`), with
+    the counts needed to price a move without scoring the whole schedule again.
+
+    The objective weighs the goals so that no amount of a later one makes up for
+    an earlier one, like the lexicographic mode of `scheduler.tryout.sat`, with
+    the same goodness and badness scores.
+    """
+
+    def __init__(self, availability: list[Person], slots: list[Slot]):
+        block_index = BlockIndex(
+            slots, (block for person in availability for block in person.free_slots)
+        )
+        self.index = AvailabilityIndex(availability, block_index)
+        blocks = self.index.blocks
+        self.free = [self.index.free_blocks(i) for i in range(len(availability))]
+        self.capacity = [block.capacity for block in blocks]
+
+        # Only blocks (and days) someone is free for can be used.
+        usable = [
+            block.name
+            for block, people in zip(blocks, self.index.block_people, strict=True)
+            if len(people)
+        ]
+        block_scale = max(1, len(usable))
+        block_badness = compute_block_badness(usable, block_index)
+        dates = sorted({block_index[block].date for block in usable})
+        day_scale = max(1, len(dates))
+        day_badness = compute_day_badness(dates)
+        day_ids = {day: i for i, day in enumerate(dates)}
+        self.block_day = [day_ids.get(block.date, UNSCHEDULED) for block in blocks]
+        self.day_blocks: list[list[int]] = [[] for _ in dates]
+        for block in usable:
+            self.day_blocks[day_ids[block_index[block].date]].append(
+                self.index.block_ids[block]
+            )
+        block_costs = [
+            round(block_badness.get(block.name, 0) * block_scale) for block in blocks
+        ]
+        day_costs = [round(day_badness[day] * day_scale) for day in dates]
+        # Each goal's costs in units of the objective, least important first
+        day_weight = sum(block_costs) + 1
+        person_weight = day_weight * (sum(day_costs) + 1)
+        self.block_cost = block_costs
+        self.day_cost = [cost * day_weight for cost in day_costs]
+        # Earlier sign-ups are better to schedule (see `compute_person_goodness`).
+        n = len(availability)
+        self.goodness = [(n * n + n - i) * person_weight for i in range(n)]
+
+        self.assignment = [UNSCHEDULED] * n
+        self.members: list[list[int]] = [[] for _ in blocks]
+        self.unscheduled = list(range(n))
+        # Where each person is in their block's `members` (or `unscheduled`)
+        self.position = list(range(n))
+        self.blocks_used_on_day = [0] * len(dates)
+        self.num_blocks_used = 0
+        self.num_days_used = 0
+        self.objective = sum(self.goodness)
+
+    def load(self, schedule: Schedule) -> None:
+        """Start from `schedule`. People in a block they aren't free for, or beyond
+        its capacity, start unscheduled."""
+        people = {person.email: i for i, person in enumerate(self.index.people)}
+        for name, block_people in schedule.items():
+            block = self.index.block_ids.get(name, UNSCHEDULED)
+            if block == UNSCHEDULED:
+                continue
+            for person in block_people:
+                i = people.get(person.email)
+                if (
+                    i is not None
+                    and self.assignment[i] == UNSCHEDULED
+                    and self.index.is_free(i, block)
+                    and len(self.members[block]) < self.capacity[block]
+                ):
+                    self.apply_relocate(i, block, self.relocate_delta(i, block))
+
+    def relocate_delta(self, person: int, block: int) -> int:
+        """How much moving `person` into `block` (which has space) changes the
+        objective."""
+        old = self.assignment[person]
+        delta = 0
+        closed_day = opened_day = UNSCHEDULED
+        if old == UNSCHEDULED:
+            delta -= self.goodness[person]
+        elif len(self.members[old]) == 1:
+            delta -= self.block_cost[old]
+            closed_day = self.block_day[old]
+        if block == UNSCHEDULED:
+            delta += self.goodness[person]
+        elif not self.members[block]:
+            delta += self.block_cost[block]
+            opened_day = self.block_day[block]
+        if closed_day != opened_day:
+            if closed_day != UNSCHEDULED and self.blocks_used_on_day[closed_day] == 1:
+                delta -= self.day_cost[closed_day]
+            if opened_day != UNSCHEDULED and not self.blocks_used_on_day[opened_day]:
+                delta += self.day_cost[opened_day]
+        return delta
+
+    def swap_delta(self, person: int, other: int) -> int:
+        """How much swapping the places of two people changes the objective. Blocks
+        keep the same number of people, so only who is unscheduled matters."""
+        if self.assignment[person] == UNSCHEDULED:
+            return self.goodness[other] - self.goodness[person]
+        if self.assignment[other] == UNSCHEDULED:
+            return self.goodness[person] - self.goodness[other]
+        return 0
+
+    def apply_relocate(self, person: int, block: int, delta: int) -> None:
+        self._remove(person)
+        self._add(person, block)
+        self.objective += delta
+
+    def apply_swap(self, person: int, other: int, delta: int) -> None:
+        block, other_block = self.assignment[person], self.assignment[other]
+        self._remove(person)
+        self._remove(other)
+        self._add(person, other_block)
+        self._add(other, block)
+        self.objective += delta
+
+    def _remove(self, person: int) -> None:
+        block = self.assignment[person]
+        people = self.unscheduled if block == UNSCHEDULED else self.members[block]
+        last = people.pop()
+        if last != person:
+            people[self.position[person]] = last
+            self.position[last] = self.position[person]
+        if block != UNSCHEDULED and not people:
+            self.num_blocks_used -= 1
+            day = self.block_day[block]
+            self.blocks_used_on_day[day] -= 1
+            if not self.blocks_used_on_day[day]:
+                self.num_days_used -= 1
+
+    def _add(self, person: int, block: int) -> None:
+        people = self.unscheduled if block == UNSCHEDULED else self.members[block]
+        if block != UNSCHEDULED and not people:
+            self.num_blocks_used += 1
+            day = self.block_day[block]
+            if not self.blocks_used_on_day[day]:
+                self.num_days_used += 1
+            self.blocks_used_on_day[day] += 1
+        self.assignment[person] = block
+        self.position[person] = len(people)
+        people.append(person)
+
+    def has_space(self, block: int) -> bool:
+        return len(self.members[block]) < self.capacity[block]
+
+    def progress_point(self, elapsed: float, moves: int) -> dict[str, Any]:
+        return {
+            "time": elapsed,
+            "objective": self.objective,
+            "unscheduled": len(self.unscheduled),
+            "days": self.num_days_used,
+            "blocks": self.num_blocks_used,
+            "moves": moves,
+        }
+
+    def to_schedule(self) -> Schedule:
+        people = self.index.people
+        # Every block someone is free for, even if nobody ended up in it
+        schedule = {
+            block.name: [people[i] for i in sorted(members)]
+            for block, members, free_people in zip(
+                self.index.blocks, self.members, self.index.block_people, strict=True
+            )
+            if len(free_people)
+        }
+        if self.unscheduled:
+            schedule[UNSCHEDULED_BLOCK] = [people[i] for i in sorted(self.unscheduled)]
+        return schedule
+
+
+def try_move(state: ScheduleState, rng: random.Random) -> bool:
+    """Move a random person into a random block they're free for: into a free
+    spot, or swapping with someone in it who is free for their place. Moves that
+    don't make the objective worse are made."""
+    if state.unscheduled and rng.random() < 0.5:
+        person = rng.choice(state.unscheduled)
+    else:
+        person = rng.randrange(len(state.assignment))
+    if not state.free[person]:
+        return False
+    block = rng.choice(state.free[person])
+    old = state.assignment[person]
+    if block == old:
+        return False
+    if state.has_space(block):
+        delta = state.relocate_delta(person, block)
+        if delta <= 0:
+            state.apply_relocate(person, block, delta)
+            return True
+        return False
+    other = rng.choice(state.members[block])
+    if old != UNSCHEDULED and not state.index.is_free(other, old):
+        return False
+    delta = state.swap_delta(person, other)
+    if delta <= 0:
+        state.apply_swap(person, other, delta)
+        return True
+    return False
+
+
+def sample_used_blocks(state: ScheduleState, rng: random.Random) -> list[int]:
+    """The blocks of a few random people, if they're scheduled."""
+    sampled = (rng.randrange(len(state.assignment)) for _ in range(3))
+    return [
+        state.assignment[person]
+        for person in sampled
+        if state.assignment[person] != UNSCHEDULED
+    ]
+
+
+def try_empty_block(state: ScheduleState, rng: random.Random) -> bool:
+    """Empty an underused block: the emptiest of a few sampled ones, on the day
+    with the fewest used blocks."""
+    used = sample_used_blocks(state, rng)
+    if not used:
+        return False
+    block = min(
+        used,
+        key=lambda b: (
+            state.blocks_used_on_day[state.block_day[b]],
+            len(state.members[b]),
+        ),
+    )
+    return empty_blocks(state, [block])
+
+
+def try_empty_day(state: ScheduleState, rng: random.Random) -> bool:
+    """Empty every block of an underused day: the one with the fewest used blocks
+    of a few sampled ones."""
+    used = sample_used_blocks(state, rng)
+    if not used:
+        return False
+    day = min(
+        (state.block_day[b] for b in used), key=lambda d: state.blocks_used_on_day[d]
+    )
+    return empty_blocks(state, state.day_blocks[day])
+
+
+def empty_blocks(state: ScheduleState, blocks: list[int]) -> bool:
+    """Move everyone in `blocks` into other blocks with space on days that are
+    already used, if they all fit somewhere and the objective doesn't get worse."""
+    emptied = set(blocks)
+    people = [person for block in blocks for person in state.members[block]]
+    moved = []
+    delta = 0
+    for person in people:
+        targets = [
+            b
+            for b in state.free[person]
+            if b not in emptied
+            and state.blocks_used_on_day[state.block_day[b]]
+            and state.has_space(b)
+        ]
+        if not targets:
+            break
+        # The fullest, so that what's left stays easy to empty
+        target = max(
+            targets,
+            key=lambda b: (
+                len(state.members[b]),
+                state.blocks_used_on_day[state.block_day[b]],
+            ),
+        )
+        moved.append((person, state.assignment[person]))
+        person_delta = state.relocate_delta(person, target)
+        state.apply_relocate(person, target, person_delta)
+        delta += person_delta
+    if people and len(moved) == len(people) and delta <= 0:
+        return True
+    for person, block in reversed(moved):
+        state.apply_relocate(person, block, state.relocate_delta(person, block))
+    return False
+
+
+def improve_schedule(
+    availability: list[Person],
+    slots: list[Slot],
+    schedule: Schedule,
+    max_time_in_seconds: float = 1.0,
+    seed: int = 0,
+    progress: list[dict[str, Any]] | None = None,
+    verbose: bool = False,
+) -> Schedule:
+    """Improve `schedule` (e.g. from `scheduler.tryout.greedy`) with local search
+    until `max_time_in_seconds` runs out.
+
+    Each step tries a random move: moving a person into another block they're
+    free for (or swapping them with someone in it), or emptying an underused
+    block or day into blocks on other used days. Moves are priced incrementally,
+    and only made if they don't make the schedule worse, so the current schedule
+    is always the best one found. The objective and goals are appended to `progress` as the
+    schedule improves (at most every `PROGRESS_INTERVAL` seconds, and at the
+    end), and printed with `verbose`.
+    """
+    progress = progress if progress is not None else []
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    state = ScheduleState(availability, slots)
+    state.load(schedule)
+
+    def record(elapsed, moves):
+        point = state.progress_point(elapsed, moves)
+        progress.append(point)
+        if verbose:
+            print(
+                f"  {elapsed:.2f}s: objective {point['objective']},"
+                f" {point['unscheduled']} unscheduled, {point['days']} days,"
+                f" {point['blocks']} blocks"
+            )
+
+    record(time.perf_counter() - start, 0)
+    if not state.assignment:
+        return state.to_schedule()
+    moves = 0
+    recorded_objective = state.objective
+    iteration = 0
+    while True:
+        iteration += 1
+        r = rng.random()
+        if r < 0.05:
+            moves += try_empty_day(state, rng)
+        elif r < 0.15:
+            moves += try_empty_block(state, rng)
+        else:
+            moves += try_move(state, rng)
+        if iteration % 256:
+            continue
+        elapsed = time.perf_counter() - start
+        if elapsed >= max_time_in_seconds:
+            break
+        if (
+            state.objective < recorded_objective
+            and elapsed - progress[-1]["time"] >= PROGRESS_INTERVAL
+        ):
+            record(elapsed, moves)
+            recorded_objective = state.objective
+    record(time.perf_counter() - start, moves)
+    return state.to_schedule()
+
+
+@click.command()
+@click.option(
+    "--max_time",
+    "-t",
+    default=10.0,
+    help="Time (in seconds) to spend improving the greedy schedule",
+)
+@click.option("--seed", default=0, help="Random seed of the search")
+def main(max_time, seed):
+    availability, slots = get_avail_data()
+    schedule = greedy.create_schedule(availability, slots)
+    schedule = improve_schedule(
+        availability,
+        slots,
+        schedule,
+        max_time_in_seconds=max_time,
+        seed=seed,
+        verbose=True,
+    )
+    print(pretty_print_schedule(schedule))
+    write_schedule_to_csv(schedule, slots, _SCHEDULE_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,43 @@
+import itertools
 from collections import defaultdict
 from datetime import date
+from pathlib import Path
 from typing import Any
 
+import rl.utils.click as click
 import rl.utils.io
 from ortools.sat.python import cp_model
 
+import scheduler.tryout.greedy as greedy
+from scheduler.files import write_atomically
+from scheduler.profiling import (
+    Profiler,
+    model_statistics,
+    python_size_mb,
+    response_statistics,
+    time_presolve,
+)
+from scheduler.progress import SolutionProgress, relative_gap
 from scheduler.tryout.load_data import get_avail_data
-from scheduler.tryout.time_ranges import get_time_intervals, parse_datetime_range
 from scheduler.tryout.utils import (
     UNSCHEDULED_BLOCK,
+    AvailabilityIndex,
+    BlockIndex,
     Person,
     Schedule,
     Slot,
+    mask_bits,
     pretty_print_schedule,
     write_schedule_to_csv,
 )
 
+_SCHEDULE_PATH = rl.utils.io.get_data_path("tryout_schedule.csv")
+
+# Time limit (in seconds) of every solver stage when `main` isn't given one
+DEFAULT_TIME_LIMIT = 60.0
+# Weight of each goal in the weighted objective of `create_schedule`
+OBJECTIVE_WEIGHTS = {"scheduled": 1000, "days": 100, "blocks": 1}
+
 
 def compute_person_goodness(availability: list[Person]) -> dict[str, float]:
     """Compute goodness scores for each person, favoring earlier form submissions."""
@@ -28,9 +50,11 @@ def compute_person_goodness(availability: list[Person]) -> dict[str, float]:
     return person_goodness
 
 
-def compute_block_badness(blocks: list[str]) -> dict[str, float]:
+def compute_block_badness(
+    blocks: list[str], block_index: BlockIndex
+) -> dict[str, float]:
     """Compute badness scores for blocks, with later blocks being worse."""
-    blocks = sorted(blocks, key=lambda b: parse_datetime_range(b)[0])
+    blocks = sorted(blocks, key=lambda b: block_index[b].rank)
     return {block: 1 + i / len(blocks) for i, block in enumerate(blocks)}
 
 
@@ -40,100 +64,553 @@ def compute_day_badness(days: list[date]) -> dict[date, float]:
     return {day: 1 + i / len(days) for i, day in enumerate(days)}
 
 
-def create_schedule(availability: list[Person], slots: list[Slot]) -> Schedule:
-    block_model = create_base_model(availability, slots)
-    # Require all people to be scheduled.
-    for p_vars in block_model["person_vars"].values():
-        block_model["model"].Add(sum(p_vars) == 1)
+def create_schedule(
+    availability: list[Person],
+    slots: list[Slot],
+    progress_path: Path | None = None,
+    profiler: Profiler | None = None,
+    tight: bool = True,
+    aggregate: bool = False,
+    lexicographic: bool = False,
+    time_limits: list[float] | None = None,
+    num_workers: int = 0,
+    random_seed: int = 0,
+    log_search_progress: bool = False,
+    reports: list[dict[str, Any]] | None = None,
+) -> Schedule:
+    """Schedule everyone into a block, using as few (and as early) days and blocks
+    as possible. With `progress_path`, every improving schedule is written there
+    as soon as the solver finds it. With an enabled `profiler`, the build,
+    presolve and solve are traced with the model and search statistics. `tight`
+    picks the model encoding (see `create_base_model`), and `aggregate` solves
+    for how many people with the same availability go in each block instead
+    (see `create_aggregated_model`).
+
+    By default the goals are weighted into one objective. With `lexicographic`,
+    they're optimized one at a time, most important first: each stage starts
+    from the previous stage's solution and keeps its goal at the value reached.
+    `time_limits` are the time limits of the stages in seconds (the last one is
+    used for any further stages), and `num_workers` (0 uses one per core),
+    `random_seed` and `log_search_progress` are passed on to CP-SAT. A summary
+    of every stage is appended to `reports`.
+
+    Maximizing who is scheduled can't prove its optimum when everyone fits, so
+    the lexicographic first stage checks that first, with everyone required; if
+    they fit, that schedule is the stage's (optimal) solution.
+
+    If the solver finds no schedule (e.g. because not everyone fits), the
+    schedule of `scheduler.tryout.greedy` is returned instead, and the last
+    report's `fallback` says so.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    reports = reports if reports is not None else []
+    with profiler.span("build") as span:
+        block_model = create_full_model(
+            availability, slots, tight, aggregate, lexicographic
+        )
+        if profiler.enabled:
+            span["index_memory_mb"] = python_size_mb(block_model)
+    model = block_model["model"]
+
+    def write_progress(progress: SolutionProgress):
+        schedule = model_to_schedule(progress, block_model, availability)
+        write_atomically(
+            progress_path, lambda path: write_schedule_to_csv(schedule, slots, path)
+        )
+
+    def new_solver(stage_number: int) -> cp_model.CpSolver:
+        solver = cp_model.CpSolver()
+        if time_limits:
+            solver.parameters.max_time_in_seconds = time_limits[
+                min(stage_number, len(time_limits) - 1)
+            ]
+        solver.parameters.num_workers = num_workers
+        solver.parameters.random_seed = random_seed
+        solver.parameters.log_search_progress = log_search_progress
+        return solver
+
+    stages = (
+        list(block_model["tiers"].items()) if lexicographic else [("weighted", None)]
+    )
+    solved = None
+    for i, (stage, objective) in enumerate(stages):
+        if stage == "scheduled":
+            with profiler.span("solve", stage="everyone") as span:
+                solver = schedule_everyone(
+                    availability, slots, tight, aggregate, new_solver(i)
+                )
+                span["fits"] = solver is not None
+            if solver is not None:
+                require_everyone(block_model)
+                scheduled = float(solver.Value(block_model["tiers"][stage]))
+                reports.append(
+                    {
+                        "stage": stage,
+                        "status": "OPTIMAL",
+                        "objective": scheduled,
+                        "best_bound": scheduled,
+                        "wall_time": solver.WallTime(),
+                        "first_solution_time": solver.WallTime(),
+                        "fallback": "",
+                    }
+                )
+                print(f"Stage: {stage}")
+                print("Everyone fits")
+                solved = solver
+                continue
+        if objective is not None:
+            model.Minimize(objective)
+        if solved is not None:
+            hint_solution(model, solved.ResponseProto().solution)
+        solver = new_solver(i)
+        progress = SolutionProgress(
+            write_progress if progress_path is not None else None, verbose=True
+        )
+        if profiler.enabled:
+            with profiler.span("presolve", stage=stage) as span:
+                span["presolve_time"] = time_presolve(model, solver.parameters)
+        with profiler.span("solve", stage=stage) as span:
+            if profiler.enabled:
+                span["model"] = model_statistics(model)
+            status = solver.Solve(model, progress)
+            report = {
+                "stage": stage,
+                "status": solver.StatusName(status),
+                "objective": solver.ObjectiveValue(),
+                "best_bound": solver.BestObjectiveBound(),
+                "wall_time": solver.WallTime(),
+                "first_solution_time": progress.first_solution_time,
+                "fallback": "",
+            }
+            span.update(report, search=response_statistics(solver.ResponseProto()))
+            reports.append(report)
+        if lexicographic:
+            print(f"Stage: {stage}")
+        print(f"Status: {solver.StatusName(status)}")
+        print(f"Objective value: {solver.ObjectiveValue()}")
+        if progress.points:
+            print(
+                f"First solution after {progress.first_solution_time:.2f}s, final gap"
+                f" {relative_gap(solver.ObjectiveValue(), solver.BestObjectiveBound()):.2%}"
+            )
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            if solved is not None:
+                report["fallback"] = f"{stages[i - 1][0]} stage"
+                print(f"Keeping the {report['fallback']}'s schedule")
+            break
+        solved = solver
+        # Later stages may not make this goal any worse.
+        if stage == "scheduled" and everyone_scheduled(solver, block_model):
+            # Same as bounding the goal, but propagates far better than a bound
+            # with its large coefficients.
+            require_everyone(block_model)
+        elif objective is not None:
+            model.Add(objective <= round(solver.ObjectiveValue()))
+    if solved is None:
+        print("The solver found no schedule, falling back to the greedy one")
+        reports[-1]["fallback"] = "greedy"
+        with profiler.span("greedy"):
+            return greedy.create_schedule(availability, slots)
+    with profiler.span("extract"):
+        return model_to_schedule(solved, block_model, availability)
 
-    person_goodness = compute_person_goodness(availability)
-    block_badness = compute_block_badness(list(block_model["block_vars"].keys()))
-    day_badness = compute_day_badness(list(block_model["day_used_vars"].keys()))
 
+def create_full_model(
+    availability: list[Person],
+    slots: list[Slot],
+    tight: bool = True,
+    aggregate: bool = False,
+    lexicographic: bool = False,
+) -> dict[str, Any]:
+    """The base (or aggregated) model with the goals of `create_schedule` as
+    `tiers`, weighted into its objective.
+
+    Everyone is required to be scheduled, except with `lexicographic`, where the
+    first stage schedules as many people as fit instead.
+    """
+    block_index = BlockIndex(
+        slots, (block for person in availability for block in person.free_slots)
+    )
+    if aggregate:
+        block_model = create_aggregated_model(
+            availability, slots, block_index, require_all=not lexicographic
+        )
+    else:
+        block_model = create_base_model(
+            availability,
+            slots,
+            block_index,
+            require_all=not lexicographic,
+            tight=tight,
+        )
+    tiers = objective_tiers(block_model, availability, block_index)
+    block_model["tiers"] = {name: tier for name, (tier, _) in tiers.items()}
     block_model["model"].Minimize(
-        -sum(
-            sum(p_vars) * person_goodness[p]
-            for p, p_vars in block_model["person_vars"].items()
+        sum(
+            tier * (OBJECTIVE_WEIGHTS[name] / scale)
+            for name, (tier, scale) in tiers.items()
         )
-        * 1000
-        + sum(
-            d_var * day_badness[d] for d, d_var in block_model["day_used_vars"].items()
+    )
+    return block_model
+
+
+def objective_tiers(
+    block_model: dict[str, Any], availability: list[Person], block_index: BlockIndex
+) -> dict[str, tuple[Any, int]]:
+    """The goals of `create_schedule`, most important first, each as an expression
+    to minimize with integer coefficients, and the factor by which it scales up
+    the goodness or badness scores it is made of."""
+    person_goodness = compute_person_goodness(availability)
+    person_scale = max(1, len(availability) ** 2)
+    goodness = {p: round(g * person_scale) for p, g in person_goodness.items()}
+    if "classes" in block_model:
+        # Everyone in a class is equally good to schedule, so a class counts with
+        # its members' average goodness. Which of them are scheduled if not
+        # everyone fits is decided when assigning them back.
+        scheduled = sum(
+            sum(c_vars)
+            * round(sum(goodness[p.email] for p in people_class) / len(people_class))
+            for people_class, c_vars in zip(
+                block_model["classes"], block_model["class_vars"], strict=True
+            )
         )
-        * 100
-        + sum(
-            b_var * block_badness[b]
-            for b, b_var in block_model["block_used_vars"].items()
+    else:
+        scheduled = sum(
+            sum(p_vars) * goodness[p]
+            for p, p_vars in block_model["person_vars"].items()
         )
+
+    day_scale = max(1, len(block_model["day_used_vars"]))
+    day_badness = compute_day_badness(list(block_model["day_used_vars"].keys()))
+    block_scale = max(1, len(block_model["block_used_vars"]))
+    block_badness = compute_block_badness(
+        list(block_model["block_vars"].keys()), block_index
     )
+    return {
+        "scheduled": (-scheduled, person_scale),
+        "days": (
+            sum(
+                d_var * round(day_badness[d] * day_scale)
+                for d, d_var in block_model["day_used_vars"].items()
+            ),
+            day_scale,
+        ),
+        "blocks": (
+            sum(
+                b_var * round(block_badness[b] * block_scale)
+                for b, b_var in block_model["block_used_vars"].items()
+            ),
+            block_scale,
+        ),
+    }
 
-    solver = cp_model.CpSolver()
+
+def schedule_everyone(
+    availability: list[Person],
+    slots: list[Slot],
+    tight: bool,
+    aggregate: bool,
+    solver: cp_model.CpSolver,
+) -> cp_model.CpSolver | None:
+    """Look for any schedule with everyone in it, and return the solver holding it,
+    or None if there is none (or none was found in time). The model only differs
+    from the lexicographic one in its constraints, so the solution also fits
+    the lexicographic model's variables."""
+    block_model = create_full_model(availability, slots, tight, aggregate)
+    block_model["model"].ClearObjective()
     status = solver.Solve(block_model["model"])
-    print(f"Status: {solver.StatusName(status)}")
-    print(f"Objective value: {solver.ObjectiveValue()}")
-    return solved_to_schedule(solver, block_model["var_info"], availability)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return solver
+
+
+def everyone_scheduled(solver, block_model: dict[str, Any]) -> bool:
+    """Whether everyone with a free slot is scheduled in the solution."""
+    if "classes" in block_model:
+        return all(
+            solver.Value(sum(c_vars)) == len(people_class)
+            for people_class, c_vars in zip(
+                block_model["classes"], block_model["class_vars"], strict=True
+            )
+        )
+    return all(
+        solver.Value(sum(p_vars)) == 1 for p_vars in block_model["person_vars"].values()
+    )
+
+
+def require_everyone(block_model: dict[str, Any]) -> None:
+    model = block_model["model"]
+    if "classes" in block_model:
+        for people_class, c_vars in zip(
+            block_model["classes"], block_model["class_vars"], strict=True
+        ):
+            model.Add(sum(c_vars) == len(people_class))
+    else:
+        for p_vars in block_model["person_vars"].values():
+            model.AddExactlyOne(p_vars)
 
 
-def get_block_day(block: str) -> date:
-    return parse_datetime_range(block)[0].date()
+def hint_solution(model: cp_model.CpModel, solution: list[int]) -> None:
+    """Hint every variable of `model` with its value in `solution`."""
+    model.ClearHints()
+    hint = model.Proto().solution_hint
+    hint.vars.extend(range(len(solution)))
+    hint.values.extend(solution)
 
 
-def create_base_model(availability: list[Person], slots: list[Slot]) -> dict[str, Any]:
-    slots_by_name = {s.name: s for s in slots}
-    print(slots_by_name)
+def create_base_model(
+    availability: list[Person],
+    slots: list[Slot],
+    block_index: BlockIndex | None = None,
+    require_all: bool = False,
+    tight: bool = True,
+) -> dict[str, Any]:
+    """Model which person goes in which block, with a flag for every used block
+    and day. With `require_all`, everyone must be scheduled.
+
+    The tight encoding uses one native at-most-one (or exactly-one) constraint
+    per person, and links a used flag to its members with one implication per
+    member and a single cardinality constraint, which also holds the block's
+    capacity. The legacy encoding (`tight=False`) reifies every flag in both
+    directions with clauses and repeats the per-person constraints; it's kept
+    to benchmark against.
+    """
+    if block_index is None:
+        block_index = BlockIndex(
+            slots, (block for person in availability for block in person.free_slots)
+        )
     model = cp_model.CpModel()
     block_vars = defaultdict(list)
     person_vars = defaultdict(list)
     block_used_vars: dict[str, Any] = {}
     day_used_vars: dict[date, Any] = {}
     var_info = []
-    for person in availability:
-        for block in person.free_slots:
+    index = AvailabilityIndex(availability, block_index)
+    for i, person in enumerate(availability):
+        for block_id in index.free_blocks(i):
+            block = index.blocks[block_id].name
             person_block_var = model.NewBoolVar(f"{person.email} in {block}")
             block_vars[block].append(person_block_var)
             person_vars[person.email].append(person_block_var)
             var_info.append((person_block_var, (person.email, block)))
-        # Allow a person to be scheduled at most once.
-        model.Add(sum(person_vars[person.email]) <= 1)
     for block in block_vars:
+        block_used_vars[block] = model.NewBoolVar(f"{block} used")
+
+    blocks_by_day = defaultdict(list)
+    for block in block_vars:
+        blocks_by_day[block_index[block].date].append(block)
+    for day in blocks_by_day:
+        day_used_vars[day] = model.NewBoolVar(f"{day} used")
+
+    if tight:
+        add_tight_constraints(
+            model,
+            person_vars,
+            block_vars,
+            block_used_vars,
+            day_used_vars,
+            blocks_by_day,
+            block_index,
+            require_all,
+        )
+    else:
+        add_legacy_constraints(
+            model,
+            person_vars,
+            block_vars,
+            block_used_vars,
+            day_used_vars,
+            blocks_by_day,
+            block_index,
+            require_all,
+        )
+    return {
+        "model": model,
+        "person_vars": person_vars,
+        "block_vars": block_vars,
+        "block_used_vars": block_used_vars,
+        "day_used_vars": day_used_vars,
+        "var_info": var_info,
+    }
+
+
+def create_aggregated_model(
+    availability: list[Person],
+    slots: list[Slot],
+    block_index: BlockIndex | None = None,
+    require_all: bool = False,
+) -> dict[str, Any]:
+    """Like `create_base_model`, but people who are free for exactly the same
+    blocks are interchangeable, so they're grouped into one class with an integer
+    count of its members in each of its blocks. The model grows with the number
+    of distinct availabilities instead of the number of people, and has none of
+    the symmetric solutions that swap two of them.
+
+    Use `model_to_schedule` to assign the individual people back.
+    """
+    if block_index is None:
+        block_index = BlockIndex(
+            slots, (block for person in availability for block in person.free_slots)
+        )
+    index = AvailabilityIndex(availability, block_index)
+    # People with the same bitset of free blocks
+    classes_by_mask: dict[int, list[Person]] = defaultdict(list)
+    for person, mask in zip(availability, index.masks, strict=True):
+        if mask:
+            classes_by_mask[mask].append(person)
+    classes = list(classes_by_mask.values())
+
+    model = cp_model.CpModel()
+    block_vars = defaultdict(list)
+    class_vars = []
+    count_info = []
+    for i, (mask, people_class) in enumerate(classes_by_mask.items()):
+        c_vars = []
+        for block_id in mask_bits(mask):
+            block = index.blocks[block_id].name
+            count_var = model.NewIntVar(0, len(people_class), f"class {i} in {block}")
+            block_vars[block].append(count_var)
+            c_vars.append(count_var)
+            count_info.append((count_var, (i, block)))
+        class_vars.append(c_vars)
+        if require_all:
+            model.Add(sum(c_vars) == len(people_class))
+        else:
+            model.Add(sum(c_vars) <= len(people_class))
+
+    block_used_vars: dict[str, Any] = {}
+    for block, b_vars in block_vars.items():
         block_used_var = model.NewBoolVar(f"{block} used")
         block_used_vars[block] = block_used_var
-        model.AddBoolOr(block_vars[block]).OnlyEnforceIf(block_used_var)
-        model.AddBoolAnd([v.Not() for v in block_vars[block]]).OnlyEnforceIf(
-            block_used_var.Not()
-        )
+        for var in b_vars:
+            model.Add(var == 0).OnlyEnforceIf(block_used_var.Not())
+        # A used block has at least one person, and at most its capacity.
+        model.Add(sum(b_vars) >= block_used_var)
+        model.Add(sum(b_vars) <= block_index[block].capacity * block_used_var)
 
     blocks_by_day = defaultdict(list)
     for block in block_vars:
-        blocks_by_day[get_block_day(block)].append(block)
+        blocks_by_day[block_index[block].date].append(block)
+    day_used_vars = {day: model.NewBoolVar(f"{day} used") for day in blocks_by_day}
+    add_day_used_constraints(model, block_used_vars, day_used_vars, blocks_by_day)
+    return {
+        "model": model,
+        "classes": classes,
+        "class_vars": class_vars,
+        "block_vars": block_vars,
+        "block_used_vars": block_used_vars,
+        "day_used_vars": day_used_vars,
+        "count_info": count_info,
+        "block_index": block_index,
+    }
 
-    for day in blocks_by_day:
-        day_used_var = model.NewBoolVar(f"{day} used")
-        day_used_vars[day] = day_used_var
+
+def add_day_used_constraints(
+    model: cp_model.CpModel,
+    block_used_vars: dict[str, Any],
+    day_used_vars: dict[date, Any],
+    blocks_by_day: dict[date, list[str]],
+) -> None:
+    for day, blocks in blocks_by_day.items():
+        day_used_var = day_used_vars[day]
+        block_used_vars_for_day = [block_used_vars[b] for b in blocks]
+        for var in block_used_vars_for_day:
+            model.AddImplication(var, day_used_var)
+        model.Add(sum(block_used_vars_for_day) >= day_used_var)
+
+
+def add_tight_constraints(
+    model: cp_model.CpModel,
+    person_vars: dict[str, list],
+    block_vars: dict[str, list],
+    block_used_vars: dict[str, Any],
+    day_used_vars: dict[date, Any],
+    blocks_by_day: dict[date, list[str]],
+    block_index: BlockIndex,
+    require_all: bool,
+) -> None:
+    for p_vars in person_vars.values():
+        if require_all:
+            model.AddExactlyOne(p_vars)
+        else:
+            model.AddAtMostOne(p_vars)
+    for block, b_vars in block_vars.items():
+        block_used_var = block_used_vars[block]
+        for var in b_vars:
+            model.AddImplication(var, block_used_var)
+        # A used block has at least one person, and at most its capacity.
+        model.Add(sum(b_vars) >= block_used_var)
+        model.Add(sum(b_vars) <= block_index[block].capacity * block_used_var)
+    add_day_used_constraints(model, block_used_vars, day_used_vars, blocks_by_day)
+
+
+def add_legacy_constraints(
+    model: cp_model.CpModel,
+    person_vars: dict[str, list],
+    block_vars: dict[str, list],
+    block_used_vars: dict[str, Any],
+    day_used_vars: dict[date, Any],
+    blocks_by_day: dict[date, list[str]],
+    block_index: BlockIndex,
+    require_all: bool,
+) -> None:
+    # Allow a person to be scheduled at most once.
+    for p_vars in person_vars.values():
+        model.Add(sum(p_vars) <= 1)
+    for block, block_used_var in block_used_vars.items():
+        model.AddBoolOr(block_vars[block]).OnlyEnforceIf(block_used_var)
+        model.AddBoolAnd([v.Not() for v in block_vars[block]]).OnlyEnforceIf(
+            block_used_var.Not()
+        )
+    for day, day_used_var in day_used_vars.items():
         block_used_vars_for_day = [block_used_vars[b] for b in blocks_by_day[day]]
         model.AddBoolOr(block_used_vars_for_day).OnlyEnforceIf(day_used_var)
         model.AddBoolAnd([v.Not() for v in block_used_vars_for_day]).OnlyEnforceIf(
             day_used_var.Not()
         )
-
-    # At most MAX_PER_BLOCK people per block.
     for block in block_vars:
-        block_size = (
-            len(get_time_intervals(block)) * slots_by_name[block].spots_multiplier
-        )
-        model.Add(sum(block_vars[block]) <= block_size)
+        model.Add(sum(block_vars[block]) <= block_index[block].capacity)
     # Each person is scheduled in at most one block.
     for p_vars in person_vars.values():
         model.Add(
             sum(p_vars) <= 1,
         )
-    return {
-        "model": model,
-        "person_vars": person_vars,
-        "block_vars": block_vars,
-        "block_used_vars": block_used_vars,
-        "day_used_vars": day_used_vars,
-        "var_info": var_info,
-    }
+    if require_all:
+        for p_vars in person_vars.values():
+            model.Add(sum(p_vars) == 1)
+
+
+def model_to_schedule(
+    solver, block_model: dict[str, Any], availability: list[Person]
+) -> Schedule:
+    if "classes" in block_model:
+        return aggregated_to_schedule(solver, block_model, availability)
+    return solved_to_schedule(solver, block_model["var_info"], availability)
+
+
+def aggregated_to_schedule(
+    solver, block_model: dict[str, Any], availability: list[Person]
+) -> Schedule:
+    """Assign the people of each class to its block counts, in submission order:
+    earlier submissions go to earlier blocks, and are the ones scheduled if not
+    everyone in the class is."""
+    block_index = block_model["block_index"]
+    schedule = {block: [] for block in block_model["block_vars"]}
+    schedule[UNSCHEDULED_BLOCK] = []
+    counts = defaultdict(list)
+    for var, (i, block) in block_model["count_info"]:
+        counts[i].append((block, solver.Value(var)))
+    scheduled_emails = set()
+    for i, people_class in enumerate(block_model["classes"]):
+        people = iter(people_class)
+        for block, count in sorted(counts[i], key=lambda bc: block_index[bc[0]].rank):
+            for person in itertools.islice(people, count):
+                schedule[block].append(person)
+                scheduled_emails.add(person.email)
+    for person in availability:
+        if person.email not in scheduled_emails:
+            schedule[UNSCHEDULED_BLOCK].append(person)
+    return schedule
 
 
 def solved_to_schedule(solver, var_info, availability: list[Person]) -> Schedule:
@@ -152,13 +629,66 @@ def solved_to_schedule(solver, var_info, availability: list[Person]) -> Schedule
     return schedule
 
 
-def main():
-    availability, slots = get_avail_data()
-    schedule = create_schedule(availability, slots)
+@click.command()
+@click.option(
+    "--aggregate",
+    is_flag=True,
+    help="Solve for counts of people with the same availability per block",
+)
+@click.option(
+    "--lexicographic",
+    is_flag=True,
+    help="Optimize people scheduled, then days used, then blocks used, in turn",
+)
+@click.option(
+    "--time_limit",
+    "-t",
+    "time_limits",
+    multiple=True,
+    type=float,
+    default=[DEFAULT_TIME_LIMIT],
+    help="Time limit (in seconds) of the solve; repeat for each lexicographic stage",
+)
+@click.option(
+    "--num_workers",
+    "-w",
+    default=0,
+    help="Number of CP-SAT search workers (0 uses one per core)",
+)
+@click.option("--seed", default=0, help="Random seed for the solver")
+@click.option("--log_search", is_flag=True, help="Print CP-SAT search logs")
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Write a JSON trace of time spent and model sizes to tryout_profile.json",
+)
+def main(aggregate, lexicographic, time_limits, num_workers, seed, log_search, profile):
+    profiler = Profiler("scheduler.tryout.sat", enabled=profile)
+    with profiler.span("load") as span:
+        availability, slots = get_avail_data()
+        span.update(num_people=len(availability), num_slots=len(slots))
+    reports = []
+    with profiler.span("schedule"):
+        schedule = create_schedule(
+            availability,
+            slots,
+            progress_path=_SCHEDULE_PATH,
+            profiler=profiler,
+            aggregate=aggregate,
+            lexicographic=lexicographic,
+            time_limits=list(time_limits),
+            num_workers=num_workers,
+            random_seed=seed,
+            log_search_progress=log_search,
+            reports=reports,
+        )
     print(pretty_print_schedule(schedule))
-    write_schedule_to_csv(
-        schedule, slots, rl.utils.io.get_data_path("tryout_schedule.csv")
-    )
+    engine = "the greedy scheduler" if reports[-1]["fallback"] == "greedy" else "CP-SAT"
+    print(f"Schedule produced by {engine}")
+    with profiler.span("export"):
+        write_schedule_to_csv(schedule, slots, _SCHEDULE_PATH)
+    if profile:
+        profiler.write(rl.utils.io.get_data_path("tryout_profile.json"))
 
 
 if __name__ == "__main__":
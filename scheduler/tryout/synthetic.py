@@ -0,0 +1,45 @@
+import random
+from datetime import date, timedelta
+
+from scheduler.tryout.time_ranges import DEFAULT_YEAR
+from scheduler.tryout.utils import Person, Slot
+
+# Afternoon blocks, formatted like the slot sheet
+BLOCK_HOURS = [(1, 2), (2, 3), (3, 4), (4, 5), (5, 6)]
+
+
+def generate_blocks(num_days: int, blocks_per_day: int) -> list[str]:
+    """Generate block names for consecutive weekdays, a few afternoon hours each."""
+    blocks = []
+    day = date(DEFAULT_YEAR, 4, 1)
+    while len(blocks) < num_days * blocks_per_day:
+        if day.weekday() < 5:
+            for start, end in BLOCK_HOURS[:blocks_per_day]:
+                blocks.append(f"{day:%A, %B} {day.day}, {start}–{end} p.m.")
+        day += timedelta(days=1)
+    return blocks
+
+
+def generate_tryout(
+    num_people: int,
+    num_days: int = 5,
+    blocks_per_day: int = 4,
+    seed: int = 0,
+    max_slots_per_person: int = 6,
+) -> tuple[list[Person], list[Slot]]:
+    """Generate a reproducible tryout: people who are each free for a random
+    handful of blocks, and a slot for every block."""
+    rng = random.Random(seed)
+    blocks = generate_blocks(num_days, blocks_per_day)
+    people = [
+        Person(
+            name=f"Person {i + 1}",
+            email=f"person{i + 1}@example.com",
+            free_slots=rng.sample(
+                blocks, rng.randint(1, min(max_slots_per_person, len(blocks)))
+            ),
+        )
+        for i in range(num_people)
+    ]
+    slots = [Slot(name=block, spots_multiplier=2, rooms=["A", "B"]) for block in blocks]
+    return people, slots
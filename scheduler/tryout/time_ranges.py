@@ -55,12 +55,17 @@ def parse_time_range(time_range_str: str) -> tuple[time, time]:
 
 
 def get_time_intervals(
-    datetime_range_str: str, interval_mins: int = 15, gap_mins: int = 5
+    datetime_range_str: str,
+    interval_mins: int = 15,
+    gap_mins: int = 5,
+    start_end: tuple[datetime, datetime] | None = None,
 ) -> list[str]:
     """Given a string like "Monday, April 24, 1–2 p.m.", return a list of time intervals formatted as
     ["Monday, April 24, 1:00–1:15 p.m.", "Monday, April 24, 1:20–1:35 p.m.", ...]
+
+    Pass `start_end` if the range has already been parsed.
     """
-    start_datetime, end_datetime = parse_datetime_range(datetime_range_str)
+    start_datetime, end_datetime = start_end or parse_datetime_range(datetime_range_str)
     interval = timedelta(minutes=interval_mins)
     gap = timedelta(minutes=gap_mins)
     current_datetime = start_datetime
@@ -1,10 +1,14 @@
 import csv
 import datetime
+import functools
 import itertools
 import re
-from dataclasses import dataclass
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, replace
 from pathlib import Path
 
+import numpy as np
+
 from scheduler.tryout.time_ranges import get_time_intervals, parse_datetime_range
 
 UNSCHEDULED_BLOCK = "Unscheduled"
@@ -36,23 +40,150 @@ class Slot:
 
 Schedule = dict[str, list[Person]]
 
+_DAY_OF_WEEK_REGEX = re.compile(r"[A-Za-z]+?day")
 
-def block_sort_key(block):
+
+@dataclass(frozen=True)
+class Block:
+    """Everything we need to know about a block, parsed from its name."""
+
+    name: str
+    # `datetime.max` (and no date) if the name isn't a datetime range
+    start: datetime.datetime
+    end: datetime.datetime
+    date: datetime.date | None
+    day: str
+    # The interview slots in the block, formatted like its name
+    intervals: tuple[str, ...]
+    # How many people fit in the block, and its position in chronological
+    # order; only known within a `BlockIndex`.
+    capacity: int = 0
+    rank: int = 0
+
+
+@functools.cache
+def parse_block(name: str) -> Block:
+    """Parse a block name. Every name is only parsed once per run; later calls
+    return the same `Block`."""
     try:
-        return parse_datetime_range(block)[0]
+        start, end = parse_datetime_range(name)
     except Exception:
-        return datetime.datetime.max
+        res = _DAY_OF_WEEK_REGEX.search(name)
+        return Block(
+            name=name,
+            start=datetime.datetime.max,
+            end=datetime.datetime.max,
+            date=None,
+            day=res.group(0) if res else "",
+            intervals=(),
+        )
+    return Block(
+        name=name,
+        start=start,
+        end=end,
+        date=start.date(),
+        day=start.strftime("%A"),
+        intervals=tuple(get_time_intervals(name, start_end=(start, end))),
+    )
 
 
-_DAY_OF_WEEK_REGEX = re.compile(r"[A-Za-z]+?day")
+class BlockIndex:
+    """The blocks of a run, with the capacity of each (from its slot) and its
+    chronological rank, built once and looked up by name.
+
+    Every block in `block_names` must have a slot, so that a typo in either sheet
+    doesn't silently change a block's capacity, unless `default_multiplier` is
+    given for the blocks without one.
+    """
+
+    def __init__(
+        self,
+        slots: list[Slot],
+        block_names: Iterable[str] = (),
+        default_multiplier: int | None = None,
+    ):
+        multipliers = {slot.name: slot.spots_multiplier for slot in slots}
+        names = dict.fromkeys([*multipliers, *block_names])
+        missing = [name for name in names if name not in multipliers]
+        if missing and default_multiplier is None:
+            raise KeyError(f"Blocks missing from the slot sheet: {missing}")
+        blocks = sorted((parse_block(name) for name in names), key=lambda b: b.start)
+        self.blocks = {
+            block.name: replace(
+                block,
+                capacity=len(block.intervals)
+                * multipliers.get(block.name, default_multiplier),
+                rank=rank,
+            )
+            for rank, block in enumerate(blocks)
+        }
+
+    def __getitem__(self, name: str) -> Block:
+        return self.blocks[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.blocks
+
+    def __iter__(self) -> Iterator[Block]:
+        return iter(self.blocks.values())
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+
+class AvailabilityIndex:
+    """Who is free when, with blocks and people numbered instead of named.
+
+    Block IDs are the blocks' chronological ranks in a `BlockIndex`, and each
+    person (by position in `people`) has a bitset of the IDs they're free for,
+    so checking availability or comparing two people's availability is integer
+    arithmetic instead of string hashing. Each block also has an array of the
+    people free for it.
+    """
+
+    __slots__ = ("block_ids", "block_people", "blocks", "masks", "people")
+
+    def __init__(self, availability: list[Person], block_index: BlockIndex):
+        self.people = availability
+        self.blocks: list[Block] = list(block_index)
+        self.block_ids = {block.name: i for i, block in enumerate(self.blocks)}
+        self.masks: list[int] = []
+        block_people: list[list[int]] = [[] for _ in self.blocks]
+        for i, person in enumerate(availability):
+            mask = 0
+            for name in person.free_slots:
+                block_id = self.block_ids[name]
+                if not mask >> block_id & 1:
+                    mask |= 1 << block_id
+                    block_people[block_id].append(i)
+            self.masks.append(mask)
+        self.block_people = [
+            np.array(people, dtype=np.int32) for people in block_people
+        ]
+
+    def is_free(self, person: int, block_id: int) -> bool:
+        return bool(self.masks[person] >> block_id & 1)
+
+    def free_blocks(self, person: int) -> list[int]:
+        """The IDs of the blocks `person` is free for, in chronological order."""
+        return mask_bits(self.masks[person])
+
+
+def mask_bits(mask: int) -> list[int]:
+    bits = []
+    while mask:
+        low_bit = mask & -mask
+        bits.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return bits
+
+
+def block_sort_key(block):
+    return parse_block(block).start
 
 
 def get_block_day(block: str) -> str:
-    try:
-        return parse_datetime_range(block)[0].strftime("%A")
-    except Exception:
-        res = _DAY_OF_WEEK_REGEX.search(block)
-        return res.group(0) if res else ""
+    return parse_block(block).day
 
 
 def pretty_print_schedule(schedule):
@@ -84,7 +215,7 @@ def write_schedule_to_csv(
         ):
             people_in_block = schedule[block]
             slots_in_block = (
-                get_time_intervals(block)
+                list(parse_block(block).intervals)
                 if block != UNSCHEDULED_BLOCK
                 else [""] * len(people_in_block)
             )
@@ -104,3 +235,22 @@ def write_schedule_to_csv(
             ):
                 email, name = (person.email, person.name) if person else ("", "")
                 writer.writerow([block, slot, name, email, room])
+
+
+def read_schedule_from_csv(path: Path) -> Schedule:
+    """Read a schedule written by `write_schedule_to_csv`. The file only has names
+    and emails, so each person's `free_slots` is just the block they're in."""
+    schedule: Schedule = {}
+    with path.open() as f:
+        for row in csv.DictReader(f):
+            block = row["Block"]
+            people = schedule.setdefault(block, [])
+            if row["Email"]:
+                people.append(
+                    Person(
+                        name=row["Name"],
+                        email=row["Email"],
+                        free_slots=[block] if block != UNSCHEDULED_BLOCK else [],
+                    )
+                )
+    return schedule
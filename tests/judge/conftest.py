@@ -0,0 +1,13 @@
+import pytest
+
+from tests.judge.tournament import MATCHES_PER_ROUND, MAX_JUDGES_PER_MATCH
+
+
+@pytest.fixture
+def rounds():
+    """Use the small tournament's rounds for the test, then restore the real ones."""
+    sat = pytest.importorskip("scheduler.judge.sat")
+    round_config = sat.current_round_config()
+    sat.configure_rounds(MATCHES_PER_ROUND, MAX_JUDGES_PER_MATCH)
+    yield list(MATCHES_PER_ROUND)
+    sat.configure_rounds(*round_config)
@@ -0,0 +1,74 @@
+import csv
+
+import pytest
+
+pytest.importorskip("rl")
+
+from click.testing import CliRunner  # noqa: E402
+
+from scheduler.judge import incremental  # noqa: E402
+from scheduler.judge.sat import (  # noqa: E402
+    GRADE_MAPPING,
+    assign_judges,
+    read_schedule_from_csv,
+    write_schedule_to_csv,
+)
+from tests.judge.tournament import judge  # noqa: E402
+
+
+def sheet(round_names):
+    return [judge(i, i % len(GRADE_MAPPING), round_names) for i in range(8)]
+
+
+def published(judges, path):
+    mapped = [{**j, "grade": GRADE_MAPPING[j["grade"]]} for j in judges]
+    write_schedule_to_csv(assign_judges(mapped), judges, path)
+    return read_schedule_from_csv(path)
+
+
+def assigned_names(schedule):
+    return {
+        j["name"]
+        for courtrooms in schedule.values()
+        for panel in courtrooms.values()
+        for j in panel
+    }
+
+
+class TestReschedule:
+    def test_drop_only_changes_the_dropped_judges_assignments(self, rounds, tmp_path):
+        judges = sheet(rounds)
+        previous, previously_listed = published(judges, tmp_path / "schedule.csv")
+        # Judge 0 has the best grade, so they're assigned in every round.
+        for round_name in rounds:
+            assert any("Judge 0" in names for names in previous[round_name].values())
+        schedule = incremental.reschedule(
+            judges, previous, previously_listed, dropped={"Judge 0"}
+        )
+        assert "Judge 0" not in assigned_names(schedule)
+        assert incremental.count_changed_assignments(previous, schedule) == len(rounds)
+
+    def test_main_leaves_dropped_judges_out_of_the_output(
+        self, rounds, tmp_path, monkeypatch
+    ):
+        judges = sheet(rounds)
+        previous_path = tmp_path / "previous.csv"
+        published(judges, previous_path)
+        schedule_path = tmp_path / "schedule.csv"
+        unscheduled_path = tmp_path / "unscheduled.csv"
+        monkeypatch.setattr(incremental, "get_judge_data", lambda: sheet(rounds))
+        monkeypatch.setattr(incremental, "_SCHEDULE_PATH", schedule_path)
+        monkeypatch.setattr(incremental, "_UNSCHEDULED_PATH", unscheduled_path)
+        result = CliRunner().invoke(
+            incremental.main,
+            ["--previous", str(previous_path), "--drop", "Judge 0"],
+        )
+        assert result.exit_code == 0, result.output
+        assigned, listed = read_schedule_from_csv(schedule_path)
+        for round_name in rounds:
+            assert "Judge 0" not in listed[round_name]
+            assert all(
+                "Judge 0" not in names for names in assigned[round_name].values()
+            )
+        with unscheduled_path.open() as f:
+            assert "Judge 0" not in [row[0] for row in csv.reader(f)]
@@ -0,0 +1,172 @@
+import pytest
+
+pytest.importorskip("rl")
+
+from ortools.sat.python import cp_model  # noqa: E402
+
+from scheduler.judge import sat  # noqa: E402
+from tests.judge.tournament import judge  # noqa: E402
+
+
+class TestAssignmentIndex:
+    @pytest.mark.parametrize("sparse", [True, False])
+    def test_lookup_by_proto_index(self, rounds, sparse):
+        # Judge 1 isn't free for the first round, so the sparse model has no
+        # variables for them there and the proto indices skip ahead.
+        judges = [judge(0, 40, rounds), judge(1, 35, rounds[1:])]
+        full_model = sat.initialize_full_model(judges, sparse=sparse)
+        index = full_model["index"]
+        for j in judges:
+            for round_name in rounds:
+                for courtroom in sat.COURTROOM_LETTERS[round_name]:
+                    var = index.var(j["name"], round_name, courtroom)
+                    if sparse and round_name not in j["free_slots"]:
+                        assert var is None
+                        continue
+                    assert var.Name() == f"{j['name']} in {round_name} — {courtroom}"
+                    assert (
+                        full_model["model"].GetIntVarFromProtoIndex(var.Index()).Name()
+                        == var.Name()
+                    )
+        assert index.var("Judge 2", rounds[0], "A") is None
+        assert index.var("Judge 0", rounds[0], "Z") is None
+
+    def test_assignments_read_the_solution(self, rounds):
+        judges = [judge(0, 40, rounds), judge(1, 35, rounds[1:])]
+        full_model = sat.initialize_full_model(judges)
+        index = full_model["index"]
+        model = full_model["model"]
+        model.Add(index.var("Judge 0", rounds[0], "B") == 1)
+        model.Add(index.var("Judge 1", rounds[1], "A") == 1)
+        model.Add(sum(index.variables.values()) == 2)
+        solver = cp_model.CpSolver()
+        assert solver.Solve(model) == cp_model.OPTIMAL
+        schedule = sat.get_schedule_from_solution(
+            solver.ResponseProto().solution, index, judges
+        )
+        assert {
+            (round_name, courtroom, j["name"])
+            for round_name, courtrooms in schedule.items()
+            for courtroom, panel in courtrooms.items()
+            for j in panel
+        } == {(rounds[0], "B", "Judge 0"), (rounds[1], "A", "Judge 1")}
+
+
+def names(schedule):
+    return {
+        round_name: {
+            courtroom: sorted(j["name"] for j in panel)
+            for courtroom, panel in courtrooms.items()
+        }
+        for round_name, courtrooms in schedule.items()
+    }
+
+
+def mapped_grades(judges):
+    return [{**j, "grade": sat.GRADE_MAPPING[j["grade"]]} for j in judges]
+
+
+class TestAssignJudges:
+    def test_best_judges_fill_every_panel(self, rounds):
+        judges = mapped_grades([judge(i, i % 5, rounds) for i in range(8)])
+        schedule = sat.assign_judges(judges)
+        for round_name in rounds:
+            panels = schedule[round_name].values()
+            limit = sat.MAX_JUDGES_PER_MATCH[round_name]
+            assert all(len(panel) <= limit for panel in panels)
+            assigned = [j["grade"] for panel in panels for j in panel]
+            best = sorted((j["grade"] for j in judges), reverse=True)
+            assert sorted(assigned, reverse=True) == best[: len(assigned)]
+            assert len(assigned) == min(len(judges), limit * len(panels))
+
+    def test_is_the_fallback_when_the_solver_finds_nothing(self, rounds):
+        judges = [judge(i, i % 5, rounds) for i in range(8)]
+        reports = []
+        # With no time, neither stage finds a solution.
+        schedule = sat.create_schedule(judges, 0, reports=reports)
+        assert [report.fallback for report in reports] == ["greedy", "stage-1"]
+        assert names(schedule) == names(sat.assign_judges(mapped_grades(judges)))
+
+
+class TestCreateScheduleByRound:
+    def test_matches_the_full_model(self, rounds):
+        # Grades and availability vary, so panels can't all score the same.
+        grades = [0, 2, 3, 4]
+        judges = [
+            judge(i, grades[i % 4], [r for k, r in enumerate(rounds) if (i + k) % 3])
+            for i in range(9)
+        ]
+        full_reports = []
+        full = sat.create_schedule(judges, 10, reports=full_reports)
+        round_reports = []
+        by_round = sat.create_schedule_by_round(judges, 10, reports=round_reports)
+        for report in full_reports + round_reports:
+            assert report.status == "OPTIMAL"
+        for round_name in rounds:
+            assert round_score(by_round, round_name) == round_score(full, round_name)
+        assert sat.schedule_deviation(by_round) == sat.schedule_deviation(full) > 0
+
+
+def round_score(schedule, round_name):
+    return sum(j["grade"] for panel in schedule[round_name].values() for j in panel)
+
+
+class TestPiecewiseLinearDeviation:
+    def known_schedule(self, rounds):
+        judges = mapped_grades(
+            [judge(i, grade, rounds) for i, grade in enumerate([0, 1, 2, 0, 3, 4])]
+        )
+        panels = {
+            # 75 and 50: each panel is 25 off the (doubled) average
+            rounds[0]: {"A": [0, 1], "B": [2, 4]},
+            # 55 and 70: 15 off
+            rounds[1]: {"A": [3, 5], "B": [0, 2]},
+            rounds[2]: {"A": [1, 3, 4]},
+        }
+        schedule = {
+            round_name: {
+                courtroom: [judges[j] for j in panel]
+                for courtroom, panel in courtrooms.items()
+            }
+            for round_name, courtrooms in panels.items()
+        }
+        return judges, schedule
+
+    def test_tracks_the_squared_deviation(self, rounds):
+        _, schedule = self.known_schedule(rounds)
+        squared = 2 * 25**2 + 2 * 15**2
+        approximation = sat.schedule_deviation(schedule, "pwl")
+        assert 0.95 * squared <= approximation <= squared
+        # Deviations far below the largest possible one aren't rounded down to 0.
+        assert sat.schedule_deviation(schedule, "pwl", num_breakpoints=3) > 0
+
+    @pytest.mark.parametrize("deviation", [1, 5, 10, 50, 200, 1000])
+    def test_breakpoints_cover_realistic_deviations(self, deviation):
+        # The largest scaled deviation of a 12-courtroom round of 3 judges
+        max_value = max(sat.GRADE_MAPPING.values()) * 3 * 12
+        tangents = [
+            2 * point * deviation - point**2 for point in sat.pwl_breakpoints(max_value)
+        ]
+        assert 0.9 * deviation**2 <= max(tangents) <= deviation**2
+
+    def test_model_agrees_with_the_schedule(self, rounds):
+        judges, schedule = self.known_schedule(rounds)
+        full_model = sat.initialize_full_model(judges)
+        model, index = full_model["model"], full_model["index"]
+        assigned = [
+            index.var(j["name"], round_name, courtroom)
+            for round_name, courtrooms in schedule.items()
+            for courtroom, panel in courtrooms.items()
+            for j in panel
+        ]
+        for var in assigned:
+            model.Add(var == 1)
+        model.Add(sum(index.variables.values()) == len(assigned))
+        judge_grades = {j["name"]: j["grade"] for j in judges}
+        deviation_vars = sat.get_deviation_vars(
+            judge_grades, model, index, fairness_mode="pwl"
+        )
+        model.Minimize(sum(deviation_vars.values()))
+        solver = cp_model.CpSolver()
+        assert solver.Solve(model) == cp_model.OPTIMAL
+        assert solver.ObjectiveValue() == sat.schedule_deviation(schedule, "pwl")
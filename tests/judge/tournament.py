@@ -0,0 +1,13 @@
+# A small tournament: two preliminary rounds of two courtrooms, then a final.
+MATCHES_PER_ROUND = {"Round 1": 2, "Round 2": 2, "Final": 1}
+MAX_JUDGES_PER_MATCH = {"Round 1": 2, "Round 2": 2, "Final": 3}
+
+
+def judge(number: int, grade: int, free_slots: list[str]) -> dict:
+    return {
+        "name": f"Judge {number}",
+        "email": f"judge{number}@example.com",
+        "grade": grade,
+        "moot_exp": False,
+        "free_slots": list(free_slots),
+    }
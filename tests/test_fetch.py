@@ -0,0 +1,124 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scheduler.fetch import fetch_files, fetch_lines
+
+
+class SheetServer(ThreadingHTTPServer):
+    """Serves `sheets` (path -> text) with an ETag, and counts full downloads."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SheetHandler)
+        self.sheets: dict[str, str] = {}
+        self.downloads: list[str] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class SheetHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        text = self.server.sheets.get(self.path)
+        if text is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{hash(text)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.server.downloads.append(self.path)
+        body = text.encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fetch_text(url, cache_dir, offline=False):
+    return "".join(fetch_lines(url, cache_dir, offline=offline))
+
+
+@pytest.fixture
+def server():
+    server = SheetServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestFetch:
+    def test_unchanged_sheet_is_not_downloaded_again(self, server, tmp_path):
+        server.sheets["/judges.csv"] = "name,grade\nAda,0\n"
+        url = f"{server.url}/judges.csv"
+        assert fetch_text(url, tmp_path) == "name,grade\nAda,0\n"
+        assert fetch_text(url, tmp_path) == "name,grade\nAda,0\n"
+        assert server.downloads == ["/judges.csv"]
+
+    def test_changed_sheet_is_downloaded(self, server, tmp_path):
+        server.sheets["/judges.csv"] = "name,grade\nAda,0\n"
+        url = f"{server.url}/judges.csv"
+        fetch_text(url, tmp_path)
+        server.sheets["/judges.csv"] = "name,grade\nAda,1\n"
+        assert fetch_text(url, tmp_path) == "name,grade\nAda,1\n"
+        assert len(server.downloads) == 2
+
+    def test_offline_uses_snapshot(self, server, tmp_path):
+        server.sheets["/slots.csv"] = "slot,multiplier\n"
+        url = f"{server.url}/slots.csv"
+        fetch_text(url, tmp_path)
+        server.sheets["/slots.csv"] = "changed\n"
+        assert fetch_text(url, tmp_path, offline=True) == "slot,multiplier\n"
+        assert server.downloads == ["/slots.csv"]
+
+    def test_offline_without_snapshot_fails(self, server, tmp_path):
+        with pytest.raises(RuntimeError):
+            fetch_text(f"{server.url}/slots.csv", tmp_path, offline=True)
+
+    def test_failed_request_falls_back_to_snapshot(self, server, tmp_path):
+        server.sheets["/avail.csv"] = "email,name\n"
+        url = f"{server.url}/avail.csv"
+        fetch_text(url, tmp_path)
+        del server.sheets["/avail.csv"]
+        assert fetch_text(url, tmp_path) == "email,name\n"
+
+    def test_fetch_files_keeps_order(self, server, tmp_path):
+        server.sheets["/avail.csv"] = "avail\n"
+        server.sheets["/slots.csv"] = "slots\n"
+        files = fetch_files(
+            [f"{server.url}/avail.csv", f"{server.url}/slots.csv"], tmp_path
+        )
+        assert [path.read_text(encoding) for path, encoding in files] == [
+            "avail\n",
+            "slots\n",
+        ]
+
+    def test_fetch_lines_reads_the_snapshot(self, server, tmp_path):
+        server.sheets["/avail.csv"] = "email,name\r\nada@example.com,Ada\r\n"
+        url = f"{server.url}/avail.csv"
+        assert list(fetch_lines(url, tmp_path)) == [
+            "email,name\r\n",
+            "ada@example.com,Ada\r\n",
+        ]
+        assert list(fetch_lines(url, tmp_path)) == list(
+            fetch_lines(url, tmp_path, offline=True)
+        )
+        assert server.downloads == ["/avail.csv"]
+
+    def test_non_ascii_after_a_long_ascii_start(self, server, tmp_path):
+        rows = [f"judge{i}@example.com,Judge {i}\r\n" for i in range(5000)]
+        text = "email,name\r\n" + "".join(rows) + "bo@example.com,Bö\r\n"
+        server.sheets["/judges.csv"] = text
+        url = f"{server.url}/judges.csv"
+        assert fetch_text(url, tmp_path) == text
+        assert "".join(fetch_lines(url, tmp_path, offline=True)) == text
@@ -0,0 +1,30 @@
+import datetime
+
+import pytest
+
+from scheduler.tryout.utils import UNSCHEDULED_BLOCK, BlockIndex, Slot, parse_block
+
+
+class TestBlocks:
+    def test_parse_block_is_interned(self):
+        assert parse_block("Monday, April 24, 1–2 p.m.") is parse_block(
+            "Monday, April 24, 1–2 p.m."
+        )
+
+    def test_block_index(self):
+        slots = [
+            Slot(name="Tuesday, April 25, 1–2 p.m.", spots_multiplier=2, rooms=[]),
+            Slot(name="Monday, April 24, 3–4 p.m.", spots_multiplier=1, rooms=[]),
+        ]
+        blocks = BlockIndex(slots, [UNSCHEDULED_BLOCK], default_multiplier=0)
+        monday = blocks["Monday, April 24, 3–4 p.m."]
+        tuesday = blocks["Tuesday, April 25, 1–2 p.m."]
+        assert (monday.rank, tuesday.rank, blocks[UNSCHEDULED_BLOCK].rank) == (0, 1, 2)
+        assert (monday.capacity, tuesday.capacity) == (3, 6)
+        assert monday.date == datetime.date(datetime.datetime.now().year, 4, 24)
+        assert blocks[UNSCHEDULED_BLOCK].start == datetime.datetime.max
+
+    def test_block_without_slot(self):
+        slots = [Slot(name="Monday, April 24, 3–4 p.m.", spots_multiplier=1, rooms=[])]
+        with pytest.raises(KeyError, match="April 25"):
+            BlockIndex(slots, ["Tuesday, April 25, 1–2 p.m."])
@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("rl")
+
+from scheduler.tryout.greedy import create_schedule  # noqa: E402
+from scheduler.tryout.utils import UNSCHEDULED_BLOCK, Person, Slot  # noqa: E402
+
+MONDAY_EARLY = "Monday, April 24, 1–2 p.m."
+MONDAY_LATE = "Monday, April 24, 2–3 p.m."
+TUESDAY = "Tuesday, April 25, 1–2 p.m."
+# Starts with MONDAY_EARLY
+MONDAY_LONG = "Monday, April 24, 1–3 p.m."
+# Each block fits 3 people.
+SLOTS = [
+    Slot(name=block, spots_multiplier=1, rooms=["A"])
+    for block in (MONDAY_EARLY, MONDAY_LATE, TUESDAY)
+]
+
+
+def names(schedule):
+    return {block: [p.name for p in people] for block, people in schedule.items()}
+
+
+class TestGreedy:
+    def test_ties(self):
+        availability = [
+            Person("C", "c@example.com", [MONDAY_EARLY, MONDAY_LATE, TUESDAY]),
+            Person("D", "d@example.com", [MONDAY_EARLY, MONDAY_LATE, TUESDAY]),
+            Person("A", "a@example.com", [TUESDAY]),
+            Person("B", "b@example.com", [MONDAY_EARLY, MONDAY_LATE]),
+            Person("E", "e@example.com", [MONDAY_LATE, TUESDAY]),
+        ]
+        # Least available first: A, B, E, C, D. B picks the later of two empty
+        # Monday blocks; E is tied between two blocks with one person on days
+        # with one person, and picks the later; C joins the fullest block.
+        assert names(create_schedule(availability, SLOTS)) == {
+            MONDAY_EARLY: [],
+            MONDAY_LATE: ["B", "D"],
+            TUESDAY: ["A", "E", "C"],
+        }
+
+    def test_capacity(self):
+        availability = [
+            Person(name, f"{name.lower()}@example.com", [TUESDAY])
+            for name in ("A", "B", "C", "D")
+        ]
+        assert names(create_schedule(availability, SLOTS)) == {
+            TUESDAY: ["A", "B", "C"],
+            UNSCHEDULED_BLOCK: ["D"],
+        }
+
+    @pytest.mark.parametrize(
+        "free_slots", [[MONDAY_LONG, MONDAY_EARLY], [MONDAY_EARLY, MONDAY_LONG]]
+    )
+    def test_same_start_ties(self, free_slots):
+        # Two empty blocks with the same start tie on every criterion, and go to
+        # the one listed first among the person's free slots, as the original
+        # scheduler's max() over them picked.
+        slots = [*SLOTS, Slot(name=MONDAY_LONG, spots_multiplier=1, rooms=["A"])]
+        availability = [Person("A", "a@example.com", free_slots)]
+        schedule = names(create_schedule(availability, slots))
+        assert schedule[free_slots[0]] == ["A"]
+        assert schedule[free_slots[1]] == []
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("rl")
+
+from scheduler.tryout.incremental import (  # noqa: E402
+    find_changed_people,
+    reschedule,
+)
+from scheduler.tryout.utils import UNSCHEDULED_BLOCK, Person, Slot  # noqa: E402
+
+EARLY = "Monday, April 24, 1–2 p.m."
+LATE = "Monday, April 24, 2–3 p.m."
+# Each block fits 3 people.
+SLOTS = [Slot(name=block, spots_multiplier=1, rooms=["A"]) for block in (EARLY, LATE)]
+
+
+def people(prefix: str, count: int, free_slots: list[str]) -> list[Person]:
+    return [
+        Person(f"{prefix} {i}", f"{prefix}{i}@example.com", list(free_slots))
+        for i in range(count)
+    ]
+
+
+def names(schedule):
+    return {block: sorted(p.name for p in people) for block, people in schedule.items()}
+
+
+class TestReschedule:
+    def test_find_changed_people(self):
+        published = people("old", 2, [EARLY])
+        moved_away = Person("old 1", "old1@example.com", [LATE])
+        new = Person("new", "new@example.com", [EARLY])
+        availability = [published[0], moved_away, new]
+        changed = find_changed_people(availability, {EARLY: published})
+        assert changed == [moved_away, new]
+
+    def test_new_person_joins_without_moves(self):
+        published = people("old", 2, [EARLY])
+        new = Person("new", "new@example.com", [EARLY, LATE])
+        schedule = reschedule({EARLY: published}, [new], SLOTS, published + [new])
+        assert names(schedule) == {
+            EARLY: ["new", "old 0", "old 1"],
+            UNSCHEDULED_BLOCK: [],
+        }
+
+    def test_moves_make_room(self):
+        published = people("old", 3, [EARLY, LATE])
+        new = Person("new", "new@example.com", [EARLY])
+        previous = {EARLY: published}
+        availability = published + [new]
+        schedule = reschedule(previous, [new], SLOTS, availability)
+        assert names(schedule)[UNSCHEDULED_BLOCK] == ["new"]
+        schedule = reschedule(previous, [new], SLOTS, availability, max_moves=1)
+        assert "new" in names(schedule)[EARLY]
+        assert len(schedule[EARLY]) == 3
+        assert len(schedule[LATE]) == 1
+
+    @pytest.mark.parametrize("max_moves", [0, 1, 5])
+    def test_over_capacity_block_stays(self, max_moves):
+        published = people("old", 5, [EARLY, LATE])
+        new = Person("new", "new@example.com", [EARLY, LATE])
+        schedule = reschedule(
+            {EARLY: published},
+            [new],
+            SLOTS,
+            published + [new],
+            max_moves=max_moves,
+        )
+        assert names(schedule) == {
+            EARLY: [f"old {i}" for i in range(5)],
+            LATE: ["new"],
+            UNSCHEDULED_BLOCK: [],
+        }
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+pytest.importorskip("rl")
+
+from scheduler.tryout import greedy  # noqa: E402
+from scheduler.tryout.local_search import (  # noqa: E402
+    UNSCHEDULED,
+    ScheduleState,
+    improve_schedule,
+    try_empty_block,
+    try_empty_day,
+    try_move,
+)
+from scheduler.tryout.synthetic import generate_tryout  # noqa: E402
+from scheduler.tryout.utils import UNSCHEDULED_BLOCK, BlockIndex  # noqa: E402
+
+
+def full_objective(state: ScheduleState) -> int:
+    used_blocks = {block for block in state.assignment if block != UNSCHEDULED}
+    used_days = {state.block_day[block] for block in used_blocks}
+    return (
+        sum(
+            state.goodness[i]
+            for i, block in enumerate(state.assignment)
+            if block == UNSCHEDULED
+        )
+        + sum(state.day_cost[day] for day in used_days)
+        + sum(state.block_cost[block] for block in used_blocks)
+    )
+
+
+def check_schedule(schedule, availability, slots):
+    block_index = BlockIndex(slots)
+    for block, people in schedule.items():
+        if block == UNSCHEDULED_BLOCK:
+            continue
+        assert len(people) <= block_index[block].capacity
+        assert all(block in person.free_slots for person in people)
+    scheduled = sorted(p.email for people in schedule.values() for p in people)
+    assert scheduled == sorted(p.email for p in availability)
+
+
+class TestLocalSearch:
+    # 5 days of 4 blocks fit 120 people, so with 150 some stay unscheduled.
+    @pytest.mark.parametrize("num_people,num_days", [(300, 50), (150, 5)])
+    def test_moves_are_priced_incrementally(self, num_people, num_days):
+        availability, slots = generate_tryout(num_people, num_days, seed=1)
+        state = ScheduleState(availability, slots)
+        state.load(greedy.create_schedule(availability, slots))
+        rng = random.Random(0)
+        for _ in range(20000):
+            objective = state.objective
+            rng.choice([try_move, try_move, try_empty_block, try_empty_day])(state, rng)
+            assert state.objective <= objective
+        assert state.objective == full_objective(state)
+        assert all(
+            len(members) <= capacity
+            for members, capacity in zip(state.members, state.capacity, strict=True)
+        )
+        assert all(
+            state.index.is_free(i, block)
+            for i, block in enumerate(state.assignment)
+            if block != UNSCHEDULED
+        )
+
+    def test_improves_greedy_schedule(self):
+        availability, slots = generate_tryout(300, 50, seed=2)
+        schedule = greedy.create_schedule(availability, slots)
+        progress = []
+        improved = improve_schedule(
+            availability, slots, schedule, max_time_in_seconds=0.2, progress=progress
+        )
+        check_schedule(improved, availability, slots)
+        objectives = [point["objective"] for point in progress]
+        assert objectives == sorted(objectives, reverse=True)
+        assert objectives[-1] < objectives[0]
+        state = ScheduleState(availability, slots)
+        state.load(improved)
+        assert state.objective == objectives[-1]
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("rl")
+
+from scheduler.tryout import sat  # noqa: E402
+from scheduler.tryout.synthetic import generate_tryout  # noqa: E402
+from scheduler.tryout.utils import (  # noqa: E402
+    UNSCHEDULED_BLOCK,
+    BlockIndex,
+    Person,
+    Slot,
+    write_schedule_to_csv,
+)
+
+
+class TestCreateSchedule:
+    def test_greedy_fallback_respects_capacity(self, tmp_path):
+        blocks = ["Monday, April 24, 1–2 p.m.", "Monday, April 24, 2–3 p.m."]
+        slots = [Slot(name=block, spots_multiplier=1, rooms=["A"]) for block in blocks]
+        # Two blocks of 3, so not everyone fits and the solver finds no schedule.
+        people = [
+            Person(f"Person {i}", f"person{i}@example.com", list(blocks))
+            for i in range(8)
+        ]
+        reports = []
+        schedule = sat.create_schedule(people, slots, reports=reports)
+        assert reports[-1]["fallback"] == "greedy"
+        block_index = BlockIndex(slots)
+        for block in blocks:
+            assert len(schedule[block]) == block_index[block].capacity == 3
+        assert len(schedule[UNSCHEDULED_BLOCK]) == 2
+        write_schedule_to_csv(schedule, slots, tmp_path / "schedule.csv")
+
+    @pytest.mark.parametrize("aggregate", [False, True])
+    def test_lexicographic_stages_are_optimal(self, aggregate):
+        # Everyone fits, but maximizing who is scheduled can't prove that on its
+        # own on an instance this size.
+        availability, slots = generate_tryout(150, 10, 4, seed=3)
+        reports = []
+        schedule = sat.create_schedule(
+            availability,
+            slots,
+            aggregate=aggregate,
+            lexicographic=True,
+            time_limits=[10],
+            reports=reports,
+        )
+        assert [report["stage"] for report in reports] == list(sat.OBJECTIVE_WEIGHTS)
+        assert all(report["status"] == "OPTIMAL" for report in reports)
+        assert not schedule[UNSCHEDULED_BLOCK]
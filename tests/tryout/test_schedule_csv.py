@@ -0,0 +1,29 @@
+from scheduler.tryout.utils import (
+    UNSCHEDULED_BLOCK,
+    Person,
+    Slot,
+    read_schedule_from_csv,
+    write_schedule_to_csv,
+)
+
+
+class TestScheduleCsv:
+    def test_round_trip(self, tmp_path):
+        block = "Monday, April 24, 1–2 p.m."
+        empty_block = "Monday, April 24, 2–3 p.m."
+        schedule = {
+            block: [Person("Ada", "ada@example.com", [block, empty_block])],
+            empty_block: [],
+            UNSCHEDULED_BLOCK: [Person("Bob", "bob@example.com", [])],
+        }
+        slots = [
+            Slot(name=block, spots_multiplier=1, rooms=["A"]),
+            Slot(name=empty_block, spots_multiplier=1, rooms=["A"]),
+        ]
+        path = tmp_path / "schedule.csv"
+        write_schedule_to_csv(schedule, slots, path)
+        assert read_schedule_from_csv(path) == {
+            block: [Person("Ada", "ada@example.com", [block])],
+            empty_block: [],
+            UNSCHEDULED_BLOCK: [Person("Bob", "bob@example.com", [])],
+        }